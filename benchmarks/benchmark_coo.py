@@ -0,0 +1,72 @@
+import numpy as np
+
+import sparse
+
+
+class IndexingSuite(object):
+    """
+    Indexing with integers and slices, which is often done in tight loops.
+    """
+    def setup(self):
+        self.s = sparse.random((100, 100), density=0.1, random_state=0)
+        self.s.sum_duplicates()
+        self.t = sparse.random((20, 30, 40), density=0.1, random_state=0)
+        self.t.sum_duplicates()
+        self.u = sparse.COO(self.s.coords[:, ::-1], self.s.data[::-1], shape=self.s.shape)
+
+    def time_index_point(self):
+        self.s[3, 4]
+
+    def time_index_point_3d(self):
+        self.t[1, 2, 3]
+
+    def time_index_point_unsorted(self):
+        self.u[3, 4]
+
+    def time_index_row(self):
+        self.s[3]
+
+    def time_index_slice(self):
+        self.s[2:5]
+
+
+class GetValuesSuite(object):
+    """
+    Looking up many points at once.
+    """
+    def setup(self):
+        self.s = sparse.random((1000, 1000), density=0.01, random_state=0)
+        self.s.sum_duplicates()
+        self.points = np.random.RandomState(0).randint(0, 1000, size=(2, 10 ** 5))
+
+    def time_get_values(self):
+        self.s.get_values(self.points)
+
+    def time_get_values_point(self):
+        self.s.get_values([3, 4])
+
+
+class ElemwiseSuite(object):
+    """
+    Adding arrays with the same or very different numbers of nonzeros.
+    """
+    params = (['numpy', 'numba'], [1, 100, 10000])
+    param_names = ['backend', 'ratio']
+
+    def setup(self, backend, ratio):
+        try:
+            sparse.set_backend(backend)
+        except ImportError:
+            raise NotImplementedError
+
+        self.x = sparse.random((1000, 10000), density=0.1, random_state=0)
+        self.x.sum_duplicates()
+        self.y = sparse.random((1000, 10000), density=0.1 / ratio, random_state=1)
+        self.y.sum_duplicates()
+        self.x + self.y
+
+    def teardown(self, backend, ratio):
+        sparse.set_backend('numpy')
+
+    def time_add(self, backend, ratio):
+        self.x + self.y
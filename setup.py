@@ -21,6 +21,9 @@ extras_require = {
     'tox': [
         'tox',
     ],
+    'numba': [
+        'numba',
+    ],
     'tests-linting': [
         'flake8'
     ],
@@ -1,10 +1,13 @@
 from .coo import COO, elemwise, tensordot, concatenate, stack, dot, triu, tril, where, \
-    nansum, nanprod, nanmin, nanmax
+    nansum, nanprod, nanmin, nanmax, segment_reduce
 from .dok import DOK
+from .lazy import LazyCOO
 from .sparse_array import SparseArray
 from .utils import random
+from .backends import set_backend, get_backend
 from ._version import __version__
 
-__all__ = ["SparseArray", "COO", "DOK",
+__all__ = ["SparseArray", "COO", "DOK", "LazyCOO",
            "tensordot", "concatenate", "stack", "dot", "triu", "tril", "random", "where",
-           "nansum", "nanprod", "nanmin", "nanmax"]
+           "nansum", "nanprod", "nanmin", "nanmax", "segment_reduce", "set_backend",
+           "get_backend"]
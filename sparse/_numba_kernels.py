@@ -0,0 +1,143 @@
+"""
+Single-pass kernels for the inner loops of :obj:`COO` operations, compiled
+with Numba. Each one replaces a composition of NumPy calls in
+:obj:`sparse.coo` that would make several passes over the data.
+"""
+from __future__ import absolute_import, division, print_function
+
+import numba
+import numpy as np
+
+
+@numba.njit
+def linear_loc(coords, shape, out):
+    for j in range(coords.shape[1]):
+        loc = 0
+        for d in range(coords.shape[0]):
+            loc = loc * shape[d] + coords[d, j]
+        out[j] = loc
+
+    return out
+
+
+@numba.njit
+def coords_from_linear_loc(linear, shape, out):
+    for j in range(len(linear)):
+        rem = linear[j]
+        for d in range(len(shape) - 1, -1, -1):
+            out[d, j] = rem % shape[d]
+            rem = rem // shape[d]
+
+    return out
+
+
+@numba.njit
+def merge_sorted(a, b):
+    union = np.empty(len(a) + len(b), dtype=a.dtype)
+    a_pos = np.empty(len(a), dtype=np.intp)
+    b_pos = np.empty(len(b), dtype=np.intp)
+
+    i = j = k = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            union[k] = a[i]
+            a_pos[i] = k
+            i += 1
+        elif b[j] < a[i]:
+            union[k] = b[j]
+            b_pos[j] = k
+            j += 1
+        else:
+            union[k] = a[i]
+            a_pos[i] = k
+            b_pos[j] = k
+            i += 1
+            j += 1
+        k += 1
+
+    while i < len(a):
+        union[k] = a[i]
+        a_pos[i] = k
+        i += 1
+        k += 1
+
+    while j < len(b):
+        union[k] = b[j]
+        b_pos[j] = k
+        j += 1
+        k += 1
+
+    return union[:k], a_pos, b_pos
+
+
+@numba.njit
+def group_starts(groups):
+    inv_idx = np.empty(len(groups), dtype=np.intp)
+    counts = np.empty(len(groups), dtype=np.intp)
+
+    n = 0
+    for i in range(len(groups)):
+        if i == 0 or groups[i] != groups[i - 1]:
+            if n != 0:
+                counts[n - 1] = i - inv_idx[n - 1]
+            inv_idx[n] = i
+            n += 1
+
+    if n != 0:
+        counts[n - 1] = len(groups) - inv_idx[n - 1]
+
+    return inv_idx[:n], counts[:n]
+
+
+@numba.njit
+def slice_mask(coords, starts, stops, steps):
+    mask = np.empty(coords.shape[1], dtype=np.bool_)
+
+    for j in range(coords.shape[1]):
+        keep = True
+        for d in range(coords.shape[0]):
+            c = np.int64(coords[d, j])
+            if steps[d] > 0:
+                keep = starts[d] <= c < stops[d] and (c - starts[d]) % steps[d] == 0
+            else:
+                keep = stops[d] < c <= starts[d] and (starts[d] - c) % (-steps[d]) == 0
+
+            if not keep:
+                break
+
+        mask[j] = keep
+
+    return mask
+
+
+@numba.njit
+def merge_sorted_k(linear, offsets):
+    k = len(offsets) - 1
+    heads = offsets[:-1].copy()
+    union = np.empty(len(linear), dtype=linear.dtype)
+    positions = np.empty(len(linear), dtype=np.intp)
+
+    if len(linear) == 0:
+        return union, positions
+
+    n = 0
+    while True:
+        found = False
+        lowest = linear[0]
+        for s in range(k):
+            if heads[s] < offsets[s + 1] and (not found or linear[heads[s]] < lowest):
+                lowest = linear[heads[s]]
+                found = True
+
+        if not found:
+            break
+
+        for s in range(k):
+            if heads[s] < offsets[s + 1] and linear[heads[s]] == lowest:
+                positions[heads[s]] = n
+                heads[s] += 1
+
+        union[n] = lowest
+        n += 1
+
+    return union[:n], positions
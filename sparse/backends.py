@@ -0,0 +1,98 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+
+_BACKENDS = ('numpy', 'numba')
+
+_backend = 'numpy'
+_kernels = None
+
+
+def set_backend(backend):
+    """
+    Sets the backend used for the inner loops of :obj:`COO` operations.
+
+    The ``'numpy'`` backend composes NumPy functions, each of which makes a pass
+    over the data, and is used by default. The ``'numba'`` backend uses kernels
+    compiled with `Numba <https://numba.pydata.org/>`_ that do the same work in
+    a single pass. Both give identical results.
+
+    The backend can also be chosen before importing this library with the
+    ``SPARSE_BACKEND`` environment variable, for example with
+    ``SPARSE_BACKEND=numba``.
+
+    Parameters
+    ----------
+    backend : str
+        The backend to use, either ``'numpy'`` or ``'numba'``.
+
+    Raises
+    ------
+    ValueError
+        If the backend isn't known.
+    ImportError
+        If the ``'numba'`` backend is requested, but Numba isn't installed.
+
+    See Also
+    --------
+    get_backend : Get the backend currently in use.
+
+    Examples
+    --------
+    >>> import sparse
+    >>> old_backend = sparse.get_backend()
+    >>> sparse.set_backend('numpy')
+    >>> sparse.get_backend()
+    'numpy'
+    >>> sparse.set_backend(old_backend)
+    """
+    global _backend
+
+    if backend not in _BACKENDS:
+        raise ValueError("Unknown backend %r, must be one of %s." % (backend, _BACKENDS))
+
+    if backend == 'numba':
+        _load_kernels()
+
+    _backend = backend
+
+
+def get_backend():
+    """
+    Gets the backend used for the inner loops of :obj:`COO` operations.
+
+    Returns
+    -------
+    str
+        The backend in use, either ``'numpy'`` or ``'numba'``.
+
+    See Also
+    --------
+    set_backend : Set the backend to use.
+    """
+    return _backend
+
+
+def _load_kernels():
+    global _kernels
+
+    if _kernels is None:
+        from . import _numba_kernels
+        _kernels = _numba_kernels
+
+    return _kernels
+
+
+def _get_kernels():
+    """
+    Gets the module with the compiled kernels if the ``'numba'`` backend is in
+    use, and ``None`` otherwise.
+    """
+    if _backend != 'numba':
+        return None
+
+    return _load_kernels()
+
+
+if 'SPARSE_BACKEND' in os.environ:
+    set_backend(os.environ['SPARSE_BACKEND'])
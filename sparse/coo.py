@@ -2,8 +2,7 @@ from __future__ import absolute_import, division, print_function
 
 import warnings
 from collections import Iterable, defaultdict, deque
-from functools import reduce
-from itertools import product
+from functools import partial, reduce
 import numbers
 import operator
 
@@ -11,11 +10,19 @@ import numpy as np
 import scipy.sparse
 from numpy.lib.mixins import NDArrayOperatorsMixin
 
-from .slicing import normalize_index
+from .backends import _get_kernels
+from .slicing import normalize_index, normalize_slice, sanitize_index, check_index
 from .utils import _zero_of_dtype, isscalar, PositinalArgumentPartial
 from .sparse_array import SparseArray
 from .compatibility import int, zip_longest, range, zip
 
+# The number of elements that NaN-skipping reductions copy and fill at a time.
+_NAN_BLOCK_SIZE = 2 ** 16
+
+# The number of elements of the dense operands that are checked at a time for
+# whether an operation gives a dense result.
+_ELEMWISE_BLOCK_SIZE = 2 ** 16
+
 
 class COO(SparseArray, NDArrayOperatorsMixin):
     """
@@ -28,9 +35,11 @@ class COO(SparseArray, NDArrayOperatorsMixin):
     ----------
     coords : numpy.ndarray (COO.ndim, COO.nnz)
         An array holding the index locations of every value
-        Should have shape (number of dimensions, number of non-zeros)
+        Should have shape (number of dimensions, number of non-zeros).
+        It's always copied.
     data : numpy.ndarray (COO.nnz,)
-        An array of Values
+        An array of Values. It isn't copied, so in-place operations on the
+        array, such as :code:`x *= 2`, also modify it.
     shape : tuple[int] (COO.ndim,)
         The shape of the array.
     has_duplicates : bool, optional
@@ -182,6 +191,8 @@ class COO(SparseArray, NDArrayOperatorsMixin):
     def __init__(self, coords, data=None, shape=None, has_duplicates=True,
                  sorted=False, cache=False):
         self._cache = None
+        self._row_index = None
+        self._is_view = False
         if cache:
             self.enable_caching()
         if data is None:
@@ -247,6 +258,7 @@ class COO(SparseArray, NDArrayOperatorsMixin):
             dtype = np.min_scalar_type(max(max(self.shape) - 1, 0))
         else:
             dtype = np.uint8
+        # Always copies, so that the array never aliases the caller's coordinates.
         self.coords = self.coords.astype(dtype)
         assert not self.shape or len(data) == self.coords.shape[1]
         self.has_duplicates = has_duplicates
@@ -283,6 +295,78 @@ class COO(SparseArray, NDArrayOperatorsMixin):
         self._cache = defaultdict(lambda: deque(maxlen=3))
         return self
 
+    def enable_indexing(self):
+        """
+        Enable a row pointer index over the first axis.
+
+        The index stores where the nonzeros of every position along the first
+        axis start and stop, like the :code:`indptr` of a
+        :obj:`scipy.sparse.csr_matrix`. With it, indexing with an integer or a
+        slice along the first axis, such as :code:`s[i]` or :code:`s[i:j]`, looks
+        up the nonzeros to select instead of searching for them. This helps when
+        looking up many rows of the same array, one at a time.
+
+        This sorts the coordinates of this array. The index is built on first
+        use, and is rebuilt if the coordinates are replaced, as they are by
+        assignment or :obj:`COO.sort_indices`. Like with
+        :obj:`COO.enable_caching`, the coordinates must not be modified in
+        place.
+
+        Returns
+        -------
+        COO
+            This array.
+
+        See Also
+        --------
+        COO.enable_caching : Enable caching of other operations.
+
+        Examples
+        --------
+        >>> s = COO.from_numpy(np.arange(12).reshape((4, 3)))
+        >>> s = s.enable_indexing()
+        >>> s[2].todense()
+        array([6, 7, 8])
+        """
+        self.sort_indices()
+        self._row_index = (None, None)
+        return self
+
+    def _get_indptr(self):
+        """
+        Gets the row pointer index over the first axis, building it if needed.
+
+        Returns
+        -------
+        Union[numpy.ndarray, None]
+            The index, or ``None`` if it isn't enabled or the coordinates aren't
+            sorted.
+        """
+        if self._row_index is None or not self.sorted or self.ndim == 0:
+            return None
+
+        coords, indptr = self._row_index
+        if coords is not self.coords:
+            indptr = np.zeros(self.shape[0] + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.coords[0], minlength=self.shape[0]), out=indptr[1:])
+            self._row_index = (self.coords, indptr)
+
+        return indptr
+
+    def _clear_cache(self):
+        """
+        Discards all cached results, for when this array is modified in place.
+        """
+        if self._cache is not None:
+            self._cache = defaultdict(lambda: deque(maxlen=3))
+
+        if self._row_index is not None:
+            self._row_index = (None, None)
+
+        for attr in ('_csr', '_csc'):
+            if attr in self.__dict__:
+                delattr(self, attr)
+
     @classmethod
     def from_numpy(cls, x):
         """
@@ -506,78 +590,113 @@ class COO(SparseArray, NDArrayOperatorsMixin):
             else:
                 index = (index,)
 
-        last_ellipsis = len(index) > 0 and index[-1] is Ellipsis
-        index = normalize_index(index, self.shape)
+        simple = _normalize_simple_index(index, self.shape)
+        if simple is not None:
+            if len(index) == self.ndim and not isinstance(index[0], slice):
+                return _get_point(self, simple)
+
+            last_ellipsis = False
+            index = simple
+        else:
+            last_ellipsis = len(index) > 0 and index[-1] is Ellipsis
+            index = normalize_index(_expand_masks(index, self.shape), self.shape)
+
         if len(index) != 0 and all(not isinstance(ind, Iterable) and ind == slice(None) for ind in index):
             return self
-        mask = np.ones(self.nnz, dtype=np.bool)
-        for i, ind in enumerate([i for i in index if i is not None]):
-            if not isinstance(ind, Iterable) and ind == slice(None):
-                continue
-            mask &= _mask(self.coords[i], ind, self.shape[i])
 
-        n = mask.sum()
-        coords = []
-        shape = []
-        i = 0
-        for ind in index:
-            if isinstance(ind, numbers.Integral):
-                i += 1
-                continue
-            elif isinstance(ind, slice):
-                step = ind.step if ind.step is not None else 1
-                if step > 0:
-                    start = ind.start if ind.start is not None else 0
-                    start = max(start, 0)
-                    stop = ind.stop if ind.stop is not None else self.shape[i]
-                    stop = min(stop, self.shape[i])
-                    if start > stop:
-                        start = stop
-                    shape.append((stop - start + step - 1) // step)
-                else:
-                    start = ind.start or self.shape[i] - 1
-                    stop = ind.stop if ind.stop is not None else -1
-                    start = min(start, self.shape[i] - 1)
-                    stop = max(stop, -1)
-                    if start < stop:
-                        start = stop
-                    shape.append((start - stop - step - 1) // (-step))
-
-                dt = np.min_scalar_type(min(-(dim - 1) if dim != 0 else -1 for dim in shape))
-                coords.append((self.coords[i, mask].astype(dt) - start) // step)
-                i += 1
-            elif isinstance(ind, Iterable):
-                old = self.coords[i][mask]
-                new = np.empty(shape=old.shape, dtype=old.dtype)
-                for j, item in enumerate(ind):
-                    new[old == item] = j
-                coords.append(new)
-                shape.append(len(ind))
-                i += 1
-            elif ind is None:
-                coords.append(np.zeros(n))
-                shape.append(1)
-
-        for j in range(i, self.ndim):
-            coords.append(self.coords[j][mask])
-            shape.append(self.shape[j])
+        view = _leading_view(self, index)
+        if view is not None:
+            return view
+
+        selection, coords, shape, is_sorted = _index_nonzeros(self, index)
+        n = self.coords[:, selection].shape[1]
 
         if coords:
             coords = np.stack(coords, axis=0)
         else:
             if last_ellipsis:
-                coords = np.empty((0, np.sum(mask)), dtype=np.uint8)
+                coords = np.empty((0, n), dtype=np.uint8)
             else:
-                if np.sum(mask) != 0:
-                    return self.data[mask][0]
+                if n != 0:
+                    return self.data[selection][0]
                 else:
                     return _zero_of_dtype(self.dtype)[()]
-        shape = tuple(shape)
-        data = self.data[mask]
+        data = self.data[selection]
 
         return COO(coords, data, shape=shape,
                    has_duplicates=self.has_duplicates,
-                   sorted=self.sorted)
+                   sorted=is_sorted)
+
+    def __setitem__(self, index, value):
+        """
+        Assigns to the given index, in place.
+
+        The whole assignment is done in a single merge of the nonzeros outside
+        the index with the nonzeros of ``value``, so assigning to many points
+        at once is much faster than assigning to each of them in turn.
+
+        Parameters
+        ----------
+        index
+            The index to assign to. Can be anything :obj:`COO.__getitem__` accepts.
+        value : Union[numpy.number, numpy.ndarray, COO, scipy.sparse.spmatrix]
+            The values to assign. Must be broadcastable to the shape of
+            ``self[index]``.
+
+        Raises
+        ------
+        IndexError
+            If the index is invalid.
+        ValueError
+            If ``value`` can't be broadcast to the shape of ``self[index]``.
+
+        Examples
+        --------
+        >>> s = COO.from_numpy(np.eye(3, dtype=np.int64))
+        >>> s[0, 2] = 5
+        >>> s[1] = 0
+        >>> s[[2, 0], [0, 0]] = [7, 8]
+        >>> s.todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([[8, 0, 5],
+               [0, 0, 0],
+               [7, 0, 1]])
+        """
+        if not isinstance(index, tuple):
+            index = (index,)
+
+        index = normalize_index(_expand_masks(index, self.shape), self.shape)
+        self.sum_duplicates()
+
+        # The nonzeros being assigned to are dropped.
+        selection, _, shape, _ = _index_nonzeros(self, index)
+        keep = np.ones(self.nnz, dtype=np.bool_)
+        keep[selection] = False
+
+        value = _as_assigned_value(value, shape)
+        coords = _index_sources(index, self.shape, value.coords)
+        linear = _linear_loc(coords, self.shape)
+
+        # Like in NumPy, the last assignment to a repeated point wins.
+        linear, last = np.unique(linear[::-1], return_index=True)
+        last = value.nnz - 1 - last
+        coords = coords[:, last]
+        data = value.data[last]
+
+        old_linear = self.linear_loc()[keep]
+        union, old_pos, new_pos = _merge_sorted(old_linear, linear.astype(old_linear.dtype))
+
+        new_coords = np.empty((self.ndim, len(union)), dtype=self.coords.dtype)
+        new_coords[:, old_pos] = self.coords[:, keep]
+        new_coords[:, new_pos] = coords
+        new_data = np.empty(len(union), dtype=self.dtype)
+        new_data[old_pos] = self.data[keep]
+        new_data[new_pos] = data
+
+        self.coords = new_coords
+        self.data = new_data
+        self.has_duplicates = False
+        self.sorted = True
+        self._clear_cache()
 
     def __str__(self):
         return "<COO: shape=%s, dtype=%s, nnz=%d, sorted=%s, duplicates=%s>" % (
@@ -628,11 +747,20 @@ class COO(SparseArray, NDArrayOperatorsMixin):
         See Also
         --------
         COO.reduce : Similar method without ``NaN`` skipping functionality.
+
+        Notes
+        -----
+        The ``NaN`` values are replaced with the identity inside the reduction,
+        in blocks of a fixed size, so the data of the array is never copied as
+        a whole.
         """
-        arr = _replace_nan(self, method.identity if identity is None else identity)
-        return arr.reduce(method, axis, keepdims, **kwargs)
+        nan_fill = None
+        if self.dtype.kind == 'f':
+            nan_fill = method.identity if identity is None else identity
 
-    def reduce(self, method, axis=(0,), keepdims=False, **kwargs):
+        return _reduce_along(self, method, axis, keepdims, nan_fill=nan_fill, **kwargs)
+
+    def reduce(self, method, axis=(0,), keepdims=False, allow_dense=False, **kwargs):
         """
         Performs a reduction operation on this array.
 
@@ -644,23 +772,32 @@ class COO(SparseArray, NDArrayOperatorsMixin):
             The axes along which to perform the reduction. Uses all axes by default.
         keepdims : bool, optional
             Whether or not to keep the dimensions of the original array.
+        allow_dense : bool, optional
+            Whether to return a :obj:`numpy.ndarray` if reducing an all-zero axis
+            would produce a nonzero result, instead of raising an error. The
+            result is computed from the nonzeros and the number of zeros along
+            every axis, so the array itself is never densified.
         kwargs : dict
             Any extra arguments to pass to the reduction operation.
 
         Returns
         -------
-        COO
-            The result of the reduction operation.
+        Union[COO, numpy.ndarray]
+            The result of the reduction operation. It's only a
+            :obj:`numpy.ndarray` if ``allow_dense`` is given and the result is
+            dense.
 
         Raises
         ------
         ValueError
-            If reducing an all-zero axis would produce a nonzero result.
+            If reducing an all-zero axis would produce a nonzero result, and
+            ``allow_dense`` isn't given.
 
         Notes
         -----
         This function internally calls :obj:`COO.sum_duplicates` to bring the array into
-        canonical form.
+        canonical form, except for sums, which don't depend on whether duplicates
+        are summed first.
 
         See Also
         --------
@@ -696,57 +833,15 @@ class COO(SparseArray, NDArrayOperatorsMixin):
 
         >>> s.reduce(np.add)
         <COO: shape=(5,), dtype=int64, nnz=5, sorted=True, duplicates=False>
-        """
-        zero_reduce_result = method.reduce([_zero_of_dtype(self.dtype)], **kwargs)
-
-        if zero_reduce_result != _zero_of_dtype(np.dtype(zero_reduce_result)):
-            raise ValueError("Performing this reduction operation would produce "
-                             "a dense result: %s" % str(method))
-
-        # Needed for more esoteric reductions like product.
-        self.sum_duplicates()
-
-        if axis is None:
-            axis = tuple(range(self.ndim))
-
-        if not isinstance(axis, tuple):
-            axis = (axis,)
-
-        axis = tuple(a if a >= 0 else a + self.ndim for a in axis)
-
-        if set(axis) == set(range(self.ndim)):
-            result = method.reduce(self.data, **kwargs)
-            if self.nnz != self.size:
-                result = method(result, _zero_of_dtype(self.dtype)[()], **kwargs)
-        else:
-            axis = tuple(axis)
-            neg_axis = tuple(ax for ax in range(self.ndim) if ax not in set(axis))
-
-            a = self.transpose(neg_axis + axis)
-            a = a.reshape((np.prod([self.shape[d] for d in neg_axis]),
-                           np.prod([self.shape[d] for d in axis])))
-            a.sort_indices()
-
-            result, inv_idx, counts = _grouped_reduce(a.data, a.coords[0], method, **kwargs)
-            missing_counts = counts != a.shape[1]
-            result[missing_counts] = method(result[missing_counts],
-                                            _zero_of_dtype(self.dtype), **kwargs)
-            coords = a.coords[0:1, inv_idx]
-
-            # Filter out zeros
-            mask = result != _zero_of_dtype(result.dtype)
-            coords = coords[:, mask]
-            result = result[mask]
-
-            a = COO(coords, result, shape=(a.shape[0],),
-                    has_duplicates=False, sorted=True)
 
-            a = a.reshape(tuple(self.shape[d] for d in neg_axis))
-            result = a
+        Reductions that give a nonzero result for lines of zeros need
+        :code:`allow_dense`.
 
-        if keepdims:
-            result = _keepdims(self, result, axis)
-        return result
+        >>> s = COO.from_numpy(np.array([[0.0, 1.0], [0.0, 0.0]]))
+        >>> s.reduce(np.logaddexp, axis=1, allow_dense=True)
+        array([1.31326169, 0.69314718])
+        """
+        return _reduce_along(self, method, axis, keepdims, allow_dense, **kwargs)
 
     def sum(self, axis=None, keepdims=False, dtype=None, out=None):
         """
@@ -774,8 +869,8 @@ class COO(SparseArray, NDArrayOperatorsMixin):
 
         Notes
         -----
-        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
-          canonical form.
+        * Unlike most reductions, this function doesn't need to call
+          :obj:`COO.sum_duplicates`, so it leaves the array as it is.
         * The :code:`out` parameter is provided just for compatibility with Numpy and
           isn't actually supported.
 
@@ -1001,1054 +1096,3098 @@ class COO(SparseArray, NDArrayOperatorsMixin):
         assert out is None
         return self.reduce(np.multiply, axis=axis, keepdims=keepdims, dtype=dtype)
 
-    def transpose(self, axes=None):
+    def mean(self, axis=None, keepdims=False, dtype=None, out=None):
         """
-        Returns a new array which has the order of the axes switched.
+        Compute the mean along the given axes. Uses all axes by default.
 
         Parameters
         ----------
-        axes : Iterable[int], optional
-            The new order of the axes compared to the previous one. Reverses the axes
-            by default.
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to compute the mean. Uses all axes by default.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
+        dtype: numpy.dtype
+            The data type of the output array. Defaults to :code:`float64` for
+            integers and booleans, and to the type of the array otherwise.
 
         Returns
         -------
         COO
-            The new array with the axes in the desired order.
+            The reduced output sparse array.
 
         See Also
         --------
-        :obj:`COO.T` : A quick property to reverse the order of the axes.
-        numpy.ndarray.transpose : Numpy equivalent function.
+        :obj:`numpy.mean` : Equivalent numpy function.
+
+        Notes
+        -----
+        * The mean is computed as a sum, so the array isn't brought into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
         Examples
         --------
-        We can change the order of the dimensions of any :obj:`COO` array with this
-        function.
-
-        >>> x = np.add.outer(np.arange(5), np.arange(5)[::-1])
-        >>> x  # doctest: +NORMALIZE_WHITESPACE
-        array([[4, 3, 2, 1, 0],
-               [5, 4, 3, 2, 1],
-               [6, 5, 4, 3, 2],
-               [7, 6, 5, 4, 3],
-               [8, 7, 6, 5, 4]])
+        >>> x = np.array([[0, 2, 4], [0, 0, 0]])
         >>> s = COO.from_numpy(x)
-        >>> s.transpose((1, 0)).todense()  # doctest: +NORMALIZE_WHITESPACE
-        array([[4, 5, 6, 7, 8],
-               [3, 4, 5, 6, 7],
-               [2, 3, 4, 5, 6],
-               [1, 2, 3, 4, 5],
-               [0, 1, 2, 3, 4]])
+        >>> s.mean(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([2., 0.])
+        >>> s.mean()
+        1.0
+        """
+        assert out is None
 
-        Note that by default, this reverses the order of the axes rather than switching
-        the last and second-to-last axes as required by some linear algebra operations.
+        if axis is None:
+            axis = tuple(range(self.ndim))
 
-        >>> x = np.random.rand(2, 3, 4)
-        >>> s = COO.from_numpy(x)
-        >>> s.transpose().shape
-        (4, 3, 2)
-        """
-        if axes is None:
-            axes = list(reversed(range(self.ndim)))
+        if not isinstance(axis, tuple):
+            axis = (axis,)
 
-        # Normalize all axe indices to posivite values
-        axes = np.array(axes)
-        axes[axes < 0] += self.ndim
+        if dtype is None:
+            dtype = np.float64 if self.dtype.kind in 'iub' else self.dtype
 
-        if np.any(axes >= self.ndim) or np.any(axes < 0):
-            raise ValueError("invalid axis for this array")
+        dtype = np.dtype(dtype)
+        # Like in Numpy, half-precision sums are accumulated in single precision.
+        sum_dtype = np.float32 if dtype == np.float16 else dtype
 
-        if len(np.unique(axes)) < len(axes):
-            raise ValueError("repeated axis in transpose")
+        n = reduce(operator.mul, (self.shape[ax] for ax in axis), 1)
+        result = self.sum(axis=axis, keepdims=keepdims, dtype=sum_dtype) / n
+        return result.astype(dtype)
 
-        if not len(axes) == self.ndim:
-            raise ValueError("axes don't match array")
+    def var(self, axis=None, keepdims=False, dtype=None, out=None, ddof=0):
+        """
+        Compute the variance along the given axes. Uses all axes by default.
 
-        # Normalize all axe indices to posivite values
-        try:
-            axes = np.arange(self.ndim)[list(axes)]
-        except IndexError:
-            raise ValueError("invalid axis for this array")
+        The variance of every group of nonzeros is computed in two passes over
+        them, one for their mean and one for their deviations from it, and then
+        merged with that of its implicit zeros, so the array is never densified.
 
-        if len(np.unique(axes)) < len(axes):
-            raise ValueError("repeated axis in transpose")
+        Parameters
+        ----------
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to compute the variance. Uses all axes by default.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
+        dtype: numpy.dtype
+            The data type to compute the variance in. Defaults to :code:`float64`
+            for integers and booleans, and to the type of the array otherwise.
+        ddof : int, optional
+            The delta degrees of freedom. The divisor is the number of elements
+            minus ``ddof``.
 
-        if not len(axes) == self.ndim:
-            raise ValueError("axes don't match array")
+        Returns
+        -------
+        COO
+            The reduced output sparse array.
 
-        axes = tuple(axes)
+        See Also
+        --------
+        :obj:`numpy.var` : Equivalent numpy function.
+        COO.std : Compute the standard deviation.
 
-        if axes == tuple(range(self.ndim)):
-            return self
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
-        if self._cache is not None:
-            for ax, value in self._cache['transpose']:
-                if ax == axes:
-                    return value
+        Examples
+        --------
+        >>> x = np.array([[0, 2, 4], [0, 0, 0]])
+        >>> s = COO.from_numpy(x)
+        >>> s.var(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([2.66666667, 0.        ])
+        """
+        assert out is None
 
-        shape = tuple(self.shape[ax] for ax in axes)
-        result = COO(self.coords[axes, :], self.data, shape,
-                     has_duplicates=self.has_duplicates,
-                     cache=self._cache is not None)
+        if dtype is None:
+            dtype = np.float64 if self.dtype.kind in 'iub' else self.dtype
 
-        if self._cache is not None:
-            self._cache['transpose'].append((axes, result))
-        return result
+        return _grouped_stats(self, axis, keepdims,
+                              partial(_grouped_var, ddof=ddof, dtype=np.dtype(dtype)))
 
-    @property
-    def T(self):
+    def std(self, axis=None, keepdims=False, dtype=None, out=None, ddof=0):
         """
-        Returns a new array which has the order of the axes reversed.
+        Compute the standard deviation along the given axes. Uses all axes by default.
+
+        Parameters
+        ----------
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to compute the standard deviation. Uses all axes by
+            default.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
+        dtype: numpy.dtype
+            The data type to compute the standard deviation in. Defaults to
+            :code:`float64` for integers and booleans, and to the type of the
+            array otherwise.
+        ddof : int, optional
+            The delta degrees of freedom. The divisor is the number of elements
+            minus ``ddof``.
 
         Returns
         -------
         COO
-            The new array with the axes in the desired order.
+            The reduced output sparse array.
 
         See Also
         --------
-        :obj:`COO.transpose` : A method where you can specify the order of the axes.
-        numpy.ndarray.T : Numpy equivalent property.
+        :obj:`numpy.std` : Equivalent numpy function.
+        COO.var : Compute the variance.
+
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
         Examples
         --------
-        We can change the order of the dimensions of any :obj:`COO` array with this
-        function.
-
-        >>> x = np.add.outer(np.arange(5), np.arange(5)[::-1])
-        >>> x  # doctest: +NORMALIZE_WHITESPACE
-        array([[4, 3, 2, 1, 0],
-               [5, 4, 3, 2, 1],
-               [6, 5, 4, 3, 2],
-               [7, 6, 5, 4, 3],
-               [8, 7, 6, 5, 4]])
-        >>> s = COO.from_numpy(x)
-        >>> s.T.todense()  # doctest: +NORMALIZE_WHITESPACE
-        array([[4, 5, 6, 7, 8],
-               [3, 4, 5, 6, 7],
-               [2, 3, 4, 5, 6],
-               [1, 2, 3, 4, 5],
-               [0, 1, 2, 3, 4]])
-
-        Note that by default, this reverses the order of the axes rather than switching
-        the last and second-to-last axes as required by some linear algebra operations.
-
-        >>> x = np.random.rand(2, 3, 4)
+        >>> x = np.array([[0, 2, 4], [0, 0, 0]])
         >>> s = COO.from_numpy(x)
-        >>> s.T.shape
-        (4, 3, 2)
+        >>> s.std(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([1.63299316, 0.        ])
         """
-        return self.transpose(tuple(range(self.ndim))[::-1])
+        return np.sqrt(self.var(axis=axis, keepdims=keepdims, dtype=dtype, out=out, ddof=ddof))
 
-    def dot(self, other):
+    def argmax(self, axis=None, out=None):
         """
-        Performs the equivalent of :code:`x.dot(y)` for :obj:`COO`.
+        Find the indices of the maximum values along an axis. Uses the flattened
+        array by default.
+
+        If the maximum of a line is an implicit zero, the index of the first
+        implicit zero is found without densifying the line.
 
         Parameters
         ----------
-        other : Union[COO, numpy.ndarray, scipy.sparse.spmatrix]
-            The second operand of the dot product operation.
+        axis : int, optional
+            The axis along which to search. Searches the flattened array by default.
 
         Returns
         -------
-        {COO, numpy.ndarray}
-            The result of the dot product. If the result turns out to be dense,
-            then a dense array is returned, otherwise, a sparse array.
+        Union[COO, numpy.intp]
+            The indices of the first maximum values.
 
         See Also
         --------
-        dot : Equivalent function for two arguments.
-        :obj:`numpy.dot` : Numpy equivalent function.
-        scipy.sparse.coo_matrix.dot : Scipy equivalent function.
+        :obj:`numpy.argmax` : Equivalent numpy function.
+        COO.argmin : Find the indices of the minimum values.
+
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
         Examples
         --------
-        >>> x = np.arange(4).reshape((2, 2))
+        >>> x = np.array([[0, 2, 4], [-1, 0, -3]])
         >>> s = COO.from_numpy(x)
-        >>> s.dot(s) # doctest: +SKIP
-        array([[ 2,  3],
-               [ 6, 11]], dtype=int64)
+        >>> s.argmax(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([2, 1])
+        >>> s.argmax()
+        2
         """
-        return dot(self, other)
-
-    def __matmul__(self, other):
-        try:
-            return dot(self, other)
-        except NotImplementedError:
-            return NotImplemented
-
-    def __rmatmul__(self, other):
-        try:
-            return dot(other, self)
-        except NotImplementedError:
-            return NotImplemented
-
-    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
-        out = kwargs.pop('out', None)
-        if out is not None:
-            return NotImplemented
+        assert out is None
 
-        if method == '__call__':
-            return elemwise(ufunc, *inputs, **kwargs)
-        elif method == 'reduce':
-            return COO._reduce(ufunc, *inputs, **kwargs)
-        else:
-            return NotImplemented
+        if axis is not None:
+            axis = _normalize_axis(axis, self.ndim)
 
-    def __array__(self, dtype=None, **kwargs):
-        x = self.todense()
-        if dtype and x.dtype != dtype:
-            x = x.astype(dtype)
-        return x
+        return _grouped_stats(self, axis, False, partial(_grouped_arg_extreme, method=np.maximum))
 
-    def linear_loc(self, signed=False):
+    def argmin(self, axis=None, out=None):
         """
-        The nonzero coordinates of a flattened version of this array. Note that
-        the coordinates may be out of order.
+        Find the indices of the minimum values along an axis. Uses the flattened
+        array by default.
+
+        If the minimum of a line is an implicit zero, the index of the first
+        implicit zero is found without densifying the line.
 
         Parameters
         ----------
-        signed : bool, optional
-            Whether to use a signed datatype for the output array. :code:`False`
-            by default.
+        axis : int, optional
+            The axis along which to search. Searches the flattened array by default.
 
         Returns
         -------
-        numpy.ndarray
-            The flattened coordinates.
+        Union[COO, numpy.intp]
+            The indices of the first minimum values.
 
         See Also
         --------
-        :obj:`numpy.flatnonzero` : Equivalent Numpy function.
+        :obj:`numpy.argmin` : Equivalent numpy function.
+        COO.argmax : Find the indices of the maximum values.
+
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
         Examples
         --------
-        >>> x = np.eye(5)
+        >>> x = np.array([[0, 2, 4], [-1, 0, -3]])
         >>> s = COO.from_numpy(x)
-        >>> s.linear_loc()  # doctest: +NORMALIZE_WHITESPACE
-        array([ 0,  6, 12, 18, 24], dtype=uint8)
-        >>> np.array_equal(np.flatnonzero(x), s.linear_loc())
-        True
+        >>> s.argmin(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([0, 2])
+        >>> s.argmin()
+        5
         """
-        return _linear_loc(self.coords, self.shape, signed)
+        assert out is None
 
-    def reshape(self, shape):
+        if axis is not None:
+            axis = _normalize_axis(axis, self.ndim)
+
+        return _grouped_stats(self, axis, False, partial(_grouped_arg_extreme, method=np.minimum))
+
+    def any(self, axis=None, keepdims=False, out=None):
         """
-        Returns a new :obj:`COO` array that is a reshaped version of this array.
+        Test whether any element along the given axes is nonzero. Uses all axes
+        by default.
 
         Parameters
         ----------
-        shape : tuple[int]
-            The desired shape of the output array.
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to test. Uses all axes by default.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
 
         Returns
         -------
         COO
-            The reshaped output array.
+            The reduced output sparse array.
 
         See Also
         --------
-        numpy.ndarray.reshape : The equivalent Numpy function.
+        :obj:`numpy.any` : Equivalent numpy function.
+        COO.all : Test whether all elements are nonzero.
+
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
         Examples
         --------
-        >>> s = COO.from_numpy(np.arange(25))
-        >>> s2 = s.reshape((5, 5))
-        >>> s2.todense()  # doctest: +NORMALIZE_WHITESPACE
-        array([[ 0,  1,  2,  3,  4],
-               [ 5,  6,  7,  8,  9],
-               [10, 11, 12, 13, 14],
-               [15, 16, 17, 18, 19],
-               [20, 21, 22, 23, 24]])
+        >>> x = np.array([[0, 2, 4], [0, 0, 0]])
+        >>> s = COO.from_numpy(x)
+        >>> s.any(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([ True, False])
         """
-        if self.shape == shape:
-            return self
-        if any(d == -1 for d in shape):
-            extra = int(self.size /
-                        np.prod([d for d in shape if d != -1]))
-            shape = tuple([d if d != -1 else extra for d in shape])
-
-        if self.shape == shape:
-            return self
-
-        if self._cache is not None:
-            for sh, value in self._cache['reshape']:
-                if sh == shape:
-                    return value
-
-        # TODO: this self.size enforces a 2**64 limit to array size
-        linear_loc = self.linear_loc()
-
-        max_shape = max(shape) if len(shape) != 0 else 1
-        coords = np.empty((len(shape), self.nnz), dtype=np.min_scalar_type(max_shape - 1))
-        strides = 1
-        for i, d in enumerate(shape[::-1]):
-            coords[-(i + 1), :] = (linear_loc // strides) % d
-            strides *= d
-
-        result = COO(coords, self.data, shape,
-                     has_duplicates=self.has_duplicates,
-                     sorted=self.sorted, cache=self._cache is not None)
-
-        if self._cache is not None:
-            self._cache['reshape'].append((shape, result))
-        return result
+        assert out is None
+        return self.reduce(np.logical_or, axis=axis, keepdims=keepdims)
 
-    def to_scipy_sparse(self):
+    def all(self, axis=None, keepdims=False, out=None):
         """
-        Converts this :obj:`COO` object into a :obj:`scipy.sparse.coo_matrix`.
+        Test whether all elements along the given axes are nonzero. Uses all axes
+        by default.
+
+        Parameters
+        ----------
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to test. Uses all axes by default.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
 
         Returns
         -------
-        :obj:`scipy.sparse.coo_matrix`
-            The converted Scipy sparse matrix.
-
-        Raises
-        ------
-        ValueError
-            If the array is not two-dimensional.
+        COO
+            The reduced output sparse array.
 
         See Also
         --------
-        COO.tocsr : Convert to a :obj:`scipy.sparse.csr_matrix`.
-        COO.tocsc : Convert to a :obj:`scipy.sparse.csc_matrix`.
-        """
-        if self.ndim != 2:
-            raise ValueError("Can only convert a 2-dimensional array to a Scipy sparse matrix.")
-
-        result = scipy.sparse.coo_matrix((self.data,
-                                          (self.coords[0],
-                                           self.coords[1])),
-                                         shape=self.shape)
-        result.has_canonical_format = (not self.has_duplicates and self.sorted)
-        return result
-
-    def _tocsr(self):
-        if self.ndim != 2:
-            raise ValueError('This array must be two-dimensional for this conversion '
-                             'to work.')
+        :obj:`numpy.all` : Equivalent numpy function.
+        COO.any : Test whether any element is nonzero.
 
-        # Pass 1: sum duplicates
-        self.sum_duplicates()
+        Notes
+        -----
+        * This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+          canonical form.
+        * The :code:`out` parameter is provided just for compatibility with Numpy and
+          isn't actually supported.
 
-        # Pass 2: sort indices
-        self.sort_indices()
-        row, col = self.coords
+        Examples
+        --------
+        >>> x = np.array([[1, 2, 4], [0, 3, 0]])
+        >>> s = COO.from_numpy(x)
+        >>> s.all(axis=1).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([ True, False])
+        """
+        assert out is None
+        return self.reduce(np.logical_and, axis=axis, keepdims=keepdims)
 
-        # Pass 3: count nonzeros in each row
-        indptr = np.zeros(self.shape[0] + 1, dtype=np.int64)
-        np.cumsum(np.bincount(row, minlength=self.shape[0]), out=indptr[1:])
+    def aggregate(self, axis=None, ops=('sum', 'min', 'max', 'count', 'mean'), keepdims=False):
+        """
+        Compute several statistics along the given axes at once. Uses all axes by
+        default.
 
-        return scipy.sparse.csr_matrix((self.data, col, indptr), shape=self.shape)
+        The nonzeros are grouped along the axes only once, and every statistic is
+        computed from the same groups, so this costs about as much as a single
+        reduction.
 
-    def tocsr(self):
-        """
-        Converts this array to a :obj:`scipy.sparse.csr_matrix`.
+        Parameters
+        ----------
+        axis : Union[int, Iterable[int]], optional
+            The axes along which to compute the statistics. Uses all axes by default.
+        ops : Iterable[str], optional
+            The statistics to compute. Any of ``'sum'``, ``'prod'``, ``'min'``,
+            ``'max'``, ``'count'``, ``'mean'``, ``'var'`` and ``'std'``. The
+            count is the number of nonzeros, like :obj:`numpy.count_nonzero`.
+        keepdims : bool, optional
+            Whether or not to keep the dimensions of the original array.
 
         Returns
         -------
-        scipy.sparse.csr_matrix
-            The result of the conversion.
+        dict
+            The result of every statistic, keyed by its name. Each one is the same
+            as that of the corresponding method, such as :obj:`COO.sum`.
 
         Raises
         ------
         ValueError
-            If the array is not two-dimensional.
+            If a statistic isn't known.
 
         See Also
         --------
-        COO.tocsc : Convert to a :obj:`scipy.sparse.csc_matrix`.
-        COO.to_scipy_sparse : Convert to a :obj:`scipy.sparse.coo_matrix`.
-        scipy.sparse.coo_matrix.tocsr : Equivalent Scipy function.
-        """
-        if self._cache is not None:
-            try:
-                return self._csr
-            except AttributeError:
-                pass
-            try:
-                self._csr = self._csc.tocsr()
-                return self._csr
-            except AttributeError:
-                pass
+        COO.reduce : Reduce with any :code:`ufunc`.
 
-            self._csr = csr = self._tocsr()
-        else:
-            csr = self._tocsr()
-        return csr
+        Notes
+        -----
+        This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+        canonical form.
 
-    def tocsc(self):
+        Examples
+        --------
+        >>> x = np.array([[0, 2, 4], [-1, 0, 0]])
+        >>> s = COO.from_numpy(x)
+        >>> result = s.aggregate(axis=1, ops=('max', 'count', 'mean'))
+        >>> result['max'].todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([4, 0])
+        >>> result['count'].todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([2, 1])
+        >>> result['mean'].todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([ 2.        , -0.33333333])
         """
-        Converts this array to a :obj:`scipy.sparse.csc_matrix`.
+        if isinstance(ops, str):
+            ops = (ops,)
+
+        float_dtype = np.dtype(np.float64 if self.dtype.kind in 'iub' else self.dtype)
+        stats = {
+            'sum': partial(_grouped_sum, dtype=np.add.reduce(self.data[:0]).dtype),
+            'prod': partial(_grouped_extreme, method=np.multiply),
+            'min': partial(_grouped_extreme, method=np.minimum),
+            'max': partial(_grouped_extreme, method=np.maximum),
+            'count': _grouped_count,
+            'mean': partial(_grouped_mean, dtype=float_dtype),
+            'var': partial(_grouped_var, ddof=0, dtype=float_dtype),
+            'std': partial(_grouped_std, dtype=float_dtype),
+        }
+
+        for op in ops:
+            if op not in stats:
+                raise ValueError("Unknown statistic %r, must be one of %s."
+                                 % (op, tuple(sorted(stats))))
+
+        return _grouped_stats(self, axis, keepdims, {op: stats[op] for op in ops})
+
+    def transpose(self, axes=None):
+        """
+        Returns a new array which has the order of the axes switched.
+
+        Parameters
+        ----------
+        axes : Iterable[int], optional
+            The new order of the axes compared to the previous one. Reverses the axes
+            by default.
 
         Returns
         -------
-        scipy.sparse.csc_matrix
-            The result of the conversion.
-
-        Raises
-        ------
-        ValueError
-            If the array is not two-dimensional.
+        COO
+            The new array with the axes in the desired order.
 
         See Also
         --------
-        COO.tocsr : Convert to a :obj:`scipy.sparse.csr_matrix`.
-        COO.to_scipy_sparse : Convert to a :obj:`scipy.sparse.coo_matrix`.
-        scipy.sparse.coo_matrix.tocsc : Equivalent Scipy function.
-        """
-        if self._cache is not None:
-            try:
-                return self._csc
-            except AttributeError:
-                pass
-            try:
-                self._csc = self._csr.tocsc()
-                return self._csc
-            except AttributeError:
-                pass
-
-            self._csc = csc = self.tocsr().tocsc()
-        else:
-            csc = self.tocsr().tocsc()
-
-        return csc
+        :obj:`COO.T` : A quick property to reverse the order of the axes.
+        numpy.ndarray.transpose : Numpy equivalent function.
 
-    def sort_indices(self):
+        Examples
+        --------
+        We can change the order of the dimensions of any :obj:`COO` array with this
+        function.
+
+        >>> x = np.add.outer(np.arange(5), np.arange(5)[::-1])
+        >>> x  # doctest: +NORMALIZE_WHITESPACE
+        array([[4, 3, 2, 1, 0],
+               [5, 4, 3, 2, 1],
+               [6, 5, 4, 3, 2],
+               [7, 6, 5, 4, 3],
+               [8, 7, 6, 5, 4]])
+        >>> s = COO.from_numpy(x)
+        >>> s.transpose((1, 0)).todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([[4, 5, 6, 7, 8],
+               [3, 4, 5, 6, 7],
+               [2, 3, 4, 5, 6],
+               [1, 2, 3, 4, 5],
+               [0, 1, 2, 3, 4]])
+
+        Note that by default, this reverses the order of the axes rather than switching
+        the last and second-to-last axes as required by some linear algebra operations.
+
+        >>> x = np.random.rand(2, 3, 4)
+        >>> s = COO.from_numpy(x)
+        >>> s.transpose().shape
+        (4, 3, 2)
         """
-        Sorts the :obj:`COO.coords` attribute. Also sorts the data in
-        :obj:`COO.data` to match.
+        if axes is None:
+            axes = list(reversed(range(self.ndim)))
+
+        # Normalize all axe indices to posivite values
+        axes = np.array(axes)
+        axes[axes < 0] += self.ndim
+
+        if np.any(axes >= self.ndim) or np.any(axes < 0):
+            raise ValueError("invalid axis for this array")
+
+        if len(np.unique(axes)) < len(axes):
+            raise ValueError("repeated axis in transpose")
+
+        if not len(axes) == self.ndim:
+            raise ValueError("axes don't match array")
+
+        # Normalize all axe indices to posivite values
+        try:
+            axes = np.arange(self.ndim)[list(axes)]
+        except IndexError:
+            raise ValueError("invalid axis for this array")
+
+        if len(np.unique(axes)) < len(axes):
+            raise ValueError("repeated axis in transpose")
+
+        if not len(axes) == self.ndim:
+            raise ValueError("axes don't match array")
+
+        axes = tuple(axes)
+
+        if axes == tuple(range(self.ndim)):
+            return self
+
+        if self._cache is not None:
+            for ax, value in self._cache['transpose']:
+                if ax == axes:
+                    return value
+
+        shape = tuple(self.shape[ax] for ax in axes)
+        result = COO(self.coords[axes, :], self.data, shape,
+                     has_duplicates=self.has_duplicates,
+                     cache=self._cache is not None)
+
+        if self._cache is not None:
+            self._cache['transpose'].append((axes, result))
+        return result
+
+    @property
+    def T(self):
+        """
+        Returns a new array which has the order of the axes reversed.
+
+        Returns
+        -------
+        COO
+            The new array with the axes in the desired order.
+
+        See Also
+        --------
+        :obj:`COO.transpose` : A method where you can specify the order of the axes.
+        numpy.ndarray.T : Numpy equivalent property.
 
         Examples
         --------
-        >>> coords = np.array([[1, 2, 0]], dtype=np.uint8)
-        >>> data = np.array([4, 1, 3], dtype=np.uint8)
-        >>> s = COO(coords, data)
-        >>> s.sort_indices()
-        >>> s.coords  # doctest: +NORMALIZE_WHITESPACE
-        array([[0, 1, 2]], dtype=uint8)
-        >>> s.data  # doctest: +NORMALIZE_WHITESPACE
-        array([3, 4, 1], dtype=uint8)
-        """
-        if self.sorted:
-            return
+        We can change the order of the dimensions of any :obj:`COO` array with this
+        function.
 
-        linear = self.linear_loc(signed=True)
+        >>> x = np.add.outer(np.arange(5), np.arange(5)[::-1])
+        >>> x  # doctest: +NORMALIZE_WHITESPACE
+        array([[4, 3, 2, 1, 0],
+               [5, 4, 3, 2, 1],
+               [6, 5, 4, 3, 2],
+               [7, 6, 5, 4, 3],
+               [8, 7, 6, 5, 4]])
+        >>> s = COO.from_numpy(x)
+        >>> s.T.todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([[4, 5, 6, 7, 8],
+               [3, 4, 5, 6, 7],
+               [2, 3, 4, 5, 6],
+               [1, 2, 3, 4, 5],
+               [0, 1, 2, 3, 4]])
 
-        if (np.diff(linear) > 0).all():  # already sorted
-            self.sorted = True
-            return
+        Note that by default, this reverses the order of the axes rather than switching
+        the last and second-to-last axes as required by some linear algebra operations.
 
-        order = np.argsort(linear)
-        self.coords = self.coords[:, order]
-        self.data = self.data[order]
-        self.sorted = True
+        >>> x = np.random.rand(2, 3, 4)
+        >>> s = COO.from_numpy(x)
+        >>> s.T.shape
+        (4, 3, 2)
+        """
+        return self.transpose(tuple(range(self.ndim))[::-1])
 
-    def sum_duplicates(self):
+    def dot(self, other):
         """
-        Sums data corresponding to duplicates in :obj:`COO.coords`.
+        Performs the equivalent of :code:`x.dot(y)` for :obj:`COO`.
+
+        Parameters
+        ----------
+        other : Union[COO, numpy.ndarray, scipy.sparse.spmatrix]
+            The second operand of the dot product operation.
+
+        Returns
+        -------
+        {COO, numpy.ndarray}
+            The result of the dot product. If the result turns out to be dense,
+            then a dense array is returned, otherwise, a sparse array.
 
         See Also
         --------
-        scipy.sparse.coo_matrix.sum_duplicates : Equivalent Scipy function.
+        dot : Equivalent function for two arguments.
+        :obj:`numpy.dot` : Numpy equivalent function.
+        scipy.sparse.coo_matrix.dot : Scipy equivalent function.
 
         Examples
         --------
-        >>> coords = np.array([[0, 1, 1, 2]], dtype=np.uint8)
-        >>> data = np.array([6, 5, 2, 2], dtype=np.uint8)
-        >>> s = COO(coords, data)
-        >>> s.sum_duplicates()
-        >>> s.coords  # doctest: +NORMALIZE_WHITESPACE
-        array([[0, 1, 2]], dtype=uint8)
-        >>> s.data  # doctest: +NORMALIZE_WHITESPACE
-        array([6, 7, 2], dtype=uint8)
+        >>> x = np.arange(4).reshape((2, 2))
+        >>> s = COO.from_numpy(x)
+        >>> s.dot(s) # doctest: +SKIP
+        array([[ 2,  3],
+               [ 6, 11]], dtype=int64)
         """
-        # Inspired by scipy/sparse/coo.py::sum_duplicates
-        # See https://github.com/scipy/scipy/blob/master/LICENSE.txt
-        if not self.has_duplicates and self.sorted:
-            return
-        if not self.coords.size:
-            return
+        return dot(self, other)
 
-        self.sort_indices()
+    def __matmul__(self, other):
+        try:
+            return dot(self, other)
+        except NotImplementedError:
+            return NotImplemented
 
-        linear = self.linear_loc()
-        unique_mask = np.diff(linear) != 0
+    def __rmatmul__(self, other):
+        try:
+            return dot(other, self)
+        except NotImplementedError:
+            return NotImplemented
 
-        if unique_mask.sum() == len(unique_mask):  # already unique
-            self.has_duplicates = False
-            return
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        from .lazy import LazyCOO
 
-        unique_mask = np.append(True, unique_mask)
+        # Let lazy expressions record the operation instead.
+        if any(isinstance(x, LazyCOO) for x in inputs):
+            return NotImplemented
 
-        coords = self.coords[:, unique_mask]
-        (unique_inds,) = np.nonzero(unique_mask)
-        data = np.add.reduceat(self.data, unique_inds, dtype=self.data.dtype)
+        out = kwargs.pop('out', None)
+        if out is not None:
+            if method != '__call__' or len(out) != 1 or not isinstance(out[0], COO):
+                return NotImplemented
 
-        self.data = data
-        self.coords = coords
-        self.has_duplicates = False
+            return _elemwise_out(ufunc, out[0], *inputs, **kwargs)
 
-    def broadcast_to(self, shape):
+        if method == '__call__':
+            return elemwise(ufunc, *inputs, **kwargs)
+        elif method == 'reduce':
+            return COO._reduce(ufunc, *inputs, **kwargs)
+        elif method == 'accumulate':
+            return _accumulate(ufunc, *inputs, **kwargs)
+        elif method == 'reduceat':
+            return _reduceat(ufunc, *inputs, **kwargs)
+        elif method == 'outer':
+            return _outer(ufunc, *inputs, **kwargs)
+        else:
+            return NotImplemented
+
+    def __array__(self, dtype=None, **kwargs):
+        x = self.todense()
+        if dtype and x.dtype != dtype:
+            x = x.astype(dtype)
+        return x
+
+    def linear_loc(self, signed=False):
         """
-        Performs the equivalent of :obj:`numpy.broadcast_to` for :obj:`COO`. Note that
-        this function returns a new array instead of a view.
+        The nonzero coordinates of a flattened version of this array. Note that
+        the coordinates may be out of order.
 
         Parameters
         ----------
-        shape : tuple[int]
-            The shape to broadcast the data to.
+        signed : bool, optional
+            Whether to use a signed datatype for the output array. :code:`False`
+            by default.
 
         Returns
         -------
-        COO
-            The broadcasted sparse array.
+        numpy.ndarray
+            The flattened coordinates.
 
-        Raises
-        ------
-        ValueError
-            If the operand cannot be broadcast to the given shape.
+        See Also
+        --------
+        :obj:`numpy.flatnonzero` : Equivalent Numpy function.
 
-        See also
+        Examples
         --------
-        :obj:`numpy.broadcast_to` : NumPy equivalent function
+        >>> x = np.eye(5)
+        >>> s = COO.from_numpy(x)
+        >>> s.linear_loc()  # doctest: +NORMALIZE_WHITESPACE
+        array([ 0,  6, 12, 18, 24], dtype=uint8)
+        >>> np.array_equal(np.flatnonzero(x), s.linear_loc())
+        True
         """
-        if shape == self.shape:
-            return self
+        return _linear_loc(self.coords, self.shape, signed)
 
-        result_shape = _get_broadcast_shape(self.shape, shape, is_result=True)
-        params = _get_broadcast_parameters(self.shape, result_shape)
-        coords, data = _get_expanded_coords_data(self.coords, self.data, params, result_shape)
+    def get_values(self, coords):
+        """
+        Gets the values of this array at many coordinates at once.
+
+        The coordinates are looked up by binary search in the sorted linear
+        locations of the nonzeros, so this is much faster than indexing with
+        one coordinate at a time, which scans all the nonzeros every time.
+
+        Parameters
+        ----------
+        coords : numpy.ndarray
+            The integer coordinates to look up, with shape :code:`(ndim, k)`, or
+            :code:`(ndim,)` for a single point. Negative coordinates count from
+            the end of each axis.
+
+        Returns
+        -------
+        Union[numpy.ndarray, numpy.generic]
+            The values at the coordinates, with shape :code:`(k,)`, or a scalar
+            for a single point. Coordinates with no nonzero give zero.
+
+        Raises
+        ------
+        ValueError
+            If :code:`coords` doesn't have one row for each dimension.
+        IndexError
+            If any of the coordinates are out of bounds, or aren't integers.
+
+        Notes
+        -----
+        This function internally calls :obj:`COO.sum_duplicates` to bring the
+        array into canonical form.
+
+        See Also
+        --------
+        COO.__getitem__ : Index an array.
+
+        Examples
+        --------
+        >>> s = COO.from_numpy(np.eye(3, dtype=np.int64) * 4)
+        >>> s.get_values(np.array([[0, 1, 2, -1], [0, 0, 2, 0]]))
+        array([4, 0, 4, 0])
+        >>> s.get_values([1, 1])
+        4
+        """
+        coords = np.asarray(coords)
+        if coords.dtype.kind not in 'iu' and coords.size:
+            raise IndexError("only integer coordinates are valid, got dtype %s"
+                             % coords.dtype)
+
+        single = coords.ndim == 1 and len(coords) == self.ndim
+        if not single and (coords.ndim != 2 or coords.shape[0] != self.ndim):
+            raise ValueError("coords must have shape (ndim, k) or (ndim,), got %s for "
+                             "an array with %d dimensions" % (coords.shape, self.ndim))
+
+        if self.ndim and (single or coords.shape[1] == 1):
+            # A single point is found by a binary search along each axis, like
+            # when indexing, without sorting the points or searching for them.
+            self.sum_duplicates()
+            value = _get_point(self, _normalize_simple_index(tuple(coords.ravel().tolist()),
+                                                            self.shape))
+            return value if single else np.array([value], dtype=self.dtype)
+
+        coords = coords.astype(np.intp)
+        shape = np.array(self.shape, dtype=np.intp)[:, None]
+        coords = np.where(coords < 0, coords + shape, coords)
+        if np.any((coords < 0) | (coords >= shape)):
+            raise IndexError("coordinates out of bounds for shape %s" % (self.shape,))
+
+        self.sum_duplicates()
+        dtype = np.min_scalar_type(max(self.shape) - 1) if self.shape else np.uint8
+        linear = self.linear_loc()
+        points = _linear_loc(coords.astype(dtype), self.shape)
+
+        # Searching for the points in order is about twice as fast as searching
+        # for them in random order, because the searches then touch memory in
+        # order too.
+        order = np.argsort(points)
+        points = points[order]
+        pos = np.searchsorted(linear, points)
+        np.minimum(pos, max(self.nnz - 1, 0), out=pos)
+        found = linear[pos] == points if self.nnz else np.zeros(len(points), dtype=np.bool_)
+
+        values = np.zeros(len(points), dtype=self.dtype)
+        values[order[found]] = self.data[pos[found]]
+        return values
+
+    def reshape(self, shape):
+        """
+        Returns a new :obj:`COO` array that is a reshaped version of this array.
+
+        Parameters
+        ----------
+        shape : tuple[int]
+            The desired shape of the output array.
+
+        Returns
+        -------
+        COO
+            The reshaped output array.
+
+        See Also
+        --------
+        numpy.ndarray.reshape : The equivalent Numpy function.
+
+        Examples
+        --------
+        >>> s = COO.from_numpy(np.arange(25))
+        >>> s2 = s.reshape((5, 5))
+        >>> s2.todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([[ 0,  1,  2,  3,  4],
+               [ 5,  6,  7,  8,  9],
+               [10, 11, 12, 13, 14],
+               [15, 16, 17, 18, 19],
+               [20, 21, 22, 23, 24]])
+        """
+        if self.shape == shape:
+            return self
+        if any(d == -1 for d in shape):
+            extra = int(self.size /
+                        np.prod([d for d in shape if d != -1]))
+            shape = tuple([d if d != -1 else extra for d in shape])
+
+        if self.shape == shape:
+            return self
+
+        if self._cache is not None:
+            for sh, value in self._cache['reshape']:
+                if sh == shape:
+                    return value
+
+        # TODO: this self.size enforces a 2**64 limit to array size
+        coords = _get_coords_from_linear_loc(self.linear_loc(), shape)
+
+        result = COO(coords, self.data, shape,
+                     has_duplicates=self.has_duplicates,
+                     sorted=self.sorted, cache=self._cache is not None)
+
+        if self._cache is not None:
+            self._cache['reshape'].append((shape, result))
+        return result
+
+    def to_scipy_sparse(self):
+        """
+        Converts this :obj:`COO` object into a :obj:`scipy.sparse.coo_matrix`.
+
+        Returns
+        -------
+        :obj:`scipy.sparse.coo_matrix`
+            The converted Scipy sparse matrix.
+
+        Raises
+        ------
+        ValueError
+            If the array is not two-dimensional.
+
+        See Also
+        --------
+        COO.tocsr : Convert to a :obj:`scipy.sparse.csr_matrix`.
+        COO.tocsc : Convert to a :obj:`scipy.sparse.csc_matrix`.
+        """
+        if self.ndim != 2:
+            raise ValueError("Can only convert a 2-dimensional array to a Scipy sparse matrix.")
+
+        result = scipy.sparse.coo_matrix((self.data,
+                                          (self.coords[0],
+                                           self.coords[1])),
+                                         shape=self.shape)
+        result.has_canonical_format = (not self.has_duplicates and self.sorted)
+        return result
+
+    def _tocsr(self):
+        if self.ndim != 2:
+            raise ValueError('This array must be two-dimensional for this conversion '
+                             'to work.')
+
+        # Pass 1: sum duplicates
+        self.sum_duplicates()
+
+        # Pass 2: sort indices
+        self.sort_indices()
+        row, col = self.coords
+
+        # Pass 3: count nonzeros in each row
+        indptr = np.zeros(self.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row, minlength=self.shape[0]), out=indptr[1:])
+
+        return scipy.sparse.csr_matrix((self.data, col, indptr), shape=self.shape)
+
+    def tocsr(self):
+        """
+        Converts this array to a :obj:`scipy.sparse.csr_matrix`.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            The result of the conversion.
+
+        Raises
+        ------
+        ValueError
+            If the array is not two-dimensional.
+
+        See Also
+        --------
+        COO.tocsc : Convert to a :obj:`scipy.sparse.csc_matrix`.
+        COO.to_scipy_sparse : Convert to a :obj:`scipy.sparse.coo_matrix`.
+        scipy.sparse.coo_matrix.tocsr : Equivalent Scipy function.
+        """
+        if self._cache is not None:
+            try:
+                return self._csr
+            except AttributeError:
+                pass
+            try:
+                self._csr = self._csc.tocsr()
+                return self._csr
+            except AttributeError:
+                pass
+
+            self._csr = csr = self._tocsr()
+        else:
+            csr = self._tocsr()
+        return csr
+
+    def tocsc(self):
+        """
+        Converts this array to a :obj:`scipy.sparse.csc_matrix`.
+
+        Returns
+        -------
+        scipy.sparse.csc_matrix
+            The result of the conversion.
+
+        Raises
+        ------
+        ValueError
+            If the array is not two-dimensional.
+
+        See Also
+        --------
+        COO.tocsr : Convert to a :obj:`scipy.sparse.csr_matrix`.
+        COO.to_scipy_sparse : Convert to a :obj:`scipy.sparse.coo_matrix`.
+        scipy.sparse.coo_matrix.tocsc : Equivalent Scipy function.
+        """
+        if self._cache is not None:
+            try:
+                return self._csc
+            except AttributeError:
+                pass
+            try:
+                self._csc = self._csr.tocsc()
+                return self._csc
+            except AttributeError:
+                pass
+
+            self._csc = csc = self.tocsr().tocsc()
+        else:
+            csc = self.tocsr().tocsc()
+
+        return csc
+
+    def sort_indices(self):
+        """
+        Sorts the :obj:`COO.coords` attribute. Also sorts the data in
+        :obj:`COO.data` to match.
+
+        Examples
+        --------
+        >>> coords = np.array([[1, 2, 0]], dtype=np.uint8)
+        >>> data = np.array([4, 1, 3], dtype=np.uint8)
+        >>> s = COO(coords, data)
+        >>> s.sort_indices()
+        >>> s.coords  # doctest: +NORMALIZE_WHITESPACE
+        array([[0, 1, 2]], dtype=uint8)
+        >>> s.data  # doctest: +NORMALIZE_WHITESPACE
+        array([3, 4, 1], dtype=uint8)
+        """
+        if self.sorted:
+            return
+
+        linear = self.linear_loc(signed=True)
+
+        if (np.diff(linear) > 0).all():  # already sorted
+            self.sorted = True
+            return
+
+        order = np.argsort(linear)
+        self.coords = self.coords[:, order]
+        self.data = self.data[order]
+        self.sorted = True
+
+    def sum_duplicates(self):
+        """
+        Sums data corresponding to duplicates in :obj:`COO.coords`.
+
+        See Also
+        --------
+        scipy.sparse.coo_matrix.sum_duplicates : Equivalent Scipy function.
+
+        Examples
+        --------
+        >>> coords = np.array([[0, 1, 1, 2]], dtype=np.uint8)
+        >>> data = np.array([6, 5, 2, 2], dtype=np.uint8)
+        >>> s = COO(coords, data)
+        >>> s.sum_duplicates()
+        >>> s.coords  # doctest: +NORMALIZE_WHITESPACE
+        array([[0, 1, 2]], dtype=uint8)
+        >>> s.data  # doctest: +NORMALIZE_WHITESPACE
+        array([6, 7, 2], dtype=uint8)
+        """
+        # Inspired by scipy/sparse/coo.py::sum_duplicates
+        # See https://github.com/scipy/scipy/blob/master/LICENSE.txt
+        if not self.has_duplicates and self.sorted:
+            return
+        if not self.coords.size:
+            return
+
+        self.sort_indices()
+
+        linear = self.linear_loc()
+        unique_mask = np.diff(linear) != 0
+
+        if unique_mask.sum() == len(unique_mask):  # already unique
+            self.has_duplicates = False
+            return
+
+        unique_mask = np.append(True, unique_mask)
+
+        coords = self.coords[:, unique_mask]
+        (unique_inds,) = np.nonzero(unique_mask)
+        data = np.add.reduceat(self.data, unique_inds, dtype=self.data.dtype)
+
+        self.data = data
+        self.coords = coords
+        self.has_duplicates = False
+
+    def broadcast_to(self, shape):
+        """
+        Performs the equivalent of :obj:`numpy.broadcast_to` for :obj:`COO`. Note that
+        this function returns a new array instead of a view.
+
+        Parameters
+        ----------
+        shape : tuple[int]
+            The shape to broadcast the data to.
+
+        Returns
+        -------
+        COO
+            The broadcasted sparse array.
+
+        Raises
+        ------
+        ValueError
+            If the operand cannot be broadcast to the given shape.
+
+        See also
+        --------
+        :obj:`numpy.broadcast_to` : NumPy equivalent function
+        """
+        if shape == self.shape:
+            return self
+
+        result_shape = _get_broadcast_shape(self.shape, shape, is_result=True)
+        params = _get_broadcast_parameters(self.shape, result_shape)
+        coords, data = _get_expanded_coords_data(self.coords, self.data, params, result_shape)
+
+        # The expanded coordinates stay sorted unless a broadcast dimension
+        # comes between two of the original ones.
+        kept = [bool(p) for p in params]
+        kept = kept[kept.index(True):] if any(kept) else []
+        is_sorted = self.sorted and kept == sorted(kept, reverse=True)
+
+        return COO(coords, data, shape=result_shape, has_duplicates=self.has_duplicates,
+                   sorted=is_sorted)
+
+    def round(self, decimals=0, out=None):
+        """
+        Evenly round to the given number of decimals.
+
+        See also
+        --------
+        :obj:`numpy.round` : NumPy equivalent ufunc.
+        :obj:`COO.elemwise`: Apply an arbitrary element-wise function to one or two
+            arguments.
+
+        Notes
+        -----
+        The :code:`out` parameter is provided just for compatibility with Numpy and isn't
+        actually supported.
+        """
+        assert out is None
+        return elemwise(np.round, self, decimals=decimals)
+
+    def astype(self, dtype, out=None):
+        """
+        Copy of the array, cast to a specified type.
+
+        See also
+        --------
+        scipy.sparse.coo_matrix.astype : SciPy sparse equivalent function
+        numpy.ndarray.astype : NumPy equivalent ufunc.
+        :obj:`COO.elemwise`: Apply an arbitrary element-wise function to one or two
+            arguments.
+
+        Notes
+        -----
+        The :code:`out` parameter is provided just for compatibility with Numpy and isn't
+        actually supported.
+        """
+        assert out is None
+        return elemwise(np.ndarray.astype, self, dtype=dtype)
+
+    def lazy(self):
+        """
+        Wraps this array in a :obj:`LazyCOO`. Element-wise operations on the result
+        are recorded instead of being performed right away, and then evaluated
+        together in a single fused pass by :obj:`LazyCOO.compute`.
+
+        Returns
+        -------
+        LazyCOO
+            The lazily evaluated array.
+
+        See Also
+        --------
+        LazyCOO : The lazily evaluated expression class.
+
+        Examples
+        --------
+        >>> a = COO.from_numpy(np.eye(3))
+        >>> b = COO.from_numpy(np.ones((3, 3)))
+        >>> expr = a.lazy() * b + a - b
+        >>> expr
+        <LazyCOO: shape=(3, 3), operands=2>
+        >>> expr.compute().todense()  # doctest: +NORMALIZE_WHITESPACE
+        array([[ 1., -1., -1.],
+               [-1.,  1., -1.],
+               [-1., -1.,  1.]])
+        """
+        from .lazy import LazyCOO
+        return LazyCOO(self)
+
+    def maybe_densify(self, max_size=1000, min_density=0.25):
+        """
+        Converts this :obj:`COO` array to a :obj:`numpy.ndarray` if not too
+        costly.
+
+        Parameters
+        ----------
+        max_size : int
+            Maximum number of elements in output
+        min_density : float
+            Minimum density of output
+
+        Returns
+        -------
+        numpy.ndarray
+            The dense array.
+
+        Raises
+        -------
+        ValueError
+            If the returned array would be too large.
+
+        Examples
+        --------
+        Convert a small sparse array to a dense array.
+
+        >>> s = COO.from_numpy(np.random.rand(2, 3, 4))
+        >>> x = s.maybe_densify()
+        >>> np.allclose(x, s.todense())
+        True
+
+        You can also specify the minimum allowed density or the maximum number
+        of output elements. If both conditions are unmet, this method will throw
+        an error.
+
+        >>> x = np.zeros((5, 5), dtype=np.uint8)
+        >>> x[2, 2] = 1
+        >>> s = COO.from_numpy(x)
+        >>> s.maybe_densify(max_size=5, min_density=0.25)
+        Traceback (most recent call last):
+            ...
+        ValueError: Operation would require converting large sparse array to dense
+        """
+        if self.size <= max_size or self.density >= min_density:
+            return self.todense()
+        else:
+            raise ValueError("Operation would require converting "
+                             "large sparse array to dense")
+
+
+def tensordot(a, b, axes=2):
+    """
+    Perform the equivalent of :obj:`numpy.tensordot`.
+
+    Parameters
+    ----------
+    a, b : Union[COO, np.ndarray, scipy.sparse.spmatrix]
+        The arrays to perform the :code:`tensordot` operation on.
+    axes : tuple[Union[int, tuple[int], Union[int, tuple[int]], optional
+        The axes to match when performing the sum.
+
+    Returns
+    -------
+    Union[COO, numpy.ndarray]
+        The result of the operation.
+
+    See Also
+    --------
+    numpy.tensordot : NumPy equivalent function
+    """
+    # Much of this is stolen from numpy/core/numeric.py::tensordot
+    # Please see license at https://github.com/numpy/numpy/blob/master/LICENSE.txt
+    try:
+        iter(axes)
+    except TypeError:
+        axes_a = list(range(-axes, 0))
+        axes_b = list(range(0, axes))
+    else:
+        axes_a, axes_b = axes
+    try:
+        na = len(axes_a)
+        axes_a = list(axes_a)
+    except TypeError:
+        axes_a = [axes_a]
+        na = 1
+    try:
+        nb = len(axes_b)
+        axes_b = list(axes_b)
+    except TypeError:
+        axes_b = [axes_b]
+        nb = 1
+
+    # a, b = asarray(a), asarray(b)  # <--- modified
+    as_ = a.shape
+    nda = a.ndim
+    bs = b.shape
+    ndb = b.ndim
+    equal = True
+    if na != nb:
+        equal = False
+    else:
+        for k in range(na):
+            if as_[axes_a[k]] != bs[axes_b[k]]:
+                equal = False
+                break
+            if axes_a[k] < 0:
+                axes_a[k] += nda
+            if axes_b[k] < 0:
+                axes_b[k] += ndb
+    if not equal:
+        raise ValueError("shape-mismatch for sum")
+
+    # Move the axes to sum over to the end of "a"
+    # and to the front of "b"
+    notin = [k for k in range(nda) if k not in axes_a]
+    newaxes_a = notin + axes_a
+    N2 = 1
+    for axis in axes_a:
+        N2 *= as_[axis]
+    newshape_a = (-1, N2)
+    olda = [as_[axis] for axis in notin]
+
+    notin = [k for k in range(ndb) if k not in axes_b]
+    newaxes_b = axes_b + notin
+    N2 = 1
+    for axis in axes_b:
+        N2 *= bs[axis]
+    newshape_b = (N2, -1)
+    oldb = [bs[axis] for axis in notin]
+
+    at = a.transpose(newaxes_a).reshape(newshape_a)
+    bt = b.transpose(newaxes_b).reshape(newshape_b)
+    res = _dot(at, bt)
+    if isinstance(res, scipy.sparse.spmatrix):
+        if res.nnz > reduce(operator.mul, res.shape) / 2:
+            res = res.todense()
+        else:
+            res = COO.from_scipy_sparse(res)  # <--- modified
+            res.has_duplicates = False
+    if isinstance(res, np.matrix):
+        res = np.asarray(res)
+    return res.reshape(olda + oldb)
+
+
+def dot(a, b):
+    """
+    Perform the equivalent of :obj:`numpy.dot` on two arrays.
+
+    Parameters
+    ----------
+    a, b : Union[COO, np.ndarray, scipy.sparse.spmatrix]
+        The arrays to perform the :code:`dot` operation on.
+
+    Returns
+    -------
+    Union[COO, numpy.ndarray]
+        The result of the operation.
+
+    See Also
+    --------
+    numpy.dot : NumPy equivalent function.
+    COO.dot : Equivalent function for COO objects.
+    """
+    if not hasattr(a, 'ndim') or not hasattr(b, 'ndim'):
+        raise NotImplementedError(
+            "Cannot perform dot product on types %s, %s" %
+            (type(a), type(b)))
+
+    if a.ndim == 1 and b.ndim == 1:
+        return (a * b).sum()
+
+    a_axis = -1
+    b_axis = -2
+
+    if b.ndim == 1:
+        b_axis = -1
+
+    return tensordot(a, b, axes=(a_axis, b_axis))
+
+
+def _dot(a, b):
+    if isinstance(a, COO):
+        a.sum_duplicates()
+    if isinstance(b, COO):
+        b.sum_duplicates()
+    if isinstance(b, COO) and not isinstance(a, COO):
+        return _dot(b.T, a.T).T
+    aa = a.tocsr()
+
+    if isinstance(b, (COO, scipy.sparse.spmatrix)):
+        b = b.tocsc()
+    return aa.dot(b)
+
+
+def _keepdims(original, new, axis):
+    shape = list(original.shape)
+    for ax in axis:
+        shape[ax] = 1
+    return new.reshape(shape)
+
+
+def _leading_range(x, ind):
+    """
+    Finds the range of nonzeros that an index along the leading axis can select
+    from, with the row pointer index if there is one, and by binary search
+    otherwise.
+
+    Parameters
+    ----------
+    x : COO
+        The array being indexed, with sorted coordinates.
+    ind : Union[int, slice]
+        The normalized index along the leading axis.
+
+    Returns
+    -------
+    start, stop : int
+        The bounds of the range of nonzeros.
+    """
+    dim = x.shape[0]
+    if not isinstance(ind, slice):
+        lo, hi = ind, ind + 1
+    else:
+        step = ind.step if ind.step is not None else 1
+        if step > 0:
+            lo = ind.start if ind.start is not None else 0
+            hi = ind.stop if ind.stop is not None else dim
+        else:
+            lo = ind.stop + 1 if ind.stop is not None else 0
+            hi = ind.start + 1 if ind.start is not None else dim
+
+    if lo >= hi:
+        return 0, 0
+
+    indptr = x._get_indptr()
+    if indptr is not None:
+        return int(indptr[min(lo, dim)]), int(indptr[min(hi, dim)])
+
+    return _searchsorted_range(x.coords[0], lo, min(hi, dim))
+
+
+def _searchsorted_range(a, lo, hi):
+    """
+    Finds the range of a sorted integer array with values from ``lo`` up to, but
+    not including, ``hi``, with a single call to :obj:`numpy.searchsorted`.
+    Unlike passing integers to :obj:`numpy.searchsorted`, this never casts
+    ``a`` to a larger dtype, as long as ``hi - 1`` fits in its dtype.
+    """
+    # Two searches for scalars of the same dtype are faster than one search
+    # for an array of two values, which has to be made first.
+    scalar = a.dtype.type
+    start = int(a.searchsorted(scalar(lo - 1), side='right')) if lo > 0 else 0
+    return start, int(a.searchsorted(scalar(hi - 1), side='right'))
+
+
+def _is_increasing_index(ind):
+    """
+    Whether an index along an axis keeps the order of the coordinates.
+    """
+    if isinstance(ind, slice):
+        return ind.step is None or ind.step > 0
+    elif isinstance(ind, Iterable):
+        return bool(np.all(np.diff(ind) > 0))
+
+    return True
+
+
+def _index_nonzeros(x, index):
+    """
+    Finds the nonzeros of an array that an index selects, and their
+    coordinates in the result.
+
+    Parameters
+    ----------
+    x : COO
+        The array being indexed.
+    index : tuple
+        The normalized index.
+
+    Returns
+    -------
+    selection : Union[slice, numpy.ndarray]
+        The positions of the selected nonzeros in ``x``, in the order of the result.
+    coords : list[numpy.ndarray]
+        The coordinates of the selected nonzeros in the result, along every axis.
+    shape : tuple[int]
+        The shape of the result.
+    is_sorted : bool
+        Whether the coordinates in the result are sorted.
+    """
+    index_dims = [ind for ind in index if ind is not None]
+    adv_positions, adv_axes, adv_index, adv_shape, adv_first = _get_advanced_index(index)
+    advanced = bool(adv_positions)
+
+    # Reversed or reordered axes make the result unsorted.
+    is_sorted = x.sorted and all(_is_increasing_index(ind) for ind in index_dims)
+    if advanced:
+        arrays = [ind for ind in index_dims if isinstance(ind, Iterable)]
+        is_sorted = is_sorted and not adv_first and len(arrays) == 1 and arrays[0].ndim == 1
+
+    # The nonzeros selected along the leading axis of a sorted array are
+    # contiguous, so they can be found with a binary search.
+    start, stop = 0, x.nnz
+    mask_index = [slice(None) if isinstance(ind, Iterable) else ind for ind in index_dims]
+    if x.sorted and index_dims and isinstance(index_dims[0], (numbers.Integral, slice)):
+        start, stop = _leading_range(x, index_dims[0])
+
+        if isinstance(mask_index[0], numbers.Integral) or mask_index[0].step in (None, 1, -1):
+            mask_index[0] = slice(None)
+
+    # Integers and slices select a subset of the nonzeros.
+    if all(ind == slice(None) for ind in mask_index):
+        selection = slice(start, stop)
+    else:
+        mask = _index_mask(x.coords[:, start:stop], mask_index, x.shape)
+        selection = np.flatnonzero(mask) + start
+
+    # Arrays are applied pointwise, as a join between the coordinates of the
+    # nonzeros and the points of the index along the advanced axes.
+    if advanced:
+        if isinstance(selection, slice):
+            selection = np.arange(start, stop)
+
+        sub_shape = tuple(x.shape[i] for i in adv_axes)
+        points = np.ravel_multi_index(adv_index, sub_shape)
+        keys = np.ravel_multi_index(tuple(x.coords[adv_axes][:, selection]), sub_shape)
+        matches, point_idx = _join_points(keys, points, int(np.prod(sub_shape)))
+
+        selection = selection[matches]
+        adv_coords = list(_get_coords_from_linear_loc(point_idx, adv_shape))
+
+    n = x.coords[:, selection].shape[1]
+
+    coords = []
+    shape = []
+    if adv_first:
+        coords.extend(adv_coords)
+        shape.extend(adv_shape)
+
+    i = 0
+    for pos, ind in enumerate(index):
+        if advanced and isinstance(ind, (numbers.Integral, Iterable)):
+            if not adv_first and pos == adv_positions[0]:
+                coords.extend(adv_coords)
+                shape.extend(adv_shape)
+            i += 1
+        elif isinstance(ind, numbers.Integral):
+            i += 1
+        elif isinstance(ind, slice):
+            start, step, length = _get_slice_bounds(ind, x.shape[i])
+            shape.append(length)
+
+            dt = np.min_scalar_type(min(-(dim - 1) if dim != 0 else -1 for dim in shape))
+            coords.append((x.coords[i, selection].astype(dt) - start) // step)
+            i += 1
+        elif ind is None:
+            coords.append(np.zeros(n))
+            shape.append(1)
+
+    for j in range(i, x.ndim):
+        coords.append(x.coords[j, selection])
+        shape.append(x.shape[j])
+
+    return selection, coords, tuple(shape), is_sorted
+
+
+def _normalize_simple_index(index, shape):
+    """
+    Normalizes an index made up of integers alone, or of a single slice, without
+    the overhead of :obj:`normalize_index`. These are the most common indices,
+    and are often used in tight loops.
+
+    Parameters
+    ----------
+    index : tuple
+        The index.
+    shape : tuple[int]
+        The shape of the array being indexed.
+
+    Returns
+    -------
+    Union[tuple, None]
+        The normalized index, or ``None`` if the index isn't of this form.
+
+    Raises
+    ------
+    IndexError
+        If an integer is out of bounds.
+    """
+    if not index or len(index) > len(shape):
+        return None
+
+    fill = (slice(None),) * (len(shape) - len(index))
+    if len(index) == 1 and isinstance(index[0], slice):
+        return (normalize_slice(sanitize_index(index[0]), shape[0]),) + fill
+
+    normalized = []
+    for ind, dim in zip(index, shape):
+        # Checking against the abstract numbers.Integral is slow, so the
+        # common case of a built-in integer is checked first.
+        if type(ind) is not int:
+            if not isinstance(ind, numbers.Integral) or isinstance(ind, bool):
+                return None
+
+        ind = int(ind)
+        if not -dim <= ind < dim:
+            check_index(ind, dim)
+
+        normalized.append(ind + dim if ind < 0 else ind)
+
+    return tuple(normalized) + fill
+
+
+def _get_point(x, index):
+    """
+    Gets the value of an array at a single point. If the coordinates are sorted,
+    they are sorted along every axis within the nonzeros that match along the
+    axes before it, so the point is found with a binary search along each axis
+    in turn.
+
+    Parameters
+    ----------
+    x : COO
+        The array.
+    index : tuple[int]
+        The normalized coordinates of the point.
+
+    Returns
+    -------
+    numpy.generic
+        The value at the point.
+    """
+    if x.sorted:
+        start, stop = _leading_range(x, index[0])
+        for coords, ind in zip(x.coords[1:], index[1:]):
+            if start == stop:
+                break
+
+            lo, hi = _searchsorted_range(coords[start:stop], ind, ind + 1)
+            start, stop = start + lo, start + hi
+    else:
+        mask = x.coords[0] == index[0]
+        for coords, ind in zip(x.coords[1:], index[1:]):
+            mask &= coords == ind
+
+        hits = np.flatnonzero(mask)
+        start = hits[0] if hits.size else 0
+        stop = start + bool(hits.size)
+
+    if start == stop:
+        return _zero_of_dtype(x.dtype)[()]
+
+    return x.data[start]
+
+
+def _leading_view(x, index):
+    """
+    Indexes a sorted array with an integer or a contiguous slice along the
+    leading axis, and nothing along the other axes. The selected nonzeros form
+    a contiguous block, so the result shares its data with ``x``, and its
+    coordinates too unless they have to be shifted.
+
+    Parameters
+    ----------
+    x : COO
+        The array being indexed.
+    index : tuple
+        The normalized index.
+
+    Returns
+    -------
+    Union[COO, None]
+        The result, or ``None`` if the index isn't of this form.
+    """
+    if not x.sorted or len(index) != x.ndim or not index:
+        return None
+
+    if not all(isinstance(ind, slice) and ind == slice(None) for ind in index[1:]):
+        return None
+
+    lead = index[0]
+    if isinstance(lead, slice):
+        if lead.step not in (None, 1):
+            return None
+
+        start, stop = _leading_range(x, lead)
+        offset, _, length = _get_slice_bounds(lead, x.shape[0])
+        coords = x.coords[:, start:stop]
+        if offset != 0:
+            coords = coords.copy()
+            coords[0] -= coords.dtype.type(offset)
+        shape = (length,) + x.shape[1:]
+    elif isinstance(lead, numbers.Integral):
+        if x.ndim == 1:
+            return None
+
+        start, stop = _leading_range(x, lead)
+        coords = x.coords[1:, start:stop]
+        shape = x.shape[1:]
+    else:
+        return None
+
+    # The coordinates keep their dtype even if a smaller one would fit the
+    # new shape, as casting them would copy them.
+    view = _wrap_coo(coords, x.data[start:stop], shape,
+                     has_duplicates=x.has_duplicates, sorted=True)
+    view._is_view = True
+    return view
+
+
+def _wrap_coo(coords, data, shape, has_duplicates, sorted):
+    """
+    Builds a :obj:`COO` array around the given arrays without copying them,
+    unlike the constructor, which always copies the coordinates.
+
+    The result may be returned to the caller, and share its coordinates with
+    another array. So the coordinates must already be owned by a validated
+    :obj:`COO` array (or be a fresh array built from such coordinates), and
+    must never be modified in place. This holds because :obj:`COO.sort_indices`,
+    :obj:`COO.sum_duplicates`, :obj:`COO.__setitem__` and every other
+    operation replace :code:`coords` with a new array instead of writing into it.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates. They must have an unsigned dtype that fits the shape.
+    data : numpy.ndarray
+        The data corresponding to ``coords``.
+    shape : tuple[int]
+        The shape of the array.
+    has_duplicates : bool
+        Whether there are duplicate coordinates.
+    sorted : bool
+        Whether the coordinates are sorted.
+
+    Returns
+    -------
+    COO
+        The array.
+    """
+    result = COO.__new__(COO)
+    # The shape is built from that of another array, so it needn't be checked.
+    result.shape = tuple(shape)
+    result._cache = None
+    result._row_index = None
+    result._is_view = False
+    result.coords = coords
+    result.data = data
+    result.has_duplicates = has_duplicates
+    result.sorted = sorted
+
+    return result
+
+
+def _index_sources(index, shape, coords):
+    """
+    Maps coordinates in the result of indexing an array back to the coordinates
+    in the array that they come from. The inverse of :obj:`_index_nonzeros`.
+
+    Parameters
+    ----------
+    index : tuple
+        The normalized index.
+    shape : tuple[int]
+        The shape of the array being indexed.
+    coords : numpy.ndarray
+        The coordinates in the result.
+
+    Returns
+    -------
+    numpy.ndarray
+        The coordinates in the array.
+    """
+    adv_positions, adv_axes, adv_index, adv_shape, adv_first = _get_advanced_index(index)
+    dtype = np.min_scalar_type(max(shape) - 1) if len(shape) != 0 else np.uint8
+    source = np.empty((len(shape), coords.shape[1]), dtype=dtype)
+
+    axis = 0
+    if adv_first:
+        adv_coords = coords[:len(adv_shape)]
+        axis = len(adv_shape)
+
+    i = 0
+    for pos, ind in enumerate(index):
+        if adv_positions and isinstance(ind, (numbers.Integral, Iterable)):
+            if not adv_first and pos == adv_positions[0]:
+                adv_coords = coords[axis:axis + len(adv_shape)]
+                axis += len(adv_shape)
+            i += 1
+        elif isinstance(ind, numbers.Integral):
+            source[i] = ind
+            i += 1
+        elif isinstance(ind, slice):
+            start, step, _ = _get_slice_bounds(ind, shape[i])
+            source[i] = start + coords[axis].astype(np.intp) * step
+            axis += 1
+            i += 1
+        elif ind is None:
+            axis += 1
+
+    if adv_positions:
+        points = np.ravel_multi_index(tuple(adv_coords.astype(np.intp)), adv_shape)
+        for ax, ind in zip(adv_axes, adv_index):
+            source[ax] = ind[points]
+
+    return source
+
+
+def _get_advanced_index(index):
+    """
+    Gets the advanced part of an index, made up of its arrays, and its
+    integers if there are any arrays.
+
+    Parameters
+    ----------
+    index : tuple
+        The normalized index.
+
+    Returns
+    -------
+    adv_positions : list[int]
+        The positions of the advanced entries in ``index``. Empty if there are no
+        arrays in ``index``.
+    adv_axes : list[int]
+        The axes of the indexed array they apply to.
+    adv_index : tuple[numpy.ndarray]
+        The advanced entries, broadcast together and flattened.
+    adv_shape : tuple[int]
+        The shape the advanced entries are broadcast to.
+    adv_first : bool
+        Whether the axes of the advanced index come first in the result, which
+        is the case if the advanced entries aren't next to each other.
+    """
+    if not any(isinstance(ind, Iterable) for ind in index):
+        return [], [], (), (), False
+
+    adv_positions = [i for i, ind in enumerate(index) if isinstance(ind, (numbers.Integral, Iterable))]
+    index_dims = [ind for ind in index if ind is not None]
+    adv_axes = [i for i, ind in enumerate(index_dims) if isinstance(ind, (numbers.Integral, Iterable))]
+
+    adv_index = np.broadcast_arrays(*[np.asarray(index_dims[i]) for i in adv_axes])
+    adv_shape = adv_index[0].shape
+    adv_index = tuple(ind.ravel() for ind in adv_index)
+    adv_first = adv_positions != list(range(adv_positions[0], adv_positions[-1] + 1))
+
+    return adv_positions, adv_axes, adv_index, adv_shape, adv_first
+
+
+def _get_slice_bounds(ind, dim):
+    """
+    Gets the first index, step and length of a normalized slice.
+    """
+    step = ind.step if ind.step is not None else 1
+    if step > 0:
+        start = ind.start if ind.start is not None else 0
+        start = max(start, 0)
+        stop = ind.stop if ind.stop is not None else dim
+        stop = min(stop, dim)
+        if start > stop:
+            start = stop
+        length = (stop - start + step - 1) // step
+    else:
+        start = ind.start if ind.start is not None else dim - 1
+        stop = ind.stop if ind.stop is not None else -1
+        start = min(start, dim - 1)
+        stop = max(stop, -1)
+        if start < stop:
+            start = stop
+        length = (start - stop - step - 1) // (-step)
+
+    return start, step, length
+
+
+def _as_assigned_value(value, shape):
+    """
+    Converts a value being assigned into a :obj:`COO` array of the given shape.
+
+    Parameters
+    ----------
+    value : Union[numpy.number, numpy.ndarray, COO, scipy.sparse.spmatrix]
+        The value being assigned.
+    shape : tuple[int]
+        The shape of the region being assigned to.
+
+    Returns
+    -------
+    COO
+        The value, broadcast to ``shape``, with sorted coordinates.
+
+    Raises
+    ------
+    ValueError
+        If the value can't be broadcast to ``shape``.
+    """
+    if isinstance(value, scipy.sparse.spmatrix):
+        value = COO.from_scipy_sparse(value)
+
+    if isinstance(value, SparseArray):
+        value = asCOO(value)
+        if _get_nary_broadcast_shape(value.shape, shape) != shape:
+            raise ValueError("could not broadcast input array from shape %s into shape %s"
+                             % (value.shape, shape))
+        value = value.broadcast_to(shape)
+        value.sum_duplicates()
+        return value
+
+    value = np.asarray(value)
+    if not value.shape:
+        # Every point of the region gets the same value.
+        if value == 0:
+            return COO(np.empty((len(shape), 0), dtype=np.intp), np.empty(0, dtype=value.dtype),
+                       shape=shape, has_duplicates=False, sorted=True)
+
+        size = int(np.prod(shape))
+        return COO(_get_coords_from_linear_loc(np.arange(size), shape),
+                   np.full(size, value[()]), shape=shape, has_duplicates=False, sorted=True)
+
+    return COO.from_numpy(np.broadcast_to(value, shape))
+
+
+def _join_points(keys, points, n_keys):
+    """
+    Joins the keys of the nonzeros with the keys of the points of an index.
+    Like in NumPy, a nonzero is repeated once for every time it's indexed.
+
+    Parameters
+    ----------
+    keys : numpy.ndarray
+        The linear locations of the nonzeros along the indexed axes.
+    points : numpy.ndarray
+        The linear locations of the points of the index along the indexed axes.
+    n_keys : int
+        The number of possible linear locations.
+
+    Returns
+    -------
+    matches : numpy.ndarray
+        The nonzero of every match.
+    point_idx : numpy.ndarray
+        The point of every match.
+    """
+    points = np.asarray(points, dtype=np.intp)
+    order = np.argsort(points, kind='mergesort')
+
+    if n_keys <= len(keys) + len(points):
+        # A lookup table over all keys is cheaper than a binary search.
+        table = np.bincount(points, minlength=n_keys)
+        lo = (np.cumsum(table) - table)[keys]
+        counts = table[keys]
+    else:
+        sorted_points = points[order]
+        lo = np.searchsorted(sorted_points, keys, side='left')
+        counts = np.searchsorted(sorted_points, keys, side='right') - lo
+
+    # The position in the sorted points of every match.
+    offsets = np.cumsum(counts) - counts
+    matches = np.arange(counts.sum()) - np.repeat(offsets - lo, counts)
+
+    return np.repeat(np.arange(len(keys)), counts), order[matches]
+
+
+def _expand_masks(index, shape):
+    """
+    Replaces boolean masks spanning several axes, either as
+    :obj:`numpy.ndarray` or :obj:`COO` objects, with the integer arrays of
+    their coordinates that are ``True``.
+
+    Parameters
+    ----------
+    index : tuple
+        The index.
+    shape : tuple[int]
+        The shape of the array being indexed.
+
+    Returns
+    -------
+    tuple
+        The index, without multidimensional masks.
+
+    Raises
+    ------
+    IndexError
+        If the shape of a mask doesn't match the array.
+    """
+    result = []
+    axis = 0
+    for ind in index:
+        if isinstance(ind, COO) and ind.dtype == np.bool_:
+            ind.sum_duplicates()
+            coords = ind.coords[:, ind.data]
+        elif isinstance(ind, np.ndarray) and ind.dtype == np.bool_ and ind.ndim > 1:
+            coords = np.nonzero(ind)
+        else:
+            result.append(ind)
+            if ind is Ellipsis:
+                axis = None
+            elif ind is not None and axis is not None:
+                axis += 1
+            continue
+
+        if axis is not None and ind.shape != tuple(shape[axis:axis + ind.ndim]):
+            raise IndexError("boolean index did not match indexed array; the index has shape "
+                             "%s but the corresponding array dimensions are %s"
+                             % (ind.shape, tuple(shape[axis:axis + ind.ndim])))
+
+        result.extend(coords)
+        if axis is not None:
+            axis += ind.ndim
+
+    return tuple(result)
+
+
+def _index_mask(coords, index, shape):
+    """
+    Gets a mask of the nonzeros that are selected by an index.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates of the nonzeros.
+    index : list
+        The normalized index, made up of only integers and slices.
+    shape : tuple[int]
+        The shape of the array being indexed.
+
+    Returns
+    -------
+    numpy.ndarray
+        The mask of the selected nonzeros.
+    """
+    kernels = _get_kernels()
+    if kernels is not None:
+        # Check all dimensions in a single pass over the nonzeros.
+        dims, starts, stops, steps = [], [], [], []
+        for i, ind in enumerate(index):
+            if isinstance(ind, numbers.Integral):
+                ind = slice(ind, ind + 1, 1)
+            elif ind == slice(None):
+                continue
+
+            step = ind.step if ind.step is not None else 1
+            if step > 0:
+                start = ind.start if ind.start is not None else 0
+                stop = ind.stop if ind.stop is not None else shape[i]
+            else:
+                start = ind.start if ind.start is not None else (shape[i] - 1)
+                stop = ind.stop if ind.stop is not None else -1
+
+            dims.append(i)
+            starts.append(start)
+            stops.append(stop)
+            steps.append(step)
+
+        return kernels.slice_mask(coords[dims], np.array(starts, dtype=np.int64),
+                                  np.array(stops, dtype=np.int64),
+                                  np.array(steps, dtype=np.int64))
+
+    mask = np.ones(coords.shape[1], dtype=np.bool)
+    for i, ind in enumerate(index):
+        if ind == slice(None):
+            continue
+        mask &= _mask(coords[i], ind, shape[i])
+
+    return mask
+
+
+def _mask(coords, idx, shape):
+    if isinstance(idx, numbers.Integral):
+        return coords == idx
+    elif isinstance(idx, slice):
+        step = idx.step if idx.step is not None else 1
+        if step > 0:
+            start = idx.start if idx.start is not None else 0
+            stop = idx.stop if idx.stop is not None else shape
+            return (coords >= start) & (coords < stop) & \
+                   (coords % step == start % step)
+        else:
+            start = idx.start if idx.start is not None else (shape - 1)
+            stop = idx.stop if idx.stop is not None else -1
+            return (coords <= start) & (coords > stop) & \
+                   (coords % step == start % step)
+
+
+def concatenate(arrays, axis=0):
+    """
+    Concatenate the input arrays along the given dimension.
+
+    Parameters
+    ----------
+    arrays : Iterable[Union[COO, numpy.ndarray, scipy.sparse.spmatrix]]
+        The input arrays to concatenate.
+    axis : int, optional
+        The axis along which to concatenate the input arrays. The default is zero.
+
+    Returns
+    -------
+    COO
+        The output concatenated array.
+
+    See Also
+    --------
+    numpy.concatenate : NumPy equivalent function
+    """
+    arrays = [x if isinstance(x, COO) else COO(x) for x in arrays]
+    if axis < 0:
+        axis = axis + arrays[0].ndim
+    assert all(x.shape[ax] == arrays[0].shape[ax]
+               for x in arrays
+               for ax in set(range(arrays[0].ndim)) - {axis})
+    nnz = 0
+    dim = sum(x.shape[axis] for x in arrays)
+    shape = list(arrays[0].shape)
+    shape[axis] = dim
+
+    coords_dtype = np.min_scalar_type(max(shape) - 1) if len(shape) != 0 else np.uint8
+    data = np.concatenate([x.data for x in arrays])
+    coords = np.concatenate([x.coords for x in arrays], axis=1).astype(coords_dtype)
+
+    dim = 0
+    for x in arrays:
+        if dim:
+            coords[axis, nnz:x.nnz + nnz] += dim
+        dim += x.shape[axis]
+        nnz += x.nnz
+
+    has_duplicates = any(x.has_duplicates for x in arrays)
+
+    return COO(coords, data, shape=shape, has_duplicates=has_duplicates,
+               sorted=(axis == 0) and all(a.sorted for a in arrays))
+
+
+def stack(arrays, axis=0):
+    """
+    Stack the input arrays along the given dimension.
+
+    Parameters
+    ----------
+    arrays : Iterable[Union[COO, numpy.ndarray, scipy.sparse.spmatrix]]
+        The input arrays to stack.
+    axis : int, optional
+        The axis along which to stack the input arrays.
+
+    Returns
+    -------
+    COO
+        The output stacked array.
+
+    See Also
+    --------
+    numpy.stack : NumPy equivalent function
+    """
+    assert len(set(x.shape for x in arrays)) == 1
+    arrays = [x if isinstance(x, COO) else COO(x) for x in arrays]
+    if axis < 0:
+        axis = axis + arrays[0].ndim + 1
+    data = np.concatenate([x.data for x in arrays])
+    coords = np.concatenate([x.coords for x in arrays], axis=1)
+    shape = list(arrays[0].shape)
+    shape.insert(axis, len(arrays))
+
+    coords_dtype = np.min_scalar_type(max(shape) - 1) if len(shape) != 0 else np.uint8
+
+    nnz = 0
+    dim = 0
+    new = np.empty(shape=(coords.shape[1],), dtype=coords_dtype)
+    for x in arrays:
+        new[nnz:x.nnz + nnz] = dim
+        dim += 1
+        nnz += x.nnz
+
+    has_duplicates = any(x.has_duplicates for x in arrays)
+    coords = [coords[i].astype(coords_dtype) for i in range(coords.shape[0])]
+    coords.insert(axis, new)
+    coords = np.stack(coords, axis=0)
+
+    return COO(coords, data, shape=shape, has_duplicates=has_duplicates,
+               sorted=(axis == 0) and all(a.sorted for a in arrays))
+
+
+def triu(x, k=0):
+    """
+    Returns an array with all elements below the k-th diagonal set to zero.
+
+    Parameters
+    ----------
+    x : COO
+        The input array.
+    k : int, optional
+        The diagonal below which elements are set to zero. The default is
+        zero, which corresponds to the main diagonal.
+
+    Returns
+    -------
+    COO
+        The output upper-triangular matrix.
+
+    See Also
+    --------
+    numpy.triu : NumPy equivalent function
+    """
+    if not x.ndim >= 2:
+        raise NotImplementedError('sparse.triu is not implemented for scalars or 1-D arrays.')
+
+    mask = x.coords[-2] + k <= x.coords[-1]
+
+    coords = x.coords[:, mask]
+    data = x.data[mask]
+
+    return COO(coords, data, x.shape, x.has_duplicates, x.sorted)
+
+
+def tril(x, k=0):
+    """
+    Returns an array with all elements above the k-th diagonal set to zero.
+
+    Parameters
+    ----------
+    x : COO
+        The input array.
+    k : int, optional
+        The diagonal above which elements are set to zero. The default is
+        zero, which corresponds to the main diagonal.
+
+    Returns
+    -------
+    COO
+        The output lower-triangular matrix.
+
+    See Also
+    --------
+    numpy.tril : NumPy equivalent function
+    """
+    if not x.ndim >= 2:
+        raise NotImplementedError('sparse.tril is not implemented for scalars or 1-D arrays.')
+
+    mask = x.coords[-2] + k >= x.coords[-1]
+
+    coords = x.coords[:, mask]
+    data = x.data[mask]
+
+    return COO(coords, data, x.shape, x.has_duplicates, x.sorted)
+
+
+def _reduce_along(x, method, axis, keepdims, allow_dense=False, nan_fill=None, **kwargs):
+    """
+    Performs a reduction operation on an array, for :obj:`COO.reduce` and
+    :obj:`COO.nanreduce`.
+
+    Parameters
+    ----------
+    x : COO
+        The array to reduce.
+    method : numpy.ufunc
+        The :code:`ufunc` to reduce with.
+    axis : Union[int, Iterable[int], None]
+        The axes along which to reduce.
+    keepdims : bool
+        Whether or not to keep the dimensions of the original array.
+    allow_dense : bool, optional
+        Whether to return a :obj:`numpy.ndarray` for a dense result instead of
+        raising an error.
+    nan_fill : numpy.number, optional
+        The value to reduce in place of every ``NaN``. ``NaN`` values are kept
+        if it isn't given.
+    kwargs : dict
+        Any extra arguments to pass to the reduction.
 
-        return COO(coords, data, shape=result_shape, has_duplicates=self.has_duplicates,
-                   sorted=self.sorted)
+    Returns
+    -------
+    Union[COO, numpy.ndarray, numpy.generic]
+        The result of the reduction operation.
+    """
+    if axis is None:
+        axis = tuple(range(x.ndim))
+
+    if not isinstance(axis, tuple):
+        axis = (axis,)
+
+    axis = tuple(a if a >= 0 else a + x.ndim for a in axis)
+
+    # Lines with only zeros reduce to this, so the result is dense if it's nonzero.
+    n = reduce(operator.mul, (x.shape[d] for d in axis), 1)
+    zero_reduce_result = _reduce_zeros(method, max(n, 1), x.dtype, **kwargs)[0]
+    dense = zero_reduce_result != _zero_of_dtype(zero_reduce_result.dtype)
+
+    if dense and not allow_dense:
+        raise ValueError("Performing this reduction operation would produce "
+                         "a dense result: %s" % str(method))
+
+    # Needed for more esoteric reductions like product. Sums give the same
+    # result whether or not duplicates are summed first, so there's no
+    # need to sort the array or to modify it.
+    if not _is_duplicate_safe(method, x.dtype, zero_reduce_result.dtype):
+        x.sum_duplicates()
+
+    if set(axis) == set(range(x.ndim)):
+        result = _filled_reduce(method, x.data, nan_fill, **kwargs)
+        if x.nnz != x.size:
+            # Sums may have more nonzeros than elements, as they keep duplicates.
+            zeros = _reduce_zeros(method, max(x.size - x.nnz, 1), x.dtype, **kwargs)[0]
+            result = method(result, zeros, **kwargs)
+    else:
+        neg_axis = tuple(ax for ax in range(x.ndim) if ax not in set(axis))
+        result = _reduce_to_axes(x, method, neg_axis, zero_reduce_result.dtype,
+                                 dense=dense, nan_fill=nan_fill, **kwargs)
 
-    def round(self, decimals=0, out=None):
-        """
-        Evenly round to the given number of decimals.
+    if keepdims:
+        result = _keepdims(x, result, axis)
+    return result
 
-        See also
-        --------
-        :obj:`numpy.round` : NumPy equivalent ufunc.
-        :obj:`COO.elemwise`: Apply an arbitrary element-wise function to one or two
-            arguments.
 
-        Notes
-        -----
-        The :code:`out` parameter is provided just for compatibility with Numpy and isn't
-        actually supported.
-        """
-        assert out is None
-        return elemwise(np.round, self, decimals=decimals)
+def _reduce_zeros(method, counts, zero_dtype, **kwargs):
+    """
+    Reduces the given numbers of zeros with a :code:`ufunc`, without making any
+    arrays of zeros.
 
-    def astype(self, dtype, out=None):
-        """
-        Copy of the array, cast to a specified type.
+    The reductions of one, two, four and so on zeros are found by repeatedly
+    reducing the previous one with itself, and combined according to the bits
+    of every count, like in exponentiation by squaring. This takes a number of
+    steps logarithmic in the largest count.
 
-        See also
-        --------
-        scipy.sparse.coo_matrix.astype : SciPy sparse equivalent function
-        numpy.ndarray.astype : NumPy equivalent ufunc.
-        :obj:`COO.elemwise`: Apply an arbitrary element-wise function to one or two
-            arguments.
+    Parameters
+    ----------
+    method : numpy.ufunc
+        The :code:`ufunc` to reduce with.
+    counts : Union[int, numpy.ndarray]
+        The numbers of zeros, all positive.
+    zero_dtype : numpy.dtype
+        The dtype of the zeros.
+    kwargs : dict
+        Any extra arguments to pass to the reduction.
 
-        Notes
-        -----
-        The :code:`out` parameter is provided just for compatibility with Numpy and isn't
-        actually supported.
-        """
-        assert out is None
-        return elemwise(np.ndarray.astype, self, dtype=dtype)
+    Returns
+    -------
+    numpy.ndarray
+        The reductions, as a one-dimensional array.
+    """
+    counts = np.atleast_1d(np.asarray(counts, dtype=np.int64))
+    power = method.reduce(np.zeros(1, dtype=zero_dtype), **kwargs)
+    result = np.empty(len(counts), dtype=np.asarray(power).dtype)
 
-    def maybe_densify(self, max_size=1000, min_density=0.25):
-        """
-        Converts this :obj:`COO` array to a :obj:`numpy.ndarray` if not too
-        costly.
+    if method(power, power, **kwargs) == power:
+        # Reducing any number of zeros gives the same result, as for most ufuncs.
+        result[...] = power
+        return result
 
-        Parameters
-        ----------
-        max_size : int
-            Maximum number of elements in output
-        min_density : float
-            Minimum density of output
+    found = np.zeros(len(counts), dtype=np.bool_)
+    while counts.any():
+        bit = (counts & 1).astype(np.bool_)
+        result[bit & found] = method(result[bit & found], power, **kwargs)
+        result[bit & ~found] = power
+        found |= bit
+        counts = counts >> 1
+        power = method(power, power, **kwargs)
 
-        Returns
-        -------
-        numpy.ndarray
-            The dense array.
+    return result
 
-        Raises
-        -------
-        ValueError
-            If the returned array would be too large.
 
-        Examples
-        --------
-        Convert a small sparse array to a dense array.
+def _is_duplicate_safe(method, dtype, result_dtype):
+    """
+    Whether reducing an array with duplicate coordinates gives the same result
+    as reducing it after summing the duplicates.
 
-        >>> s = COO.from_numpy(np.random.rand(2, 3, 4))
-        >>> x = s.maybe_densify()
-        >>> np.allclose(x, s.todense())
-        True
+    This is only the case for sums, and not for any other reduction. A
+    maximum, for example, can't see that two duplicates of ``1`` stand for a
+    ``2``. Sums of booleans count how many ``True`` values there are,
+    while summing duplicate booleans gives ``True`` once, so they aren't
+    safe either. Neither are sums to another dtype, because summing the
+    duplicates first would round or wrap them in the original dtype.
 
-        You can also specify the minimum allowed density or the maximum number
-        of output elements. If both conditions are unmet, this method will throw
-        an error.
+    Parameters
+    ----------
+    method : numpy.ufunc
+        The :code:`ufunc` to reduce with.
+    dtype : numpy.dtype
+        The dtype of the array.
+    result_dtype : numpy.dtype
+        The dtype of the result.
 
-        >>> x = np.zeros((5, 5), dtype=np.uint8)
-        >>> x[2, 2] = 1
-        >>> s = COO.from_numpy(x)
-        >>> s.maybe_densify(max_size=5, min_density=0.25)
-        Traceback (most recent call last):
-            ...
-        ValueError: Operation would require converting large sparse array to dense
-        """
-        if self.size <= max_size or self.density >= min_density:
-            return self.todense()
-        else:
-            raise ValueError("Operation would require converting "
-                             "large sparse array to dense")
+    Returns
+    -------
+    bool
+        Whether the reduction can be done with duplicates present.
+    """
+    return method is np.add and dtype.kind != 'b' and result_dtype == dtype
 
 
-def tensordot(a, b, axes=2):
+def _reduce_to_axes(x, method, kept_axes, result_dtype, dense=False, nan_fill=None, **kwargs):
     """
-    Perform the equivalent of :obj:`numpy.tensordot`.
+    Reduces an array along all but the given axes.
+
+    The nonzeros are grouped by their linear location within the kept axes,
+    without transposing or reshaping the array. Float sums are scattered into
+    their groups with :obj:`numpy.bincount`. Other reductions are done with
+    :obj:`_grouped_reduce` once the groups are made contiguous, which needs no
+    sort if the kept axes are leading axes of a sorted array. Otherwise, the
+    data is gathered into the sorted order, except when skipping ``NaN`` values,
+    where it is gathered one block at a time (see :obj:`_filled_blocks`). The
+    keys are always a full working array, though.
 
     Parameters
     ----------
-    a, b : Union[COO, np.ndarray, scipy.sparse.spmatrix]
-        The arrays to perform the :code:`tensordot` operation on.
-    axes : tuple[Union[int, tuple[int], Union[int, tuple[int]], optional
-        The axes to match when performing the sum.
+    x : COO
+        The array to reduce. It may only have duplicates if they don't change the
+        result, see :obj:`_is_duplicate_safe`.
+    method : numpy.ufunc
+        The :code:`ufunc` to reduce with.
+    kept_axes : tuple[int]
+        The axes that aren't reduced, in increasing order.
+    result_dtype : numpy.dtype
+        The dtype of the result.
+    dense : bool, optional
+        Whether to return a dense result, for reductions in which lines of zeros
+        don't reduce to zero.
+    nan_fill : numpy.number, optional
+        The value to reduce in place of every ``NaN``, see :obj:`_filled_reduceat`.
+    kwargs : dict
+        Any extra arguments to pass to the reduction.
 
     Returns
     -------
     Union[COO, numpy.ndarray]
-        The result of the operation.
-
-    See Also
-    --------
-    numpy.tensordot : NumPy equivalent function
+        The result, with the shape of the kept axes.
     """
-    # Much of this is stolen from numpy/core/numeric.py::tensordot
-    # Please see license at https://github.com/numpy/numpy/blob/master/LICENSE.txt
-    try:
-        iter(axes)
-    except TypeError:
-        axes_a = list(range(-axes, 0))
-        axes_b = list(range(0, axes))
+    shape = tuple(x.shape[ax] for ax in kept_axes)
+    n_groups = reduce(operator.mul, shape, 1)
+    group_size = reduce(operator.mul, (d for ax, d in enumerate(x.shape) if ax not in kept_axes), 1)
+
+    if method is np.add and result_dtype == np.float64 and x.dtype == np.float64 and \
+            n_groups <= x.nnz and (nan_fill is None or n_groups <= _NAN_BLOCK_SIZE):
+        # Adding zeros changes nothing, so the sums are only scattered.
+        keys = _linear_loc(x.coords[list(kept_axes)], shape)
+        if nan_fill is None:
+            sums = np.bincount(keys, weights=x.data, minlength=n_groups)
+        else:
+            # Every block is at least as long as the sums, so this is still linear.
+            sums = np.zeros(n_groups)
+            for start, block in _filled_blocks(x.data, nan_fill):
+                sums += np.bincount(keys[start:start + len(block)], weights=block,
+                                    minlength=n_groups)
+        keys = np.flatnonzero(sums)
+        result = sums[keys]
     else:
-        axes_a, axes_b = axes
-    try:
-        na = len(axes_a)
-        axes_a = list(axes_a)
-    except TypeError:
-        axes_a = [axes_a]
-        na = 1
-    try:
-        nb = len(axes_b)
-        axes_b = list(axes_b)
-    except TypeError:
-        axes_b = [axes_b]
-        nb = 1
+        keys, order = _group_nonzeros(x, kept_axes)
+        if nan_fill is None:
+            data, order = x.data[order], None
+        else:
+            # The blocks are gathered and filled one at a time instead.
+            data = x.data
+
+        result, inv_idx, counts = _grouped_reduce(data, keys, method, nan_fill=nan_fill,
+                                                  order=order, **kwargs)
+        missing_counts = counts != group_size
+        if dense:
+            zeros = _reduce_zeros(method, group_size - counts[missing_counts], x.dtype, **kwargs)
+        else:
+            zeros = _zero_of_dtype(x.dtype)
+        result[missing_counts] = method(result[missing_counts], zeros, **kwargs)
+        keys = keys[inv_idx]
 
-    # a, b = asarray(a), asarray(b)  # <--- modified
-    as_ = a.shape
-    nda = a.ndim
-    bs = b.shape
-    ndb = b.ndim
-    equal = True
-    if na != nb:
-        equal = False
-    else:
-        for k in range(na):
-            if as_[axes_a[k]] != bs[axes_b[k]]:
-                equal = False
-                break
-            if axes_a[k] < 0:
-                axes_a[k] += nda
-            if axes_b[k] < 0:
-                axes_b[k] += ndb
-    if not equal:
-        raise ValueError("shape-mismatch for sum")
+        if dense:
+            fill = _reduce_zeros(method, group_size, x.dtype, **kwargs)[0]
+            out = np.full(n_groups, fill, dtype=np.result_type(result, fill))
+            out[keys] = result
+            return out.reshape(shape)
 
-    # Move the axes to sum over to the end of "a"
-    # and to the front of "b"
-    notin = [k for k in range(nda) if k not in axes_a]
-    newaxes_a = notin + axes_a
-    N2 = 1
-    for axis in axes_a:
-        N2 *= as_[axis]
-    newshape_a = (-1, N2)
-    olda = [as_[axis] for axis in notin]
+        # Filter out zeros
+        mask = result != _zero_of_dtype(result.dtype)
+        keys = keys[mask]
+        result = result[mask]
 
-    notin = [k for k in range(ndb) if k not in axes_b]
-    newaxes_b = axes_b + notin
-    N2 = 1
-    for axis in axes_b:
-        N2 *= bs[axis]
-    newshape_b = (N2, -1)
-    oldb = [bs[axis] for axis in notin]
+    coords = _get_coords_from_linear_loc(keys, shape)
+    return COO(coords, result, shape=shape, has_duplicates=False, sorted=True)
 
-    at = a.transpose(newaxes_a).reshape(newshape_a)
-    bt = b.transpose(newaxes_b).reshape(newshape_b)
-    res = _dot(at, bt)
-    if isinstance(res, scipy.sparse.spmatrix):
-        if res.nnz > reduce(operator.mul, res.shape) / 2:
-            res = res.todense()
-        else:
-            res = COO.from_scipy_sparse(res)  # <--- modified
-            res.has_duplicates = False
-    if isinstance(res, np.matrix):
-        res = np.asarray(res)
-    return res.reshape(olda + oldb)
 
+def _group_nonzeros(x, kept_axes):
+    """
+    Makes the nonzeros of an array that share their coordinates along the given
+    axes contiguous.
 
-def dot(a, b):
+    Parameters
+    ----------
+    x : COO
+        The array.
+    kept_axes : tuple[int]
+        The axes to group by, in increasing order.
+
+    Returns
+    -------
+    keys : numpy.ndarray
+        The linear location of every nonzero within the given axes, in sorted order.
+    order : Union[slice, numpy.ndarray]
+        The order of the nonzeros that sorts them by their keys. The sort is
+        stable, and isn't needed if the given axes are leading axes of a sorted
+        array.
     """
-    Perform the equivalent of :obj:`numpy.dot` on two arrays.
+    keys = _linear_loc(x.coords[list(kept_axes)], tuple(x.shape[ax] for ax in kept_axes))
+    order = slice(None)
+    if kept_axes != tuple(range(len(kept_axes))) or not x.sorted:
+        order = np.argsort(keys, kind='mergesort')
+        keys = keys[order]
+
+    return keys, order
+
+
+def _grouped_stats(x, axis, keepdims, stat):
+    """
+    Computes a statistic of the nonzeros of an array, grouped by their
+    coordinates along the axes that aren't reduced, accounting for the
+    implicit zeros in every group.
+
+    Unlike the ``NaN`` skipping reductions, the statistics read the sorted data
+    several times, so it's gathered into a full copy once unless the kept axes
+    are leading axes of a sorted array.
 
     Parameters
     ----------
-    a, b : Union[COO, np.ndarray, scipy.sparse.spmatrix]
-        The arrays to perform the :code:`dot` operation on.
+    x : COO
+        The array to reduce.
+    axis : Union[int, Iterable[int], None]
+        The axes to reduce along.
+    keepdims : bool
+        Whether or not to keep the dimensions of the original array.
+    stat : Union[Callable, dict]
+        Computes the statistic of every group. It is called with the data sorted
+        into contiguous groups, the positions of the nonzeros within the reduced
+        axes, the start and size of every group, and the size of a full group.
+        It returns the value for every group with nonzeros. Groups without any
+        nonzeros must have a value of zero. May also be a dict of such
+        functions, which are all computed from the same groups.
 
     Returns
     -------
-    Union[COO, numpy.ndarray]
-        The result of the operation.
+    Union[COO, numpy.generic, dict]
+        The result. It's a scalar if all axes are reduced, and a dict with the
+        same keys if :code:`stat` is a dict.
+    """
+    x.sum_duplicates()
 
-    See Also
-    --------
-    numpy.dot : NumPy equivalent function.
-    COO.dot : Equivalent function for COO objects.
+    if axis is None:
+        axis = tuple(range(x.ndim))
+
+    if not isinstance(axis, tuple):
+        axis = (axis,)
+
+    axis = tuple(_normalize_axis(ax, x.ndim) for ax in axis)
+    kept_axes = tuple(ax for ax in range(x.ndim) if ax not in axis)
+    reduced_shape = tuple(x.shape[ax] for ax in axis)
+    group_size = reduce(operator.mul, reduced_shape, 1)
+
+    keys, order = _group_nonzeros(x, kept_axes)
+    data = x.data[order]
+    positions = _linear_loc(x.coords[list(axis)][:, order], reduced_shape)
+    _, inv_idx, counts = _grouped_reduce(data, keys, np.add)
+    keys = keys[inv_idx]
+    shape = tuple(x.shape[ax] for ax in kept_axes)
+
+    def finish(result):
+        if not kept_axes:
+            result = result[0] if len(result) else _zero_of_dtype(result.dtype)[()]
+        else:
+            mask = result != _zero_of_dtype(result.dtype)
+            coords = _get_coords_from_linear_loc(keys[mask], shape)
+            result = COO(coords, result[mask], shape=shape, has_duplicates=False, sorted=True)
+
+        if keepdims:
+            result = _keepdims(x, result, axis)
+
+        return result
+
+    if isinstance(stat, dict):
+        return {name: finish(f(data, positions, inv_idx, counts, group_size))
+                for name, f in stat.items()}
+
+    return finish(stat(data, positions, inv_idx, counts, group_size))
+
+
+def _grouped_sum(data, positions, inv_idx, counts, group_size, dtype):
     """
-    if not hasattr(a, 'ndim') or not hasattr(b, 'ndim'):
-        raise NotImplementedError(
-            "Cannot perform dot product on types %s, %s" %
-            (type(a), type(b)))
+    Computes the sum of every group for :obj:`COO.aggregate`.
+    """
+    return np.add.reduceat(data, inv_idx, dtype=dtype)
 
-    if a.ndim == 1 and b.ndim == 1:
-        return (a * b).sum()
 
-    a_axis = -1
-    b_axis = -2
+def _grouped_mean(data, positions, inv_idx, counts, group_size, dtype):
+    """
+    Computes the mean of every group for :obj:`COO.aggregate`.
+    """
+    # Like in Numpy, half-precision sums are accumulated in single precision.
+    sum_dtype = np.float32 if dtype == np.float16 else dtype
+    return (np.add.reduceat(data, inv_idx, dtype=sum_dtype) / group_size).astype(dtype)
 
-    if b.ndim == 1:
-        b_axis = -1
 
-    return tensordot(a, b, axes=(a_axis, b_axis))
+def _grouped_std(data, positions, inv_idx, counts, group_size, dtype):
+    """
+    Computes the standard deviation of every group for :obj:`COO.aggregate`.
+    """
+    return np.sqrt(_grouped_var(data, positions, inv_idx, counts, group_size, 0, dtype))
 
 
-def _dot(a, b):
-    if isinstance(a, COO):
-        a.sum_duplicates()
-    if isinstance(b, COO):
-        b.sum_duplicates()
-    if isinstance(b, COO) and not isinstance(a, COO):
-        return _dot(b.T, a.T).T
-    aa = a.tocsr()
+def _grouped_count(data, positions, inv_idx, counts, group_size):
+    """
+    Counts the nonzeros of every group for :obj:`COO.aggregate`.
+    """
+    return np.add.reduceat(data != _zero_of_dtype(data.dtype), inv_idx, dtype=np.intp)
+
+
+def _grouped_extreme(data, positions, inv_idx, counts, group_size, method):
+    """
+    Reduces every group with :code:`ufunc` for which reducing a zero with
+    itself gives zero, for :obj:`COO.aggregate`. Groups with implicit zeros
+    are reduced once more with a single zero.
+    """
+    result = method.reduceat(data, inv_idx)
+    missing_counts = counts != group_size
+    result[missing_counts] = method(result[missing_counts], _zero_of_dtype(data.dtype))
+    return result
+
+
+def _grouped_var(data, positions, inv_idx, counts, group_size, ddof, dtype):
+    """
+    Computes the variance of every group for :obj:`COO.var`.
+
+    Every group is split into its nonzeros and its implicit zeros. The mean of
+    the nonzeros is computed in a first pass, and the sum of their squared
+    deviations from it in a second one, like :obj:`numpy.var` does. Those are
+    then merged with the mean and deviations of the zeros as in the parallel
+    version of Welford's algorithm. This stays accurate when the values are
+    far from zero, unlike summing squares.
+    """
+    sums = np.add.reduceat(data, inv_idx, dtype=dtype)
+    means = sums / counts
+    deviations = data - np.repeat(means, counts)
+    m2 = np.add.reduceat((deviations * np.conj(deviations)).real, inv_idx)
+
+    zeros = group_size - counts
+    m2 += (means * np.conj(means)).real * counts * zeros / group_size
+
+    return (m2 / (group_size - ddof)).astype(np.finfo(dtype).dtype)
+
 
-    if isinstance(b, (COO, scipy.sparse.spmatrix)):
-        b = b.tocsc()
-    return aa.dot(b)
+def _grouped_arg_extreme(data, positions, inv_idx, counts, group_size, method):
+    """
+    Computes the position of the first maximum or minimum of every group for
+    :obj:`COO.argmax` and :obj:`COO.argmin`.
 
+    The nonzeros of a group are sorted by their positions. The first implicit
+    zero of a group is at the first position that isn't taken by the nonzero at
+    the same rank, or right after the last nonzero if there is none.
+    """
+    extreme = method.reduceat(data, inv_idx)
+    is_extreme = data == np.repeat(extreme, counts)
+    if data.dtype.kind in 'fc':
+        # NaNs always win, like in Numpy.
+        is_extreme |= np.isnan(data) & np.repeat(np.isnan(extreme), counts)
 
-def _keepdims(original, new, axis):
-    shape = list(original.shape)
-    for ax in axis:
-        shape[ax] = 1
-    return new.reshape(shape)
+    positions = positions.astype(np.intp)
+    first_extreme = np.minimum.reduceat(np.where(is_extreme, positions, group_size), inv_idx)
 
+    ranks = np.arange(len(data)) - np.repeat(inv_idx, counts)
+    first_zero = np.minimum.reduceat(np.where(positions != ranks, ranks, group_size), inv_idx)
+    first_zero = np.minimum(first_zero, counts)
 
-def _mask(coords, idx, shape):
-    if isinstance(idx, numbers.Integral):
-        return coords == idx
-    elif isinstance(idx, slice):
-        step = idx.step if idx.step is not None else 1
-        if step > 0:
-            start = idx.start if idx.start is not None else 0
-            stop = idx.stop if idx.stop is not None else shape
-            return (coords >= start) & (coords < stop) & \
-                   (coords % step == start % step)
-        else:
-            start = idx.start if idx.start is not None else (shape - 1)
-            stop = idx.stop if idx.stop is not None else -1
-            return (coords <= start) & (coords > stop) & \
-                   (coords % step == start % step)
-    elif isinstance(idx, Iterable):
-        mask = np.zeros(len(coords), dtype=np.bool)
-        for item in idx:
-            mask |= _mask(coords, item, shape)
-        return mask
+    zero = _zero_of_dtype(data.dtype)
+    with np.errstate(invalid='ignore'):
+        beats_zero = extreme > zero if method is np.maximum else extreme < zero
+    zero_wins = (counts < group_size) & ~beats_zero & ~np.isnan(extreme) & \
+        ((extreme != zero) | (first_zero < first_extreme))
+
+    return np.where(zero_wins, first_zero, first_extreme)
 
 
-def _replace_nan(array, value):
+def _grouped_reduce(x, groups, method, nan_fill=None, order=None, **kwargs):
     """
-    Replaces ``NaN``s in ``array`` with ``value``.
+    Performs a :code:`ufunc` grouped reduce.
 
     Parameters
     ----------
-    array : COO
-        The input array.
-    value : numpy.number
-        The values to replace ``NaN`` with.
+    x : np.ndarray
+        The data to reduce.
+    groups : np.ndarray
+        The groups the data belongs to. The groups must be
+        contiguous.
+    method : np.ufunc
+        The :code:`ufunc` to use to perform the reduction.
+    nan_fill : numpy.number, optional
+        The value to reduce in place of every ``NaN``, see :obj:`_filled_reduceat`.
+    order : Union[slice, np.ndarray], optional
+        The order in which to take the data so that the groups are contiguous.
+        Only supported along with :code:`nan_fill`.
+    kwargs : dict
+        The kwargs to pass to the :code:`ufunc`'s :code:`reduceat`
+        function.
 
     Returns
     -------
-    COO
-        A copy of ``array`` with the ``NaN``s replaced.
+    result : np.ndarray
+        The result of the grouped reduce operation.
+    inv_idx : np.ndarray
+        The index of the first element where each group is found.
+    counts : np.ndarray
+        The number of elements in each group.
     """
-    if not np.issubdtype(array.dtype, np.floating):
-        return array
-
-    data = np.copy(array.data)
-    data[np.isnan(data)] = value
+    kernels = _get_kernels()
+    if kernels is not None:
+        inv_idx, counts = kernels.group_starts(groups)
+    else:
+        # Partial credit to @shoyer
+        # Ref: https://gist.github.com/shoyer/f538ac78ae904c936844
+        flag = np.concatenate(([True] if len(groups) != 0 else [], groups[1:] != groups[:-1]))
+        inv_idx = np.flatnonzero(flag)
+        counts = np.diff(np.concatenate((inv_idx, [len(groups)])))
+
+    if nan_fill is not None:
+        result = _filled_reduceat(method, x, inv_idx, nan_fill, order=order, **kwargs)
+    else:
+        result = method.reduceat(x, inv_idx, **kwargs)
 
-    return COO(array.coords, data, shape=array.shape,
-               has_duplicates=array.has_duplicates,
-               sorted=array.sorted)
+    return result, inv_idx, counts
 
 
-def concatenate(arrays, axis=0):
+def _filled_reduceat(method, x, inv_idx, nan_fill, order=None, **kwargs):
     """
-    Concatenate the input arrays along the given dimension.
+    Performs a :code:`ufunc` grouped reduce, with every ``NaN`` replaced by
+    a given value.
+
+    The data is copied and filled in blocks, see :obj:`_filled_blocks`, so
+    only one block is ever copied at a time. Each block is reduced on its
+    own, and groups that span several blocks are then reduced again from the
+    results of every block.
 
     Parameters
     ----------
-    arrays : Iterable[Union[COO, numpy.ndarray, scipy.sparse.spmatrix]]
-        The input arrays to concatenate.
-    axis : int, optional
-        The axis along which to concatenate the input arrays. The default is zero.
+    method : np.ufunc
+        The :code:`ufunc` to use to perform the reduction.
+    x : np.ndarray
+        The data to reduce.
+    inv_idx : np.ndarray
+        The index of the first element of every group.
+    nan_fill : numpy.number
+        The value to reduce in place of every ``NaN``.
+    order : Union[slice, np.ndarray], optional
+        The order in which to take the data, see :obj:`_filled_blocks`.
+    kwargs : dict
+        The kwargs to pass to the :code:`ufunc`'s :code:`reduceat`
+        function.
 
     Returns
     -------
-    COO
-        The output concatenated array.
+    np.ndarray
+        The result of the grouped reduce operation.
+    """
+    if not len(x):
+        return method.reduceat(x, inv_idx, **kwargs)
 
-    See Also
-    --------
-    numpy.concatenate : NumPy equivalent function
+    partials = []
+    group_starts = []
+    n_partials = 0
+    for start, block in _filled_blocks(x, nan_fill, order=order):
+        lo, hi = np.searchsorted(inv_idx, [start, start + len(block)])
+        block_idx = inv_idx[lo:hi] - start
+        starts = np.arange(len(block_idx)) + n_partials
+        if not len(block_idx) or block_idx[0] != 0:
+            # The block starts in the middle of a group of the previous block.
+            block_idx = np.concatenate(([0], block_idx))
+            starts += 1
+
+        partials.append(method.reduceat(block, block_idx, **kwargs))
+        group_starts.append(starts)
+        n_partials += len(block_idx)
+
+    return method.reduceat(np.concatenate(partials), np.concatenate(group_starts), **kwargs)
+
+
+def _filled_blocks(x, nan_fill, order=None):
     """
-    arrays = [x if isinstance(x, COO) else COO(x) for x in arrays]
-    if axis < 0:
-        axis = axis + arrays[0].ndim
-    assert all(x.shape[ax] == arrays[0].shape[ax]
-               for x in arrays
-               for ax in set(range(arrays[0].ndim)) - {axis})
-    nnz = 0
-    dim = sum(x.shape[axis] for x in arrays)
-    shape = list(arrays[0].shape)
-    shape[axis] = dim
+    Iterates over copies of consecutive blocks of :obj:`_NAN_BLOCK_SIZE` elements
+    of an array, with every ``NaN`` replaced by a given value.
 
-    coords_dtype = np.min_scalar_type(max(shape) - 1) if len(shape) != 0 else np.uint8
-    data = np.concatenate([x.data for x in arrays])
-    coords = np.concatenate([x.coords for x in arrays], axis=1).astype(coords_dtype)
+    Parameters
+    ----------
+    x : np.ndarray
+        The data.
+    nan_fill : numpy.number
+        The value to replace every ``NaN`` with.
+    order : Union[slice, np.ndarray], optional
+        The order in which to take the data. Each block is gathered from
+        :code:`x[order]` on its own, so the array is never permuted as a whole.
+
+    Yields
+    ------
+    start : int
+        The index of the first element of the block.
+    block : np.ndarray
+        The filled copy of the block.
+    """
+    if isinstance(order, slice):
+        order = None
 
-    dim = 0
-    for x in arrays:
-        if dim:
-            coords[axis, nnz:x.nnz + nnz] += dim
-        dim += x.shape[axis]
-        nnz += x.nnz
+    for start in range(0, len(x), _NAN_BLOCK_SIZE):
+        if order is None:
+            block = x[start:start + _NAN_BLOCK_SIZE].copy()
+        else:
+            block = x[order[start:start + _NAN_BLOCK_SIZE]]
+        block[np.isnan(block)] = nan_fill
+        yield start, block
 
-    has_duplicates = any(x.has_duplicates for x in arrays)
 
-    return COO(coords, data, shape=shape, has_duplicates=has_duplicates,
-               sorted=(axis == 0) and all(a.sorted for a in arrays))
+def _filled_reduce(method, x, nan_fill, **kwargs):
+    """
+    Performs a :code:`ufunc` reduce, with every ``NaN`` replaced by a given
+    value if it is given. See :obj:`_filled_reduceat`.
+    """
+    if nan_fill is None or not len(x):
+        return method.reduce(x, **kwargs)
 
+    return _filled_reduceat(method, x, np.zeros(1, dtype=np.intp), nan_fill, **kwargs)[0]
 
-def stack(arrays, axis=0):
+
+def _to_lines(x, axis):
     """
-    Stack the input arrays along the given dimension.
+    Reshapes an array into a two-dimensional one, whose rows are the lines of the
+    original array along the given axis.
 
     Parameters
     ----------
-    arrays : Iterable[Union[COO, numpy.ndarray, scipy.sparse.spmatrix]]
-        The input arrays to stack.
-    axis : int, optional
-        The axis along which to stack the input arrays.
+    x : COO
+        The array to reshape.
+    axis : int
+        The axis along which the lines run.
 
     Returns
     -------
-    COO
-        The output stacked array.
+    lines : COO
+        The reshaped array, sorted and without duplicates.
+    other_axes : tuple[int]
+        The remaining axes of ``x``, in the order in which they were flattened.
+    """
+    x.sum_duplicates()
+    axis = _normalize_axis(axis, x.ndim)
+    other_axes = tuple(ax for ax in range(x.ndim) if ax != axis)
 
-    See Also
-    --------
-    numpy.stack : NumPy equivalent function
+    a = x.transpose(other_axes + (axis,))
+    a = a.reshape((int(np.prod([x.shape[d] for d in other_axes])), x.shape[axis]))
+    a.sum_duplicates()
+    return a, other_axes
+
+
+def _from_lines(lines, x, other_axes):
     """
-    assert len(set(x.shape for x in arrays)) == 1
-    arrays = [x if isinstance(x, COO) else COO(x) for x in arrays]
-    if axis < 0:
-        axis = axis + arrays[0].ndim + 1
-    data = np.concatenate([x.data for x in arrays])
-    coords = np.concatenate([x.coords for x in arrays], axis=1)
-    shape = list(arrays[0].shape)
-    shape.insert(axis, len(arrays))
+    The inverse of :obj:`_to_lines`.
+    """
+    axis = next(ax for ax in range(x.ndim) if ax not in other_axes)
+    shape = tuple(x.shape[d] for d in other_axes) + (lines.shape[1],)
+    result = lines.reshape(shape)
+    return result.transpose(np.argsort(other_axes + (axis,)))
 
-    coords_dtype = np.min_scalar_type(max(shape) - 1) if len(shape) != 0 else np.uint8
 
-    nnz = 0
-    dim = 0
-    new = np.empty(shape=(coords.shape[1],), dtype=coords_dtype)
-    for x in arrays:
-        new[nnz:x.nnz + nnz] = dim
-        dim += 1
-        nnz += x.nnz
+def _normalize_axis(axis, ndim):
+    if not isinstance(axis, numbers.Integral):
+        raise TypeError("'%s' object cannot be interpreted as an integer" % type(axis).__name__)
 
-    has_duplicates = any(x.has_duplicates for x in arrays)
-    coords = [coords[i].astype(coords_dtype) for i in range(coords.shape[0])]
-    coords.insert(axis, new)
-    coords = np.stack(coords, axis=0)
+    if not -ndim <= axis < ndim:
+        raise ValueError("axis %d is out of bounds for array of dimension %d" % (axis, ndim))
 
-    return COO(coords, data, shape=shape, has_duplicates=has_duplicates,
-               sorted=(axis == 0) and all(a.sorted for a in arrays))
+    return axis + ndim if axis < 0 else axis
 
 
-def triu(x, k=0):
+def _accumulate(method, x, axis=0, dtype=None):
     """
-    Returns an array with all elements below the k-th diagonal set to zero.
+    Performs :code:`method.accumulate` on a sparse array.
+
+    Only the nonzeros are accumulated, along with a single zero for every run
+    of zeros within a line along ``axis``, as long as accumulating another zero
+    doesn't change the result, which holds for all the common :code:`ufunc`
+    objects. Lines without nonzeros stay zero. See :obj:`_accumulate_lines`.
 
     Parameters
     ----------
-    x : COO
-        The input array.
-    k : int, optional
-        The diagonal below which elements are set to zero. The default is
-        zero, which corresponds to the main diagonal.
+    method : numpy.ufunc
+        The :code:`ufunc` to accumulate.
+    x : Union[COO, scipy.sparse.spmatrix]
+        The array to accumulate.
+    axis : int, optional
+        The axis along which to accumulate.
+    dtype : numpy.dtype, optional
+        The dtype to accumulate in.
 
     Returns
     -------
     COO
-        The output upper-triangular matrix.
+        The accumulated array.
 
-    See Also
-    --------
-    numpy.triu : NumPy equivalent function
+    Raises
+    ------
+    ValueError
+        If accumulating zeros would give a nonzero result.
+
+    Warns
+    -----
+    RuntimeWarning
+        If the result is dense, i.e. has a density of at least 0.25.
     """
-    if not x.ndim >= 2:
-        raise NotImplementedError('sparse.triu is not implemented for scalars or 1-D arrays.')
+    x = asCOO(x, name='accumulate')
+    zero = _zero_of_dtype(x.dtype)
+    zero_result = method.accumulate([zero, zero], dtype=dtype)
+    if (zero_result != _zero_of_dtype(zero_result.dtype)).any():
+        raise ValueError("Performing this accumulation would produce "
+                         "a dense result: %s" % str(method))
 
-    mask = x.coords[-2] + k <= x.coords[-1]
+    a, other_axes = _to_lines(x, axis)
 
-    coords = x.coords[:, mask]
-    data = x.data[mask]
+    coords, data = _accumulate_lines(method, a, zero_result.dtype, single_gaps=True)
+    if coords is None:
+        coords, data = _accumulate_lines(method, a, zero_result.dtype, single_gaps=False)
 
-    return COO(coords, data, x.shape, x.has_duplicates, x.sorted)
+    result = COO(coords, data, shape=a.shape, has_duplicates=False, sorted=True)
 
+    if result.size and result.density >= 0.25:
+        warnings.warn("The result of this accumulation is dense, with a "
+                      "density of %g. Consider converting to a dense array."
+                      % result.density, RuntimeWarning, stacklevel=3)
 
-def tril(x, k=0):
+    return _from_lines(result, x, other_axes)
+
+
+def _accumulate_lines(method, a, dtype, single_gaps):
     """
-    Returns an array with all elements above the k-th diagonal set to zero.
+    Accumulates the rows of a two-dimensional array.
+
+    Every nonempty row is turned into a segment holding its nonzeros, and
+    zeros for the gaps between them and after the last one. The segments are
+    accumulated at once with :obj:`_segmented_accumulate`, and each value is
+    then scattered over the columns it covers.
 
     Parameters
     ----------
-    x : COO
-        The input array.
-    k : int, optional
-        The diagonal above which elements are set to zero. The default is
-        zero, which corresponds to the main diagonal.
+    method : numpy.ufunc
+        The :code:`ufunc` to accumulate.
+    a : COO
+        The lines to accumulate, sorted and without duplicates.
+    dtype : numpy.dtype
+        The dtype to accumulate in.
+    single_gaps : bool
+        Whether to stand for every gap with a single zero, whose result is
+        repeated over the whole gap.
 
     Returns
     -------
-    COO
-        The output lower-triangular matrix.
-
-    See Also
-    --------
-    numpy.tril : NumPy equivalent function
+    coords, data : numpy.ndarray
+        The nonzeros of the result, sorted. Both are :code:`None` if
+        :code:`single_gaps` is given, but accumulating a zero after a gap
+        would change its value.
     """
-    if not x.ndim >= 2:
-        raise NotImplementedError('sparse.tril is not implemented for scalars or 1-D arrays.')
+    rows, cols = a.coords
+    cols = cols.astype(np.intp)
+    first = np.concatenate(([True], rows[1:] != rows[:-1]))[:len(rows)]
+    last = np.concatenate((first[1:], [True]))[:len(rows)]
+
+    # The zeros before every nonzero, and after the last one in each line.
+    gaps_before = cols - np.where(first, 0, np.concatenate(([0], cols[:-1] + 1))[:len(cols)])
+    gaps_after = np.where(last, a.shape[1] - 1 - cols, 0)
+    if single_gaps:
+        n_before = (gaps_before > 0).astype(np.intp)
+        n_after = (gaps_after > 0).astype(np.intp)
+    else:
+        n_before, n_after = gaps_before, gaps_after
+
+    # Every element is either one of the gaps before a nonzero, the nonzero
+    # itself, or one of the gaps after it.
+    counts = n_before + 1 + n_after
+    owner = np.repeat(np.arange(len(cols)), counts)
+    offset = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    n_before = n_before[owner]
+    is_value = offset == n_before
+    is_after = offset > n_before
+
+    starts = cols[owner] + offset - n_before
+    lengths = np.ones(len(owner), dtype=np.intp)
+    if single_gaps:
+        before = ~is_value & ~is_after
+        starts[before] -= gaps_before[owner[before]] - 1
+        lengths[before] = gaps_before[owner[before]]
+        lengths[is_after] = gaps_after[owner[is_after]]
+
+    data = np.zeros(len(owner), dtype=dtype)
+    data[is_value] = a.data
+    data = _segmented_accumulate(method, data, first[owner] & (offset == 0))
+
+    if single_gaps:
+        gaps = data[~is_value]
+        again = method(gaps, _zero_of_dtype(dtype))
+        if not ((again == gaps) | (np.isnan(again) & np.isnan(gaps))).all():
+            return None, None
+
+    nonzero = data != _zero_of_dtype(dtype)
+    lengths = lengths[nonzero]
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    coords = np.stack((np.repeat(rows[owner[nonzero]], lengths),
+                       np.repeat(starts[nonzero], lengths) + offsets))
+    return coords, np.repeat(data[nonzero], lengths)
+
+
+# The ufuncs for which accumulating segments can be done in any order.
+_ASSOCIATIVE_UFUNCS = (np.add, np.multiply, np.maximum, np.minimum, np.fmax, np.fmin,
+                       np.logical_and, np.logical_or, np.logical_xor,
+                       np.bitwise_and, np.bitwise_or, np.bitwise_xor)
+
+
+def _segmented_accumulate(method, data, first):
+    """
+    Performs :code:`method.accumulate` on each of a number of contiguous
+    segments of an array.
 
-    mask = x.coords[-2] + k >= x.coords[-1]
+    Associative :code:`ufunc` objects are accumulated with a scan that takes
+    a pass over the data for every doubling of the length of the longest
+    segment. The others are accumulated one position within the segments at
+    a time.
 
-    coords = x.coords[:, mask]
-    data = x.data[mask]
+    Parameters
+    ----------
+    method : numpy.ufunc
+        The :code:`ufunc` to accumulate.
+    data : numpy.ndarray
+        The data, which is accumulated in place.
+    first : numpy.ndarray
+        Whether each element starts a segment.
 
-    return COO(coords, data, x.shape, x.has_duplicates, x.sorted)
+    Returns
+    -------
+    numpy.ndarray
+        The accumulated data.
+    """
+    idx = np.arange(len(data))
+    rank = idx - np.maximum.accumulate(np.where(first, idx, 0)) if len(data) else idx
+
+    if method in _ASSOCIATIVE_UFUNCS:
+        step = 1
+        while len(data) and step <= rank.max():
+            current = np.flatnonzero(rank >= step)
+            data[current] = method(data[current - step], data[current])
+            step *= 2
+    else:
+        order = np.argsort(rank, kind='mergesort')
+        bounds = np.searchsorted(rank[order], np.arange(1, rank.max() + 2 if len(data) else 1))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            current = order[start:stop]
+            data[current] = method(data[current - 1], data[current])
 
+    return data
 
-# (c) Paul Panzer
-# Taken from https://stackoverflow.com/a/47833496/774273
-# License: https://creativecommons.org/licenses/by-sa/3.0/
-def _match_arrays(a, b):
+
+def _reduceat(method, x, indices, axis=0, dtype=None):
     """
-    Finds all indexes into a and b such that a[i] = b[j]. The outputs are sorted
-    in lexographical order.
+    Performs :code:`method.reduceat` on a sparse array.
+
+    Each nonzero is repeated for every slice it falls in, and all slices are then
+    reduced at once with :obj:`_grouped_reduce`.
 
     Parameters
     ----------
-    a, b : np.ndarray
-        The input 1-D arrays to match. If matching of multiple fields is
-        needed, use np.recarrays. These two arrays must be sorted.
+    method : numpy.ufunc
+        The :code:`ufunc` to reduce with.
+    x : Union[COO, scipy.sparse.spmatrix]
+        The array to reduce.
+    indices : array_like
+        The indices at which the slices to reduce start. See
+        :obj:`numpy.ufunc.reduceat`.
+    axis : int, optional
+        The axis along which to reduce.
+    dtype : numpy.dtype, optional
+        The dtype to reduce in.
 
     Returns
     -------
-    a_idx, b_idx : np.ndarray
-        The output indices of every possible pair of matching elements.
-    """
-    if len(a) == 0 or len(b) == 0:
-        return np.array([], dtype=np.uint8), np.array([], dtype=np.uint8)
-    asw = np.r_[0, 1 + np.flatnonzero(a[:-1] != a[1:]), len(a)]
-    bsw = np.r_[0, 1 + np.flatnonzero(b[:-1] != b[1:]), len(b)]
-    al, bl = np.diff(asw), np.diff(bsw)
-    na = len(al)
-    asw, bsw = asw, bsw
-    abunq = np.r_[a[asw[:-1]], b[bsw[:-1]]]
-    m = np.argsort(abunq, kind='mergesort')
-    mv = abunq[m]
-    midx = np.flatnonzero(mv[:-1] == mv[1:])
-    ai, bi = m[midx], m[midx + 1] - na
-    aic = np.r_[0, np.cumsum(al[ai])]
-    a_idx = np.ones((aic[-1],), dtype=np.int_)
-    a_idx[aic[:-1]] = asw[ai]
-    a_idx[aic[1:-1]] -= asw[ai[:-1]] + al[ai[:-1]] - 1
-    a_idx = np.repeat(np.cumsum(a_idx), np.repeat(bl[bi], al[ai]))
-    bi = np.repeat(bi, al[ai])
-    bic = np.r_[0, np.cumsum(bl[bi])]
-    b_idx = np.ones((bic[-1],), dtype=np.int_)
-    b_idx[bic[:-1]] = bsw[bi]
-    b_idx[bic[1:-1]] -= bsw[bi[:-1]] + bl[bi[:-1]] - 1
-    b_idx = np.cumsum(b_idx)
-    return a_idx, b_idx
-
-
-def _grouped_reduce(x, groups, method, **kwargs):
+    COO
+        The reduced array.
+
+    Raises
+    ------
+    ValueError
+        If reducing zeros would give a nonzero result.
+    IndexError
+        If any of the indices is out of bounds.
     """
-    Performs a :code:`ufunc` grouped reduce.
+    x = asCOO(x, name='reduceat')
+    zero = _zero_of_dtype(x.dtype)
+    zero_result = method.reduce([zero, zero], dtype=dtype)
+    if zero_result != _zero_of_dtype(np.dtype(zero_result)):
+        raise ValueError("Performing this reduction operation would produce "
+                         "a dense result: %s" % str(method))
+
+    a, other_axes = _to_lines(x, axis)
+    n = a.shape[1]
+
+    indices = np.asarray(indices, dtype=np.intp).ravel()
+    out_of_bounds = (indices < 0) | (indices >= n)
+    if out_of_bounds.any():
+        raise IndexError("index %d out-of-bounds in %s.reduceat [0, %d)"
+                         % (indices[out_of_bounds][0], method.__name__, n))
+
+    # Slice i spans indices[i]:indices[i + 1], or only indices[i] if that is empty.
+    starts = indices
+    ends = np.append(indices[1:], n)
+    ends = np.where(ends > starts, ends, starts + 1)
+
+    # The nonzeros ordered by their position along the axis, and the range
+    # of them that falls into each slice.
+    order = np.argsort(a.coords[1], kind='mergesort')
+    cols = a.coords[1][order]
+    lo = np.searchsorted(cols, starts)
+    counts = np.searchsorted(cols, ends) - lo
+
+    offsets = np.cumsum(counts) - counts
+    slices = np.repeat(np.arange(len(indices)), counts)
+    elements = order[np.arange(len(slices)) - np.repeat(offsets - lo, counts)]
+
+    rows = a.coords[0][elements]
+    group_order = np.lexsort((slices, rows))
+    rows = rows[group_order]
+    slices = slices[group_order]
+    data = a.data[elements[group_order]]
+
+    groups = rows.astype(np.intp) * len(indices) + slices
+    result, inv_idx, group_counts = _grouped_reduce(data, groups, method, dtype=dtype)
+
+    missing_counts = group_counts != (ends - starts)[slices[inv_idx]]
+    result[missing_counts] = method(result[missing_counts], zero, dtype=dtype)
+
+    coords = np.stack((rows[inv_idx], slices[inv_idx]))
+    nonzero = result != _zero_of_dtype(result.dtype)
+
+    result = COO(coords[:, nonzero], result[nonzero], shape=(a.shape[0], len(indices)),
+                 has_duplicates=False, sorted=True)
+    return _from_lines(result, x, other_axes)
+
+
+def _outer(method, a, b, **kwargs):
+    """
+    Performs :code:`method.outer` on sparse arrays.
+
+    If ``method`` gives zero whenever either argument is zero, only the pairs of
+    nonzeros are evaluated, so the result has at most ``a.nnz * b.nnz`` nonzeros.
+    Otherwise, this falls back to :obj:`elemwise` with broadcasting.
 
     Parameters
     ----------
-    x : np.ndarray
-        The data to reduce.
-    groups : np.ndarray
-        The groups the data belongs to. The groups must be
-        contiguous.
-    method : np.ufunc
-        The :code:`ufunc` to use to perform the reduction.
+    method : numpy.ufunc
+        The :code:`ufunc` to apply.
+    a, b : Union[COO, scipy.sparse.spmatrix, numpy.ndarray]
+        The arguments.
     kwargs : dict
-        The kwargs to pass to the :code:`ufunc`'s :code:`reduceat`
-        function.
+        Additional arguments to pass to the function.
 
     Returns
     -------
-    result : np.ndarray
-        The result of the grouped reduce operation.
-    inv_idx : np.ndarray
-        The index of the first element where each group is found.
-    counts : np.ndarray
-        The number of elements in each group.
+    Union[COO, numpy.ndarray]
+        The result of the operation.
+
+    Raises
+    ------
+    ValueError
+        If the result would be dense, and both arguments are sparse.
     """
-    # Partial credit to @shoyer
-    # Ref: https://gist.github.com/shoyer/f538ac78ae904c936844
-    flag = np.concatenate(([True] if len(x) != 0 else [], groups[1:] != groups[:-1]))
-    inv_idx = np.flatnonzero(flag)
-    result = method.reduceat(x, inv_idx, **kwargs)
-    counts = np.diff(np.concatenate((inv_idx, [len(x)])))
-    return result, inv_idx, counts
+    a, b = [COO.from_scipy_sparse(arg) if isinstance(arg, scipy.sparse.spmatrix) else arg
+            for arg in (a, b)]
+
+    if isinstance(a, COO) and isinstance(b, COO):
+        a.sum_duplicates()
+        b.sum_duplicates()
+
+        a_zero = _zero_of_dtype(a.dtype)
+        b_zero = _zero_of_dtype(b.dtype)
+        with np.errstate(all='ignore'):
+            annihilates = method(a_zero, b_zero, **kwargs) == 0 and \
+                not np.any(method(a.data, b_zero, **kwargs)) and \
+                not np.any(method(a_zero, b.data, **kwargs))
+
+        if annihilates:
+            a_idx, b_idx = _cartesian_product(np.arange(a.nnz), np.arange(b.nnz))
+            data = method(a.data[a_idx], b.data[b_idx], **kwargs)
+            coords = np.concatenate((a.coords[:, a_idx], b.coords[:, b_idx]))
+            nonzero = data != _zero_of_dtype(data.dtype)
+
+            return COO(coords[:, nonzero], data[nonzero], shape=a.shape + b.shape,
+                       has_duplicates=False, sorted=a.sorted and b.sorted)
+
+    a_ndim = np.ndim(a)
+    b_ndim = np.ndim(b)
+    return elemwise(method, _expand_dims_to(a, a_ndim + b_ndim), b, **kwargs)
+
+
+def _expand_dims_to(x, ndim):
+    """
+    Appends length-1 dimensions to an array until it has the given number of
+    dimensions.
+    """
+    if isscalar(x):
+        return x
+
+    return x.reshape(x.shape + (1,) * (ndim - x.ndim))
 
 
 def elemwise(func, *args, **kwargs):
@@ -2060,21 +4199,23 @@ def elemwise(func, *args, **kwargs):
     func : Callable
         The function to apply. Must support broadcasting.
     args : tuple, optional
-        The arguments to the function. Can be :obj:`SparseArray` objects
-        or :obj:`scipy.sparse.spmatrix` objects.
+        The arguments to the function. Can be :obj:`SparseArray` objects,
+        :obj:`scipy.sparse.spmatrix` objects, :obj:`numpy.ndarray` objects
+        or scalars.
     kwargs : dict, optional
         Any additional arguments to pass to the function.
 
     Returns
     -------
-    COO
-        The result of applying the function.
+    Union[COO, numpy.ndarray]
+        The result of applying the function. This is a :obj:`numpy.ndarray`
+        only if some operands are dense and the result isn't sparse.
 
     Raises
     ------
     ValueError
-        If the operation would result in a dense matrix, or if the operands
-        don't have broadcastable shapes.
+        If the operation would result in a dense matrix and all operands are
+        sparse, or if the operands don't have broadcastable shapes.
 
     See Also
     --------
@@ -2083,8 +4224,28 @@ def elemwise(func, *args, **kwargs):
 
     Notes
     -----
-    Previously, operations with Numpy arrays were sometimes supported. Now,
-    it is necessary to convert Numpy arrays to :obj:`COO` objects.
+    :obj:`numpy.ndarray` operands are broadcast without being copied, and only
+    read at the nonzero coordinates of the sparse operands. If ``func`` gives zero
+    wherever all the sparse operands are zero, the result is a :obj:`COO` array.
+    Otherwise, it is a :obj:`numpy.ndarray` holding ``func`` applied with the sparse
+    operands set to zero, with the nonzero coordinates updated in place.
+
+    Examples
+    --------
+    >>> s = COO.from_numpy(np.eye(3))
+    >>> w = np.arange(1, 4)
+    >>> elemwise(np.multiply, s, w).todense()  # doctest: +NORMALIZE_WHITESPACE
+    array([[1., 0., 0.],
+           [0., 2., 0.],
+           [0., 0., 3.]])
+    >>> elemwise(np.add, s, w)  # doctest: +NORMALIZE_WHITESPACE
+    array([[2., 2., 3.],
+           [1., 3., 3.],
+           [1., 2., 4.]])
+    >>> elemwise(np.add, s, 1)
+    Traceback (most recent call last):
+        ...
+    ValueError: Performing this operation would produce a dense result: <ufunc 'add'>
     """
     # Because we need to mutate args.
     args = list(args)
@@ -2103,6 +4264,8 @@ def elemwise(func, *args, **kwargs):
             posargs.append(args[i])
         elif isinstance(arg, SparseArray) and not isinstance(arg, COO):
             args[i] = COO(arg)
+        elif isinstance(arg, np.ndarray):
+            args[i] = np.asarray(arg)
         elif not isinstance(arg, COO):
             raise ValueError("Performing this operation would produce "
                              "a dense result: %s" % str(func))
@@ -2114,6 +4277,10 @@ def elemwise(func, *args, **kwargs):
     if len(args) == 0:
         return func(**kwargs)
 
+    if not any(isinstance(arg, COO) for arg in args):
+        raise ValueError("Performing this operation would produce "
+                         "a dense result: %s" % str(func))
+
     if len(args) == 1:
         return _elemwise_unary(func, args[0], **kwargs)
 
@@ -2124,6 +4291,12 @@ def _elemwise_n_ary(func, *args, **kwargs):
     """
     Apply a function to any number of arguments with broadcasting.
 
+    All operands are aligned on the union of their coordinates in a single
+    merge, with zeros filled in where an operand has no entry, so that ``func``
+    is applied exactly once. Unless the result is dense, at most one sparse
+    operand is broadcast, and the others are looked up at the merged
+    coordinates instead (see :obj:`_elemwise_virtual`).
+
     Parameters
     ----------
     func : Callable
@@ -2135,13 +4308,14 @@ def _elemwise_n_ary(func, *args, **kwargs):
 
     Returns
     -------
-    COO
+    Union[COO, numpy.ndarray]
         The output array.
 
     Raises
     ------
     ValueError
-        If the input shapes aren't compatible or the result will be dense.
+        If the input shapes aren't compatible or the result will be dense
+        without any dense operands.
     """
     args = list(args)
 
@@ -2149,174 +4323,490 @@ def _elemwise_n_ary(func, *args, **kwargs):
         if isinstance(arg, COO):
             arg.sum_duplicates()
 
-    args_zeros = tuple(_zero_of_dtype(arg.dtype)[()] for arg in args)
-
-    func_value = func(*args_zeros, **kwargs)
+    func_value, dense_result = _func_at_zeros(func, args, kwargs)
     func_zero = _zero_of_dtype(func_value.dtype)
-    if func_value != func_zero:
+    sparse_args = [arg for arg in args if isinstance(arg, COO)]
+
+    if dense_result and len(sparse_args) == len(args):
         raise ValueError("Performing this operation would produce "
                          "a dense result: %s" % str(func))
-    data_list = []
-    coords_list = []
 
-    cache = {}
-    for mask in product([True, False], repeat=len(args)):
-        if not any(mask):
-            continue
+    result_shape = _get_nary_broadcast_shape(*[arg.shape for arg in args])
 
-        ci, di = _unmatch_coo(func, args, mask, cache, **kwargs)
+    if all(arg.shape == result_shape for arg in sparse_args) and _share_coords(sparse_args):
+        # The operands are aligned already, so func can be applied directly.
+        coords = sparse_args[0].coords
+        data_list = [arg.data if isinstance(arg, COO) else _get_dense_data(arg, coords, result_shape)
+                     for arg in args]
+        data = np.asarray(func(*data_list, **kwargs))
 
-        coords_list.extend(ci)
-        data_list.extend(di)
+        if dense_result:
+            return _scatter_dense(func_value, coords, data, result_shape, args)
 
-    result_shape = _get_nary_broadcast_shape(*[arg.shape for arg in args])
+        return _filter_zeros(coords, data, func_zero, result_shape)
+
+    if not dense_result and not any(arg.shape == result_shape for arg in sparse_args):
+        # Only broadcast the operand that expands to the fewest nonzeros, the
+        # others are looked up at its coordinates.
+        i = min((i for i, arg in enumerate(args) if isinstance(arg, COO)),
+                key=lambda i: args[i].nnz * _broadcast_factor(args[i].shape, result_shape))
+        args[i] = args[i].broadcast_to(result_shape)
+        sparse_args = [arg for arg in args if isinstance(arg, COO)]
+
+    full = [arg.shape == result_shape for arg in sparse_args]
+    if not dense_result and not all(full):
+        return _elemwise_virtual(func, args, result_shape, func_zero, kwargs)
+
+    sparse_args = [arg.broadcast_to(result_shape) for arg in sparse_args]
+
+    linear, positions = _merge_linear_locs([arg.linear_loc() for arg in sparse_args],
+                                           sorted=[arg.sorted for arg in sparse_args])
+
+    coords = None
+    if len(sparse_args) != len(args):
+        coords = _get_coords_from_linear_loc(linear, result_shape)
+
+    sparse_data = []
+    for arg, pos in zip(sparse_args, positions):
+        data = np.zeros(len(linear), dtype=arg.dtype)
+        data[pos] = arg.data
+        sparse_data.append(data)
 
-    # Concatenate matches and mismatches
-    data = np.concatenate(data_list) if len(data_list) else np.empty((0,), dtype=args[0].dtype)
-    coords = np.concatenate(coords_list, axis=1) if len(coords_list) else \
-        np.empty((0, len(result_shape)), dtype=np.min_scalar_type(max(result_shape) - 1))
+    sparse_data = iter(sparse_data)
+    data_list = [next(sparse_data) if isinstance(arg, COO) else _get_dense_data(arg, coords, result_shape)
+                 for arg in args]
+
+    data = np.asarray(func(*data_list, **kwargs))
+
+    if dense_result:
+        return _scatter_dense(func_value, coords, data, result_shape, args)
 
     nonzero = data != func_zero
     data = data[nonzero]
-    coords = coords[:, nonzero]
+    if coords is None:
+        coords = _get_coords_from_linear_loc(linear[nonzero], result_shape)
+    else:
+        coords = coords[:, nonzero]
 
-    return COO(coords, data, shape=result_shape, has_duplicates=False)
+    return COO(coords, data, shape=result_shape, has_duplicates=False,
+               sorted=True)
 
 
-def _match_coo(*args, **kwargs):
+def _func_at_zeros(func, args, kwargs, full=True):
     """
-    Matches the coordinates for any number of input :obj:`COO` arrays.
-    Equivalent to "sparse" broadcasting for all arrays.
+    Applies a function with every sparse operand replaced by zero, which gives
+    its result wherever all the sparse operands are zero.
+
+    Dense operands are passed :obj:`_ELEMWISE_BLOCK_SIZE` elements at a time,
+    in blocks along the first axis, up to the first block in which the result
+    has nonzeros. The whole result is only computed then, as it's only needed
+    for dense results. Sparse results never allocate more than a block.
 
     Parameters
     ----------
-    args : Tuple[COO]
-        The input :obj:`COO` arrays.
-    return_midx : bool
-        Whether to return matched indices or matched arrays. Matching
-        only supported for two arrays. ``False`` by default.
-    cache : dict
-        Cache of things already matched. No cache by default.
+    func : Callable
+        The function to apply.
+    args : list
+        Input :obj:`COO` or :obj:`numpy.ndarray`s, or scalars.
+    kwargs : dict
+        Additional arguments to pass to the function.
+    full : bool, optional
+        Whether to compute the whole result if it has nonzeros.
 
     Returns
     -------
-    matched_idx : List[ndarray]
-        The indices of matched elements in the original arrays. Only returned if
-        ``return_midx`` is ``True``.
-    matched_arrays : List[COO]
-        The expanded, matched :obj:`COO` objects. Only returned if
-        ``return_midx`` is ``False``.
-    """
-    return_midx = kwargs.pop('return_midx', False)
-    cache = kwargs.pop('cache', None)
-
-    if kwargs:
-        raise ValueError('Unknown kwargs %s' % kwargs.keys())
-
-    if return_midx and (len(args) != 2 or cache is not None):
-        raise NotImplementedError('Matching indices only supported for two args, and no cache.')
-
-    matched_arrays = [args[0]]
-    cache_key = [id(args[0])]
-    for arg2 in args[1:]:
-        cache_key.append(id(arg2))
-        key = tuple(cache_key)
-        if cache is not None and key in cache:
-            matched_arrays = cache[key]
-            continue
+    value : numpy.ndarray
+        The result if it has nonzeros, and otherwise a block of it, which only
+        gives its dtype. Also only a block if :code:`full` is :code:`False`.
+    dense : bool
+        Whether the result has nonzeros.
+    """
+    # Dense operands take part with their values, sparse ones with zero.
+    args_zeros = [_zero_of_dtype(arg.dtype)[()] if isinstance(arg, COO) else arg
+                  for arg in args]
+    shape = _get_nary_broadcast_shape(*[np.shape(arg) for arg in args_zeros])
+    size = reduce(operator.mul, shape, 1)
+
+    if size > _ELEMWISE_BLOCK_SIZE and shape[0] > 1:
+        step = max(_ELEMWISE_BLOCK_SIZE // (size // shape[0]), 1)
+        dense_args = [np.broadcast_to(arg, shape) if np.ndim(arg) else arg for arg in args_zeros]
+        for start in range(0, shape[0], step):
+            value = np.asarray(func(*[arg[start:start + step] if np.ndim(arg) else arg
+                                      for arg in dense_args], **kwargs))
+            if (value != _zero_of_dtype(value.dtype)).any():
+                break
+        else:
+            return value, False
+
+        if not full:
+            return value, True
+
+    value = np.asarray(func(*args_zeros, **kwargs))
+    return value, (value != _zero_of_dtype(value.dtype)).any()
+
+
+def _elemwise_virtual(func, args, shape, func_zero, kwargs):
+    """
+    Apply a function to operands some of which need broadcasting, without
+    broadcasting them.
+
+    The coordinates of the sparse operands that have the full shape are merged.
+    The remaining operands are first evaluated on their own, with the full
+    operands set to zero, which gives the nonzeros of the result outside the
+    full operands. Only those are broadcast, and the values of the remaining
+    operands are then looked up at the merged coordinates. If there is a single
+    remaining operand, and none of its nonzeros vanish, it is broadcast and
+    merged itself instead.
+
+    Parameters
+    ----------
+    func : Callable
+        The function to apply to arguments.
+    args : list
+        Input :obj:`COO` or :obj:`numpy.ndarray`s. At least one, but not all, of
+        the :obj:`COO` operands must have the shape ``shape``.
+    shape : tuple[int]
+        The shape of the result.
+    func_zero : numpy.ndarray
+        The zero of the output dtype.
+    kwargs : dict
+        Additional arguments to pass to the function.
+
+    Returns
+    -------
+    COO
+        The output array.
+    """
+    full = [isinstance(arg, COO) and arg.shape == shape for arg in args]
+    zeros = [_zero_of_dtype(arg.dtype)[()] if f else None for arg, f in zip(args, full)]
+
+    def rest_func(*rest_args):
+        rest_args = iter(rest_args)
+        return func(*[z if f else next(rest_args) for z, f in zip(zeros, full)], **kwargs)
+
+    rest = [arg for arg, f in zip(args, full) if not f]
+    if len(rest) == 1:
+        rest_result = _elemwise_unary(rest_func, rest[0])
+    else:
+        rest_result = _elemwise_n_ary(rest_func, *rest)
+
+    merged = {i: arg for i, (arg, f) in enumerate(zip(args, full)) if f}
+    if len(rest) == 1 and isinstance(rest[0], COO) and rest_result.nnz == rest[0].nnz:
+        # Every nonzero of the remaining operand is a nonzero of the result, so
+        # it's broadcast itself instead, and its values needn't be looked up.
+        merged[full.index(False)] = rest[0].broadcast_to(shape)
+    elif rest_result.nnz:
+        merged[None] = rest_result.broadcast_to(shape)
+
+    linear, positions = _merge_linear_locs([arg.linear_loc() for arg in merged.values()],
+                                           sorted=[arg.sorted for arg in merged.values()])
+    coords = None
+    if any(i not in merged for i in range(len(args))):
+        coords = _get_coords_from_linear_loc(linear, shape)
+
+    positions = dict(zip(merged.keys(), positions))
+    data_list = []
+    for i, arg in enumerate(args):
+        if i in merged:
+            data = np.zeros(len(linear), dtype=arg.dtype)
+            data[positions[i]] = merged[i].data
+        elif isinstance(arg, COO):
+            data = _get_broadcast_data(arg, coords, shape)
+        else:
+            data = _get_dense_data(arg, coords, shape)
+
+        data_list.append(data)
+
+    data = np.asarray(func(*data_list, **kwargs))
+
+    nonzero = data != func_zero
+    data = data[nonzero]
+    if coords is None:
+        coords = _get_coords_from_linear_loc(linear[nonzero], shape)
+    else:
+        coords = coords[:, nonzero]
+
+    return COO(coords, data, shape=shape, has_duplicates=False, sorted=True)
+
+
+def _broadcast_factor(shape, broadcast_shape):
+    """
+    Gets how many times every element of an array is repeated when it is
+    broadcast to a given shape.
 
-        cargs = [matched_arrays[0], arg2]
-        current_shape = _get_broadcast_shape(matched_arrays[0].shape, arg2.shape)
-        params = [_get_broadcast_parameters(arg.shape, current_shape) for arg in cargs]
-        reduced_params = [all(p) for p in zip(*params)]
-        reduced_shape = _get_reduced_shape(arg2.shape,
-                                           reduced_params[-arg2.ndim:])
+    Parameters
+    ----------
+    shape : tuple[int]
+        The shape of the array.
+    broadcast_shape : tuple[int]
+        The shape it is broadcast to.
+
+    Returns
+    -------
+    int
+        The number of copies of every element.
+    """
+    extra = len(broadcast_shape) - len(shape)
+    return reduce(operator.mul, (d for i, d in enumerate(broadcast_shape)
+                                 if i < extra or shape[i - extra] == 1), 1)
+
+
+def _get_broadcast_data(x, coords, shape):
+    """
+    Gathers the values of a :obj:`COO` operand at the given coordinates,
+    broadcasting it to ``shape`` without expanding its coordinates.
+
+    Parameters
+    ----------
+    x : COO
+        The sparse operand, without duplicates and sorted.
+    coords : numpy.ndarray
+        The coordinates at which to gather values.
+    shape : tuple[int]
+        The shape ``x`` is broadcast to.
+
+    Returns
+    -------
+    numpy.ndarray
+        The values of ``x`` at ``coords``, with zeros where ``x`` has no entry.
+    """
+    params = _get_broadcast_parameters(x.shape, shape)
+    reduced_shape = _get_reduced_shape(shape, params)
+
+    # Dropping the broadcast dimensions keeps the order of the coordinates of x.
+    x_linear = _linear_loc(_get_reduced_coords(x.coords, params[len(shape) - x.ndim:]),
+                           reduced_shape)
+    linear = _linear_loc(_get_reduced_coords(coords, params), reduced_shape)
+
+    idx = np.searchsorted(x_linear, linear)
+    idx[idx == len(x_linear)] = 0
+    found = x_linear[idx] == linear if len(x_linear) else np.zeros(len(linear), dtype=np.bool_)
+
+    data = np.zeros(len(linear), dtype=x.dtype)
+    data[found] = x.data[idx[found]]
+    return data
+
+
+def _scatter_dense(background, coords, data, shape, args):
+    """
+    Builds the dense result of an operation involving dense operands, by
+    writing the values computed at the nonzero coordinates of the sparse
+    operands over the result of the operation where they are all zero.
+
+    Parameters
+    ----------
+    background : numpy.ndarray
+        The result of the operation with all the sparse operands replaced by zero.
+    coords : numpy.ndarray
+        The nonzero coordinates of the sparse operands.
+    data : numpy.ndarray
+        The result of the operation at ``coords``.
+    shape : tuple[int]
+        The shape of the result.
+    args : list
+        The operands, which ``background`` may not be a view of.
+
+    Returns
+    -------
+    numpy.ndarray
+        The dense result.
+    """
+    # Reuse the background if it's a fresh array of the right shape, so
+    # that only a single dense array is ever allocated.
+    if background.shape != shape or not background.flags.writeable or \
+            any(isinstance(arg, np.ndarray) and np.may_share_memory(background, arg)
+                for arg in args):
+        background = np.array(np.broadcast_to(background, shape))
 
-        reduced_coords = [_get_reduced_coords(arg.coords, reduced_params[-arg.ndim:])
-                          for arg in cargs]
+    background[tuple(coords)] = data
+    return background
 
-        linear = [_linear_loc(rc, reduced_shape) for rc in reduced_coords]
-        sorted_idx = [np.argsort(idx) for idx in linear]
-        linear = [idx[s] for idx, s in zip(linear, sorted_idx)]
-        matched_idx = _match_arrays(*linear)
 
-        if return_midx:
-            matched_idx = [sidx[midx] for sidx, midx in zip(sorted_idx, matched_idx)]
-            return matched_idx
+def _get_dense_data(x, coords, shape):
+    """
+    Gathers the values of a dense operand at the given coordinates, broadcasting it
+    to ``shape`` without materialising the broadcast array.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The dense operand.
+    coords : numpy.ndarray
+        The coordinates at which to gather values.
+    shape : tuple[int]
+        The shape ``x`` is broadcast to.
 
-        coords = [arg.coords[:, s] for arg, s in zip(cargs, sorted_idx)]
-        mcoords = [c[:, idx] for c, idx in zip(coords, matched_idx)]
-        mcoords = _get_matching_coords(mcoords, params, current_shape)
-        mdata = [arg.data[sorted_idx[0]][matched_idx[0]] for arg in matched_arrays]
-        mdata.append(arg2.data[sorted_idx[1]][matched_idx[1]])
-        matched_arrays = [COO(mcoords, md, shape=current_shape) for md in mdata]
+    Returns
+    -------
+    numpy.ndarray
+        The values of ``x`` at ``coords``.
+    """
+    return np.broadcast_to(x, shape)[tuple(coords)]
 
-        if cache is not None:
-            cache[key] = matched_arrays
 
-    return matched_arrays
+def _share_coords(args):
+    """
+    Checks whether the given canonical :obj:`COO` arrays all have the same shape
+    and the same coordinates, so that they can be operated on without matching.
 
+    Parameters
+    ----------
+    args : list[COO]
+        The input arrays.
 
-def _unmatch_coo(func, args, mask, cache, **kwargs):
+    Returns
+    -------
+    bool
+        Whether all the arrays share their sparsity structure.
     """
-    Matches the coordinates for any number of input :obj:`COO` arrays.
+    first = args[0]
+    for arg in args[1:]:
+        if arg.shape != first.shape or arg.nnz != first.nnz:
+            return False
 
-    First computes the matches, then filters out the non-matches.
+        # Arrays derived from the same source often share the coords object
+        # itself, which avoids comparing the coordinates altogether.
+        if arg.coords is not first.coords and not np.array_equal(arg.coords, first.coords):
+            return False
+
+    return True
+
+
+def _filter_zeros(coords, data, zero, shape):
+    """
+    Builds a canonical :obj:`COO` array out of sorted coordinates and data, dropping
+    any zeros. The coordinates are reused without copying if there are none.
 
     Parameters
     ----------
-    func : Callable
-        The function to compute matches
-    args : tuple[COO]
-        The input :obj:`COO` arrays.
-    mask : tuple[bool]
-        Specifies the inputs that are zero and the ones that are
-        nonzero.
-    kwargs: dict
-        Extra keyword arguments to pass to func.
+    coords : numpy.ndarray
+        The sorted coordinates without duplicates.
+    data : numpy.ndarray
+        The data corresponding to ``coords``.
+    zero : numpy.ndarray
+        The zero of the dtype of ``data``.
+    shape : tuple[int]
+        The shape of the output.
 
     Returns
     -------
-    matched_coords : list[ndarray]
-        The matched coordinates.
-    matched_data : list[ndarray]
-        The matched data.
+    COO
+        The output array.
     """
-    matched_args = [a for a, m in zip(args, mask) if m]
-    unmatched_args = [a for a, m in zip(args, mask) if not m]
+    nonzero = data != zero
+    if not nonzero.all():
+        coords = coords[:, nonzero]
+        data = data[nonzero]
 
-    matched_arrays = _match_coo(*matched_args, cache=cache)
+    return _wrap_coo(coords, data, shape, has_duplicates=False, sorted=True)
 
-    pos = tuple(i for i, m in enumerate(mask) if not m)
-    posargs = [_zero_of_dtype(arg.dtype)[()] for arg, m in zip(args, mask) if not m]
-    result_shape = _get_nary_broadcast_shape(*[arg.shape for arg in args])
 
-    partial = PositinalArgumentPartial(func, pos, posargs)
-    matched_func = partial(*[a.data for a in matched_arrays], **kwargs)
+def _merge_linear_locs(linear, sorted=False):
+    """
+    Merges the linear locations of any number of operands into their union.
 
-    unmatched_mask = matched_func != _zero_of_dtype(matched_func.dtype)
+    Parameters
+    ----------
+    linear : list[numpy.ndarray]
+        The linear locations of each operand. These must not contain
+        duplicates.
+    sorted : Union[bool, list[bool]], optional
+        Whether every input, or each one of them, is already sorted. Inputs
+        that aren't are sorted on their own before they are all merge joined.
+        :code:`False` by default.
 
-    if not unmatched_mask.any():
-        return [], []
+    Returns
+    -------
+    union : numpy.ndarray
+        The sorted union of all the linear locations.
+    positions : list[numpy.ndarray]
+        For each operand, the index into ``union`` of each of its elements.
+    """
+    if isinstance(sorted, bool):
+        sorted = [sorted] * len(linear)
+
+    # Sorting each operand on its own is cheaper than sorting them all together.
+    orders = [None if s else np.argsort(ll) for ll, s in zip(linear, sorted)]
+    linear = [ll if order is None else ll[order] for ll, order in zip(linear, orders)]
+
+    kernels = _get_kernels()
+    if kernels is not None and len(linear) > 2:
+        # Merges all the operands in a single pass.
+        all_linear = np.concatenate(linear)
+        offsets = np.cumsum([0] + [len(ll) for ll in linear])
+        union, all_positions = kernels.merge_sorted_k(all_linear, offsets)
+        positions = [all_positions[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+    else:
+        # Merges the operands pairwise in a balanced tree, so every element
+        # is only merged about log(len(linear)) times. The positions of an
+        # operand within its own run are left out until it's merged.
+        runs = [(ll, {i: None}) for i, ll in enumerate(linear)]
+        while len(runs) > 1:
+            merged = []
+            for (a, a_positions), (b, b_positions) in zip(runs[::2], runs[1::2]):
+                union, a_pos, b_pos = _merge_sorted(a, b)
+                run_positions = {i: a_pos if pos is None else a_pos[pos]
+                                 for i, pos in a_positions.items()}
+                run_positions.update((i, b_pos if pos is None else b_pos[pos])
+                                     for i, pos in b_positions.items())
+                merged.append((union, run_positions))
+
+            runs = merged + runs[len(merged) * 2:]
+
+        union, run_positions = runs[0]
+        positions = [np.arange(len(union)) if run_positions[i] is None else run_positions[i]
+                     for i in range(len(linear))]
+
+    for i, order in enumerate(orders):
+        if order is not None:
+            pos = np.empty_like(positions[i])
+            pos[order] = positions[i]
+            positions[i] = pos
+
+    return union, positions
+
+
+def _merge_sorted(a, b):
+    """
+    Merge joins two sorted arrays without duplicates.
 
-    func_data = matched_func[unmatched_mask]
-    func_coords = matched_arrays[0].coords[:, unmatched_mask]
+    Parameters
+    ----------
+    a, b : numpy.ndarray
+        The sorted 1-D input arrays.
 
-    func_array = COO(func_coords, func_data, shape=matched_arrays[0].shape).broadcast_to(result_shape)
+    Returns
+    -------
+    union : numpy.ndarray
+        The sorted union of ``a`` and ``b``.
+    a_pos, b_pos : numpy.ndarray
+        The index into ``union`` of every element of ``a`` and ``b``.
+    """
+    kernels = _get_kernels()
+    if kernels is not None:
+        dtype = np.result_type(a, b)
+        return kernels.merge_sorted(a.astype(dtype, copy=False), b.astype(dtype, copy=False))
 
-    if all(mask):
-        return [func_array.coords], [func_array.data]
+    if len(a) < len(b):
+        union, b_pos, a_pos = _merge_sorted(b, a)
+        return union, a_pos, b_pos
 
-    unmatched_mask = np.ones(func_array.nnz, dtype=np.bool)
+    # Only the smaller array is searched for. As its keys are sorted,
+    # searchsorted keeps narrowing its window instead of restarting
+    # from the whole of the larger array for every key.
+    idx = np.searchsorted(a, b)
+    found = idx < len(a)
+    found[found] = a[idx[found]] == b[found]
+    new = ~found
 
-    for arg in unmatched_args:
-        matched_idx = _match_coo(func_array, arg, return_midx=True)[0]
-        unmatched_mask[matched_idx] = False
+    b_pos = idx + (np.cumsum(new) - new)
+    a_pos = np.arange(len(a)) + np.cumsum(np.bincount(idx[new], minlength=len(a) + 1))[:len(a)]
 
-    coords = np.asarray(func_array.coords[:, unmatched_mask], order='C')
-    data = np.asarray(func_array.data[unmatched_mask], order='C')
+    union = np.empty(len(a) + len(b) - np.count_nonzero(found), dtype=np.result_type(a, b))
+    union[a_pos] = a
+    union[b_pos] = b
 
-    return [coords], [data]
+    return union, a_pos, b_pos
 
 
 def _get_nary_broadcast_shape(*shapes):
@@ -2453,7 +4943,8 @@ def _get_reduced_shape(shape, params):
 def _get_expanded_coords_data(coords, data, params, broadcast_shape):
     """
     Expand coordinates/data to broadcast_shape. Does most of the heavy lifting for broadcast_to.
-    Produces sorted output for sorted inputs.
+    Produces sorted output for sorted inputs, as long as no broadcast dimension lies
+    between two non-broadcast ones.
 
     Parameters
     ----------
@@ -2483,6 +4974,11 @@ def _get_expanded_coords_data(coords, data, params, broadcast_shape):
         if not p:
             expand_shapes.append(l)
 
+    # Every dimension is broadcast, so the nonzeros become the innermost axis.
+    if first_dim == -1:
+        expand_shapes.append(coords.shape[1])
+        first_dim = len(broadcast_shape)
+
     all_idx = _cartesian_product(*(np.arange(d, dtype=np.min_scalar_type(d - 1)) for d in expand_shapes))
     dt = np.result_type(*(np.min_scalar_type(l - 1) for l in broadcast_shape))
 
@@ -2535,6 +5031,93 @@ def _cartesian_product(*arrays):
     return out.reshape(cols, rows)
 
 
+def _elemwise_out(func, out, *args, **kwargs):
+    """
+    Apply a :code:`ufunc` to the given arguments, storing the result in ``out``.
+
+    If all sparse operands have the same sparsity structure as ``out``, and the
+    arguments are otherwise scalars, the result has that structure too. It is then
+    written into the existing ``out.data`` buffer, without any allocations.
+    Otherwise, the result is computed with :obj:`elemwise` and ``out`` is made to
+    hold it.
+
+    Parameters
+    ----------
+    func : numpy.ufunc
+        The function to apply.
+    out : COO
+        The array to store the result in.
+    args : tuple
+        The arguments to the function.
+    kwargs : dict
+        Additional arguments to pass to the function.
+
+    Returns
+    -------
+    COO
+        ``out``, holding the result.
+
+    Raises
+    ------
+    ValueError
+        If the result would be dense, or doesn't have the shape of ``out``.
+    """
+    if out._is_view:
+        # Views share their data with the array they come from, which must not
+        # be changed through them, so they're copied on their first write.
+        out.data = out.data.copy()
+        out._is_view = False
+
+    sparse_args = [arg for arg in args if isinstance(arg, COO)]
+    out.sum_duplicates()
+    for arg in sparse_args:
+        arg.sum_duplicates()
+
+    in_place = all(isinstance(arg, COO) or isscalar(arg)
+                   or (isinstance(arg, np.ndarray) and not arg.shape) for arg in args)
+    in_place = in_place and all(arg.shape == out.shape for arg in sparse_args)
+    in_place = in_place and _share_coords([out] + sparse_args)
+
+    if in_place:
+        # The other arguments are all scalars here.
+        in_place = not _func_at_zeros(func, args, kwargs)[1]
+    elif all(isinstance(arg, (COO, np.ndarray)) or isscalar(arg) for arg in args) and \
+            _func_at_zeros(func, args, kwargs, full=False)[1]:
+        # Fail before the dense result is computed.
+        raise ValueError("Performing this operation would produce "
+                         "a dense result: %s" % str(func))
+
+    if in_place:
+        func(*[arg.data if isinstance(arg, COO) else arg for arg in args],
+             out=out.data, **kwargs)
+
+        if np.count_nonzero(out.data) != len(out.data):
+            nonzero = out.data != 0
+            out.coords = out.coords[:, nonzero]
+            out.data = out.data[nonzero]
+
+        out._clear_cache()
+        return out
+
+    result = elemwise(func, *args, **kwargs)
+
+    if not isinstance(result, COO):
+        raise ValueError("Performing this operation would produce "
+                         "a dense result: %s" % str(func))
+
+    if result.shape != out.shape:
+        raise ValueError("The output has shape %s, but the result has shape %s."
+                         % (out.shape, result.shape))
+
+    out.coords = result.coords
+    out.data = result.data.astype(out.dtype, casting=kwargs.get('casting', 'same_kind'),
+                                  copy=False)
+    out.has_duplicates = result.has_duplicates
+    out.sorted = result.sorted
+    out._clear_cache()
+    return out
+
+
 def _elemwise_unary(func, self, *args, **kwargs):
     check = kwargs.pop('check', True)
     data_zero = _zero_of_dtype(self.dtype)
@@ -2547,45 +5130,17 @@ def _elemwise_unary(func, self, *args, **kwargs):
     data_func = func(self.data, *args, **kwargs)
     nonzero = data_func != func_zero
 
-    return COO(self.coords[:, nonzero], data_func[nonzero],
-               shape=self.shape,
-               has_duplicates=self.has_duplicates,
-               sorted=self.sorted)
-
-
-def _get_matching_coords(coords, params, shape):
-    """
-    Get the matching coords across a number of broadcast operands.
-
-    Parameters
-    ----------
-    coords : list[numpy.ndarray]
-        The input coordinates.
-    params : list[Union[bool, none]]
-        The broadcast parameters.
-    Returns
-    -------
-    numpy.ndarray
-        The broacasted coordinates
-    """
-    matching_coords = []
-    dims = np.zeros(len(coords), dtype=np.uint8)
-
-    for p_all in zip(*params):
-        for i, p in enumerate(p_all):
-            if p:
-                matching_coords.append(coords[i][dims[i]])
-                break
-        else:
-            matching_coords.append(coords[dims[0]])
-
-        for i, p in enumerate(p_all):
-            if p is not None:
-                dims[i] += 1
-
-    dtype = np.min_scalar_type(max(shape) - 1)
+    # Keep sharing the coordinates with the input where possible, so that
+    # later operations between the two can skip matching.
+    if nonzero.all():
+        coords = self.coords
+    else:
+        coords = self.coords[:, nonzero]
+        data_func = data_func[nonzero]
 
-    return np.asarray(matching_coords, dtype=dtype)
+    return _wrap_coo(coords, data_func, self.shape,
+                     has_duplicates=self.has_duplicates,
+                     sorted=self.sorted)
 
 
 def _linear_loc(coords, shape, signed=False):
@@ -2593,6 +5148,12 @@ def _linear_loc(coords, shape, signed=False):
     if signed:
         n = -n
     dtype = np.min_scalar_type(n)
+
+    kernels = _get_kernels()
+    if kernels is not None and abs(n) < 2 ** 63 and coords.dtype != np.uint64:
+        out = np.empty(coords.shape[1], dtype=dtype)
+        return kernels.linear_loc(coords, np.array(shape, dtype=np.int64), out)
+
     out = np.zeros(coords.shape[1], dtype=dtype)
     tmp = np.zeros(coords.shape[1], dtype=dtype)
     strides = 1
@@ -2603,6 +5164,37 @@ def _linear_loc(coords, shape, signed=False):
     return out
 
 
+def _get_coords_from_linear_loc(linear, shape):
+    """
+    Converts linear locations into coordinates. The inverse of :obj:`_linear_loc`.
+
+    Parameters
+    ----------
+    linear : numpy.ndarray
+        The linear locations.
+    shape : tuple[int]
+        The shape of the array the locations refer to.
+
+    Returns
+    -------
+    numpy.ndarray
+        The coordinates, with shape ``(len(shape), len(linear))``.
+    """
+    max_shape = max(shape) if len(shape) != 0 else 1
+    coords = np.empty((len(shape), len(linear)), dtype=np.min_scalar_type(max_shape - 1))
+
+    kernels = _get_kernels()
+    if kernels is not None:
+        return kernels.coords_from_linear_loc(linear, np.array(shape, dtype=linear.dtype), coords)
+
+    strides = 1
+    for i, d in enumerate(shape[::-1]):
+        coords[-(i + 1), :] = (linear // strides) % d
+        strides *= d
+
+    return coords
+
+
 def asCOO(x, name='asCOO', check=True):
     """
     Convert the input to :obj:`COO`. Passes through :obj:`COO` objects as-is.
@@ -2815,3 +5407,147 @@ def nanprod(x, axis=None, keepdims=False, dtype=None, out=None):
     assert out is None
     x = asCOO(x)
     return x.nanreduce(np.multiply, axis=axis, keepdims=keepdims, dtype=dtype)
+
+
+def segment_reduce(x, labels, axis=0, ufunc=np.add, num_segments=None):
+    """
+    Reduces the slices of an array along an axis that share a label. This is a
+    group-by along the axis, like :obj:`pandas.DataFrame.groupby` followed by an
+    aggregation.
+
+    The coordinates along the axis are mapped to their labels in one pass, and
+    then all nonzeros that land on the same coordinates are reduced in a single
+    grouped reduction, without building a one-hot array to multiply with.
+
+    Parameters
+    ----------
+    x : SparseArray
+        The array to reduce.
+    labels : numpy.ndarray
+        The non-negative integer label of every slice along the axis.
+    axis : int, optional
+        The axis to reduce along. Uses the first axis by default.
+    ufunc : Union[numpy.ufunc, str], optional
+        The :code:`ufunc` to reduce with, such as :obj:`numpy.add`,
+        :obj:`numpy.maximum` or :obj:`numpy.minimum`. May also be ``'count'``,
+        to count the nonzeros with every label. Sums by default.
+    num_segments : int, optional
+        The size of the result along the axis. Defaults to one more than the
+        largest label.
+
+    Returns
+    -------
+    COO
+        The reduced array. Its size along the axis is the number of segments, and
+        the slice at every index is the reduction of the slices with that label.
+
+    Raises
+    ------
+    ValueError
+        If the labels don't match the axis, if any of them is negative or not
+        less than ``num_segments``, or if the reduction would produce a dense
+        result.
+
+    See Also
+    --------
+    COO.reduce : Reduce along whole axes.
+    numpy.ufunc.reduceat : Reduce contiguous ranges along an axis.
+
+    Notes
+    -----
+    This function internally calls :obj:`COO.sum_duplicates` to bring the array into
+    canonical form, except for sums, which don't depend on whether duplicates
+    are summed first.
+
+    Examples
+    --------
+    >>> import sparse
+    >>> x = np.array([[1, 0, 2], [0, 3, 0], [4, 0, 0]])
+    >>> s = COO.from_numpy(x)
+    >>> labels = np.array([1, 0, 1])
+    >>> sparse.segment_reduce(s, labels).todense()  # doctest: +NORMALIZE_WHITESPACE
+    array([[0, 3, 0],
+           [5, 0, 2]])
+    >>> sparse.segment_reduce(s, labels, ufunc=np.maximum).todense()  # doctest: +NORMALIZE_WHITESPACE
+    array([[0, 3, 0],
+           [4, 0, 2]])
+    >>> sparse.segment_reduce(s, labels, ufunc='count').todense()  # doctest: +NORMALIZE_WHITESPACE
+    array([[0, 1, 0],
+           [2, 0, 1]])
+    """
+    x = asCOO(x, name='segment_reduce')
+    axis = _normalize_axis(axis, x.ndim)
+    labels = np.asarray(labels)
+
+    if labels.shape != (x.shape[axis],) or (labels.size and labels.dtype.kind not in 'iu'):
+        raise ValueError("labels must be a one-dimensional integer array with one "
+                         "label for each of the %d slices along axis %d."
+                         % (x.shape[axis], axis))
+
+    labels = labels.astype(np.intp)
+
+    if labels.size and labels.min() < 0:
+        raise ValueError("labels must not be negative.")
+
+    if num_segments is None:
+        num_segments = labels.max() + 1 if labels.size else 0
+    elif labels.size and labels.max() >= num_segments:
+        raise ValueError("labels must be less than num_segments, %d." % num_segments)
+
+    segment_sizes = np.bincount(labels, minlength=num_segments)
+    shape = x.shape[:axis] + (int(num_segments),) + x.shape[axis + 1:]
+
+    count = isinstance(ufunc, str)
+    if count and ufunc != 'count':
+        raise ValueError("Unknown reduction %r, must be a ufunc or 'count'." % ufunc)
+
+    if count:
+        x.sum_duplicates()
+        method = np.add
+        data = (x.data != _zero_of_dtype(x.dtype)).astype(np.intp)
+        result_dtype = data.dtype
+    else:
+        method = ufunc
+        sizes = np.unique(segment_sizes[segment_sizes != 0])
+        zero_reduce_result = _reduce_zeros(method, sizes, x.dtype) if len(sizes) \
+            else _reduce_zeros(method, 1, x.dtype)
+        result_dtype = zero_reduce_result.dtype
+
+        if (zero_reduce_result != _zero_of_dtype(result_dtype)).any():
+            raise ValueError("Performing this reduction operation would produce "
+                             "a dense result: %s" % str(method))
+
+        if not _is_duplicate_safe(method, x.dtype, result_dtype):
+            x.sum_duplicates()
+
+        data = x.data
+
+    coords = x.coords.astype(np.intp)
+    coords[axis] = labels[coords[axis]]
+    keys = np.ravel_multi_index(tuple(coords), shape)
+    n_cells = reduce(operator.mul, shape, 1)
+
+    float_sum = method is np.add and result_dtype == np.float64 and data.dtype == np.float64
+    if n_cells <= len(keys) and (count or float_sum):
+        # Adding zeros changes nothing, so the sums are only scattered.
+        sums = np.bincount(keys, weights=data, minlength=n_cells)
+        keys = np.flatnonzero(sums)
+        result = sums[keys].astype(result_dtype)
+    else:
+        # The groups only need to be contiguous, so the sort needn't be stable.
+        order = np.argsort(keys)
+        keys = keys[order]
+        data = data[order]
+
+        result, inv_idx, counts = _grouped_reduce(data, keys, method, dtype=result_dtype)
+        keys = keys[inv_idx]
+
+        if not count:
+            segments = (keys // reduce(operator.mul, shape[axis + 1:], 1)) % shape[axis]
+            missing_counts = counts != segment_sizes[segments]
+            result[missing_counts] = method(result[missing_counts],
+                                            _zero_of_dtype(x.dtype))
+
+    mask = result != _zero_of_dtype(result.dtype)
+    coords = _get_coords_from_linear_loc(keys[mask], shape)
+    return COO(coords, result[mask], shape=shape, has_duplicates=False, sorted=True)
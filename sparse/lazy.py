@@ -0,0 +1,159 @@
+from __future__ import absolute_import, division, print_function
+
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+from .coo import elemwise, asCOO, _get_nary_broadcast_shape
+from .utils import isscalar
+
+
+class LazyCOO(NDArrayOperatorsMixin):
+    """
+    A lazily evaluated element-wise expression of :obj:`COO` arrays.
+
+    Operators and :code:`ufunc` calls on :obj:`LazyCOO` objects aren't performed
+    right away, but recorded into an expression graph. :obj:`LazyCOO.compute`
+    then evaluates the whole expression with a single call to :obj:`elemwise`,
+    so that the coordinates of all operands are only matched once and no
+    intermediate arrays are built.
+
+    Parameters
+    ----------
+    array : Union[COO, SparseArray, scipy.sparse.spmatrix]
+        The array to wrap.
+
+    See Also
+    --------
+    COO.lazy : Wrap a :obj:`COO` array in a :obj:`LazyCOO`.
+    elemwise : Apply a function to any number of arguments.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from sparse import COO
+    >>> a = COO.from_numpy(np.eye(3, dtype=np.int64))
+    >>> b = COO.from_numpy(np.arange(9).reshape((3, 3)))
+    >>> expr = a.lazy() * b + a - b.lazy() * 2
+    >>> expr
+    <LazyCOO: shape=(3, 3), operands=2>
+    >>> expr.compute().todense()  # doctest: +NORMALIZE_WHITESPACE
+    array([[  1,  -2,  -4],
+           [ -6,  -3, -10],
+           [-12, -14,  -7]])
+
+    Intermediate results are never computed, so they may be dense as long as the
+    whole expression isn't.
+
+    >>> ((a.lazy() + 1) - 1).compute()
+    <COO: shape=(3, 3), dtype=int64, nnz=3, sorted=True, duplicates=False>
+    """
+    __array_priority__ = 13
+
+    def __init__(self, array):
+        self._func = None
+        self._args = (asCOO(array, name='LazyCOO'),)
+        self._kwargs = {}
+
+    @classmethod
+    def _from_ufunc(cls, func, args, kwargs):
+        result = cls.__new__(cls)
+        result._func = func
+        result._args = tuple(args)
+        result._kwargs = kwargs
+        return result
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == '__call__' and ufunc.nout == 1 and 'out' not in kwargs:
+            return LazyCOO._from_ufunc(ufunc, inputs, kwargs)
+
+        inputs = tuple(x.compute() if isinstance(x, LazyCOO) else x for x in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __str__(self):
+        operands = [leaf for leaf in self._leaves() if not isscalar(leaf)]
+        return "<LazyCOO: shape=%s, operands=%d>" % (self.shape, len(operands))
+
+    __repr__ = __str__
+
+    @property
+    def shape(self):
+        """
+        The shape of the result of this expression.
+
+        Returns
+        -------
+        tuple[int]
+            The shape of the result.
+        """
+        return _get_nary_broadcast_shape(*[leaf.shape for leaf in self._leaves()
+                                           if not isscalar(leaf)])
+
+    @property
+    def ndim(self):
+        """
+        The number of dimensions of the result of this expression.
+
+        Returns
+        -------
+        int
+            The number of dimensions of the result.
+        """
+        return len(self.shape)
+
+    def compute(self):
+        """
+        Evaluates this expression in a single fused pass.
+
+        Returns
+        -------
+        COO
+            The result of the expression.
+
+        Raises
+        ------
+        ValueError
+            If the result of the whole expression would be dense.
+        """
+        leaves = self._leaves()
+        index = {id(leaf): i for i, leaf in enumerate(leaves)}
+
+        def fused(*values):
+            return self._evaluate(values, index, {})
+
+        return elemwise(fused, *leaves)
+
+    def _leaves(self):
+        """
+        Gets the distinct operands of this expression, in order of appearance.
+        """
+        leaves = []
+        seen = set()
+
+        def visit(node):
+            seen.add(id(node))
+            for arg in node._args:
+                if id(arg) in seen:
+                    continue
+
+                if isinstance(arg, LazyCOO):
+                    visit(arg)
+                else:
+                    seen.add(id(arg))
+                    leaves.append(arg)
+
+        visit(self)
+        return leaves
+
+    def _evaluate(self, values, index, cache):
+        """
+        Evaluates this node on the given values of the operands. Shared
+        subexpressions are only evaluated once.
+        """
+        if id(self) in cache:
+            return cache[id(self)]
+
+        args = [arg._evaluate(values, index, cache) if isinstance(arg, LazyCOO)
+                else values[index[id(arg)]] for arg in self._args]
+
+        result = args[0] if self._func is None else self._func(*args, **self._kwargs)
+        cache[id(self)] = result
+        return result
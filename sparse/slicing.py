@@ -32,7 +32,7 @@ def normalize_index(idx, shape):
     idx = replace_ellipsis(len(shape), idx)
     n_sliced_dims = 0
     for i in idx:
-        if hasattr(i, 'ndim') and i.ndim >= 1:
+        if hasattr(i, 'ndim') and i.ndim >= 1 and i.dtype == bool:
             n_sliced_dims += i.ndim
         elif i is None:
             continue
@@ -163,6 +163,9 @@ def sanitize_index(ind):
         return np.asanyarray(nonzero)
     elif np.issubdtype(index_array.dtype, np.integer):
         return index_array
+    elif index_array.size == 0:
+        # An empty list, which NumPy treats as an integer index.
+        return index_array.astype(np.intp)
     else:
         raise IndexError("only integers, slices (`:`), ellipsis (`...`), numpy.newaxis (`None`) and "
                          "integer or boolean arrays are valid indices")
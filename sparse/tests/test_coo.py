@@ -1,6 +1,9 @@
 import pytest
 
 import operator
+import os
+import subprocess
+import sys
 
 import numpy as np
 import scipy.sparse
@@ -29,6 +32,188 @@ def test_reductions(reduction, axis, keepdims, kwargs, eqkwargs):
     assert_eq(xx, yy, **eqkwargs)
 
 
+@pytest.mark.parametrize('reduction', ['sum', 'max', 'min', 'prod'])
+@pytest.mark.parametrize('axis', [0, 1, 2, (0, 2), (1, 2)])
+@pytest.mark.parametrize('density', [0.01, 0.9])
+@pytest.mark.parametrize('dtype', [np.float64, np.int64])
+def test_reductions_grouping(reduction, axis, density, dtype):
+    x = sparse.random((10, 20, 30), density=density,
+                      data_rvs=lambda n: np.random.randint(-5, 6, size=n)).astype(dtype)
+    y = x.todense()
+
+    assert_eq(getattr(x, reduction)(axis=axis), getattr(y, reduction)(axis=axis))
+
+
+@pytest.mark.parametrize('reduction,kwargs', [
+    ('sum', {}),
+    ('sum', {'dtype': np.float32}),
+    ('max', {}),
+    ('min', {}),
+    ('prod', {}),
+])
+@pytest.mark.parametrize('axis', [None, 0, 1, (0, 2)])
+def test_reductions_duplicates(reduction, kwargs, axis):
+    coords = np.random.randint(0, 3, size=(3, 40))
+    data = np.random.randint(-3, 4, size=40).astype(np.float64)
+    x = COO(coords, data, shape=(3, 3, 3))
+    y = COO(coords, data, shape=(3, 3, 3)).todense()
+    orig_coords, orig_data = x.coords, x.data
+
+    assert_eq(getattr(x, reduction)(axis=axis, **kwargs),
+              getattr(y, reduction)(axis=axis, **kwargs))
+
+    if reduction == 'sum' and not kwargs:
+        assert x.coords is orig_coords and x.data is orig_data
+        assert x.has_duplicates and not x.sorted
+
+
+@pytest.mark.parametrize('method', [np.logaddexp, np.add, np.multiply])
+@pytest.mark.parametrize('axis', [None, 0, 1, (0, 2)])
+def test_reduce_allow_dense(method, axis):
+    x = sparse.random((4, 5, 6), density=0.3)
+    y = x.todense()
+
+    # Reduce the flattened axes, as logaddexp only reduces one axis at a time.
+    axes = tuple(range(y.ndim)) if axis is None else np.atleast_1d(axis).tolist()
+    y = np.moveaxis(y, axes, range(-len(axes), 0))
+    xx = method.reduce(y.reshape(y.shape[:y.ndim - len(axes)] + (-1,)), axis=-1)
+
+    assert_eq(x.reduce(method, axis=axis, allow_dense=True), xx)
+
+
+def test_reduce_dense_fails():
+    x = sparse.random((4, 5), density=0.3)
+
+    with pytest.raises(ValueError):
+        x.reduce(np.logaddexp, axis=1)
+
+
+def test_sum_bool_duplicates():
+    x = COO(np.array([[0, 0, 1]]), np.array([True, True, True]), shape=(3,))
+
+    assert x.sum() == 2
+
+
+@pytest.mark.parametrize('reduction,kwargs', [
+    ('mean', {}),
+    ('mean', {'dtype': np.float32}),
+    ('var', {}),
+    ('var', {'ddof': 1}),
+    ('std', {}),
+    ('any', {}),
+    ('all', {}),
+])
+@pytest.mark.parametrize('axis', [None, 0, 1, 2, (0, 2), -1])
+@pytest.mark.parametrize('keepdims', [True, False])
+@pytest.mark.parametrize('density', [0.25, 1.0])
+def test_statistics(reduction, kwargs, axis, keepdims, density):
+    x = sparse.random((2, 3, 4), density=density, data_rvs=lambda n: np.random.rand(n) + 100)
+    y = x.todense()
+    xx = getattr(x, reduction)(axis=axis, keepdims=keepdims, **kwargs)
+    yy = getattr(y, reduction)(axis=axis, keepdims=keepdims, **kwargs)
+    assert_eq(xx, yy)
+
+
+@pytest.mark.parametrize('func', [np.mean, np.var, np.std, np.any, np.all, np.argmax, np.argmin])
+def test_statistics_numpy_functions(func):
+    x = sparse.random((5, 6), density=0.5)
+    y = x.todense()
+    assert_eq(func(x, axis=1), func(y, axis=1))
+
+
+@pytest.mark.parametrize('reduction', ['argmax', 'argmin'])
+@pytest.mark.parametrize('axis', [None, 0, 1, -1])
+@pytest.mark.parametrize('density', [0.1, 0.5, 1.0])
+def test_arg_extremes(reduction, axis, density):
+    x = sparse.random((20, 6), density=density,
+                      data_rvs=lambda n: np.random.randint(-3, 4, size=n))
+    y = x.todense()
+    xx = getattr(x, reduction)(axis=axis)
+    yy = getattr(y, reduction)(axis=axis)
+    assert_eq(xx, yy)
+
+
+@pytest.mark.parametrize('reduction', ['argmax', 'argmin'])
+def test_arg_extremes_special(reduction):
+    coords = np.array([[0, 0, 1, 1, 2, 2, 3, 3, 3],
+                       [1, 3, 0, 2, 1, 2, 0, 1, 2]])
+    data = np.array([-1.0, 0.0, 2.0, np.nan, 1.0, -1.0, 0.0, 0.0, 0.0])
+    x = COO(coords, data, shape=(4, 4))
+    y = x.todense()
+
+    assert_eq(getattr(x, reduction)(axis=1), getattr(y, reduction)(axis=1))
+    assert getattr(x, reduction)() == getattr(y, reduction)()
+
+
+def test_arg_extremes_fails():
+    x = sparse.random((2, 3, 4), density=0.5)
+
+    with pytest.raises(TypeError):
+        x.argmax(axis=(0, 1))
+
+    with pytest.raises(ValueError):
+        x.argmin(axis=3)
+
+
+@pytest.mark.parametrize('axis', [None, 0, 1, (0, 2), -1])
+@pytest.mark.parametrize('keepdims', [True, False])
+@pytest.mark.parametrize('dtype', [np.float64, np.int64, np.bool_])
+def test_aggregate(axis, keepdims, dtype):
+    x = sparse.random((3, 4, 5), density=0.3,
+                      data_rvs=lambda n: np.random.randint(-3, 4, size=n)).astype(dtype)
+    y = x.todense()
+    ops = ('sum', 'prod', 'min', 'max', 'mean', 'var', 'std')
+    result = x.aggregate(axis=axis, ops=ops + ('count',), keepdims=keepdims)
+
+    for op in ops:
+        assert_eq(result[op], getattr(y, op)(axis=axis, keepdims=keepdims))
+
+    assert_eq(result['count'], np.sum(y != 0, axis=axis, keepdims=keepdims))
+
+
+def test_aggregate_fails():
+    x = sparse.random((2, 3), density=0.5)
+
+    with pytest.raises(ValueError):
+        x.aggregate(ops=('sum', 'median'))
+
+
+@pytest.mark.parametrize('ufunc', [np.add, np.maximum, np.minimum, 'count'])
+@pytest.mark.parametrize('axis', [0, 1, -1])
+@pytest.mark.parametrize('density', [0.2, 0.9])
+def test_segment_reduce(ufunc, axis, density):
+    x = sparse.random((6, 7, 8), density=density,
+                      data_rvs=lambda n: np.random.randint(-3, 4, size=n))
+    y = np.moveaxis(x.todense(), axis, 0)
+    labels = np.random.randint(0, 4, size=y.shape[0])
+
+    expected = np.zeros((5,) + y.shape[1:], dtype=y.dtype)
+    for label in np.unique(labels):
+        if ufunc == 'count':
+            expected[label] = np.sum(y[labels == label] != 0, axis=0)
+        else:
+            expected[label] = ufunc.reduce(y[labels == label], axis=0)
+
+    result = sparse.segment_reduce(x, labels, axis=axis, ufunc=ufunc, num_segments=5)
+    assert_eq(result, np.moveaxis(expected, 0, axis))
+
+
+def test_segment_reduce_fails():
+    x = sparse.random((6, 7), density=0.5)
+
+    with pytest.raises(ValueError):
+        sparse.segment_reduce(x, np.zeros(5, dtype=np.intp))
+
+    with pytest.raises(ValueError):
+        sparse.segment_reduce(x, np.arange(6) - 1)
+
+    with pytest.raises(ValueError):
+        sparse.segment_reduce(x, np.arange(6), num_segments=3)
+
+    with pytest.raises(ValueError):
+        sparse.segment_reduce(x, np.zeros(6, dtype=np.intp), ufunc=np.logaddexp)
+
+
 @pytest.mark.parametrize('reduction,kwargs,eqkwargs', [
     (np.max, {}, {}),
     (np.sum, {}, {}),
@@ -81,6 +266,44 @@ def test_nan_reductions(reduction, axis, keepdims, fraction):
     assert_eq(expected, actual, equal_nan=True, check_nnz=False)
 
 
+@pytest.mark.parametrize('reduction', ['nansum', 'nanprod'])
+@pytest.mark.parametrize('axis', [None, 0, 1, (0, 2), (1, 2)])
+@pytest.mark.parametrize('block_size', [1, 3, 7])
+def test_nan_reductions_blocks(monkeypatch, reduction, axis, block_size):
+    monkeypatch.setattr(sparse.coo, '_NAN_BLOCK_SIZE', block_size)
+
+    s = sparse.random((5, 6, 7), data_rvs=random_value_array(np.nan, 0.25),
+                      density=.5)
+    x = s.todense()
+    data = s.data.copy()
+    expected = getattr(np, reduction)(x, axis=axis)
+    actual = getattr(sparse, reduction)(s, axis=axis)
+    assert_eq(expected, actual, check_nnz=False)
+
+    # The NaNs are only filled in copies of the data.
+    np.testing.assert_array_equal(s.data, data)
+
+
+@pytest.mark.parametrize('reduction', ['nansum', 'nanprod', 'nanmax'])
+@pytest.mark.parametrize('axis', [0, 2, (0, 2)])
+@pytest.mark.parametrize('block_size', [1, 3, 7])
+def test_nan_reductions_unsorted_blocks(monkeypatch, reduction, axis, block_size):
+    monkeypatch.setattr(sparse.coo, '_NAN_BLOCK_SIZE', block_size)
+
+    s = sparse.random((5, 6, 7), data_rvs=random_value_array(np.nan, 0.25),
+                      density=.5)
+    x = s.todense()
+    perm = np.random.permutation(s.nnz)
+    s = COO(s.coords[:, perm], s.data[perm], shape=s.shape, sorted=False)
+    n_nans = np.isnan(s.data).sum()
+    expected = getattr(np, reduction)(x, axis=axis)
+    actual = getattr(sparse, reduction)(s, axis=axis)
+    assert_eq(expected, actual, check_nnz=False)
+
+    # The NaNs are only filled in the gathered blocks.
+    assert np.isnan(s.data).sum() == n_nans
+
+
 @pytest.mark.parametrize('reduction', [
     'nanmax',
     'nanmin',
@@ -94,6 +317,93 @@ def test_all_nan_reduction_warning(reduction, axis):
         getattr(sparse, reduction)(s, axis=axis)
 
 
+@pytest.mark.parametrize('ufunc', [np.add, np.multiply, np.maximum, np.logical_or])
+@pytest.mark.parametrize('axis', [0, 1, -1])
+@pytest.mark.filterwarnings('ignore:The result of this accumulation is dense')
+def test_ufunc_accumulate(ufunc, axis):
+    s = sparse.random((4, 5, 6), density=0.1)
+    x = s.todense()
+
+    assert_eq(ufunc.accumulate(s, axis=axis), ufunc.accumulate(x, axis=axis))
+
+
+@pytest.mark.parametrize('ufunc', [
+    np.subtract,
+    np.minimum,
+    np.logical_xor,
+    # Accumulating more zeros keeps changing the result.
+    np.nextafter,
+])
+@pytest.mark.parametrize('dtype', [np.float64, np.int64, np.bool_])
+@pytest.mark.parametrize('axis', [0, 1, -1])
+@pytest.mark.filterwarnings('ignore:The result of this accumulation is dense')
+def test_ufunc_accumulate_gaps(ufunc, dtype, axis):
+    if (ufunc is np.subtract and dtype is np.bool_) or (ufunc is np.nextafter and dtype is not np.float64):
+        pytest.skip('Not supported for this dtype.')
+
+    s = sparse.random((4, 5, 9), density=0.2, data_rvs=lambda n: np.random.randn(n) * 5).astype(dtype)
+    x = s.todense()
+
+    assert_eq(ufunc.accumulate(s, axis=axis), ufunc.accumulate(x, axis=axis))
+
+
+def test_ufunc_accumulate_dense():
+    s = sparse.random((4, 5), density=0.5)
+    with pytest.raises(ValueError):
+        np.logaddexp.accumulate(s)
+
+    with pytest.warns(RuntimeWarning):
+        np.add.accumulate(s, axis=1)
+
+
+@pytest.mark.parametrize('ufunc', [np.add, np.multiply, np.maximum])
+@pytest.mark.parametrize('indices', [[0, 2, 3], [3, 1, 4], [0, 0, 4], [4], [0, 1, 2, 3, 4]])
+@pytest.mark.parametrize('axis', [0, 1, 2])
+def test_ufunc_reduceat(ufunc, indices, axis):
+    s = sparse.random((5, 6, 7), density=0.2)
+    x = s.todense()
+
+    assert_eq(ufunc.reduceat(s, indices, axis=axis), ufunc.reduceat(x, indices, axis=axis))
+
+
+def test_ufunc_reduceat_fails():
+    s = sparse.random((5, 6), density=0.2)
+
+    with pytest.raises(IndexError):
+        np.add.reduceat(s, [0, 6], axis=1)
+
+    with pytest.raises(ValueError):
+        np.add.reduceat(s, [0, 2], axis=2)
+
+
+@pytest.mark.parametrize('ufunc, a_shape, b_shape', [
+    (np.multiply, (3, 4), (5,)),
+    (np.multiply, (3,), (4, 5)),
+    (np.logical_and, (3, 4), (5, 2)),
+    (np.minimum, (6,), (7,)),
+])
+def test_ufunc_outer(ufunc, a_shape, b_shape):
+    a = sparse.random(a_shape, density=0.3)
+    b = sparse.random(b_shape, density=0.3)
+
+    result = ufunc.outer(a, b)
+
+    assert_eq(result, ufunc.outer(a.todense(), b.todense()))
+    assert result.nnz <= a.nnz * b.nnz
+
+
+def test_ufunc_outer_dense():
+    a = sparse.random((3, 4), density=0.3)
+    b = sparse.random((5,), density=0.3)
+
+    assert_eq(np.multiply.outer(a, b.todense()), np.multiply.outer(a.todense(), b.todense()))
+    assert_eq(np.add.outer(a, b.todense()), np.add.outer(a.todense(), b.todense()))
+    assert_eq(np.add.outer(a, b), np.add.outer(a.todense(), b.todense()))
+
+    with pytest.raises(ValueError):
+        np.logaddexp.outer(a, b)
+
+
 @pytest.mark.parametrize('axis', [
     None,
     (1, 2, 0),
@@ -340,6 +650,33 @@ def test_broadcast_to(shape1, shape2):
     assert_eq(np.broadcast_to(x, shape2), a.broadcast_to(shape2))
 
 
+@pytest.mark.parametrize('shape1,shape2', [((3, 4), (2, 3, 4)),
+                                           ((3, 1, 4), (3, 2, 4)),
+                                           ((3, 4, 1), (3, 4, 2)),
+                                           ((1, 1), (2, 3))])
+def test_broadcast_to_canonical(shape1, shape2):
+    a = sparse.random(shape1, density=0.5, canonical_order=True)
+    x = a.todense()
+
+    # assert_eq checks that arrays flagged as sorted really are.
+    assert_eq(np.broadcast_to(x, shape2), a.broadcast_to(shape2))
+
+
+@pytest.mark.parametrize('func', [operator.add, operator.mul, operator.sub])
+@pytest.mark.parametrize('density1,density2', [(0.5, 0.5), (0.9, 0.01), (0.01, 0.9), (0, 0.5)])
+def test_elemwise_binary_canonical(func, density1, density2):
+    xs = sparse.random((20, 30), density=density1, canonical_order=True)
+    ys = sparse.random((20, 30), density=density2, canonical_order=True)
+
+    x = xs.todense()
+    y = ys.todense()
+
+    fs = func(xs, ys)
+    assert fs.sorted and not fs.has_duplicates
+
+    assert_eq(fs, func(x, y))
+
+
 @pytest.mark.parametrize('shapes', [
     [
         (2,),
@@ -441,45 +778,233 @@ def test_trinary_broadcasting_pathological(shapes, func, value, fraction):
 
 
 def test_sparse_broadcasting(monkeypatch):
-    orig_unmatch_coo = sparse.coo._unmatch_coo
+    orig_merge_linear_locs = sparse.coo._merge_linear_locs
 
-    state = {'num_matches': 0}
+    state = {'num_merges': 0}
 
     xs = sparse.random((3, 4), density=0.5)
     ys = sparse.random((3, 4), density=0.5)
 
-    def mock_unmatch_coo(*args, **kwargs):
-        result = orig_unmatch_coo(*args, **kwargs)
-        state['num_matches'] += len(result[0])
-        return result
+    def mock_merge_linear_locs(*args, **kwargs):
+        state['num_merges'] += 1
+        return orig_merge_linear_locs(*args, **kwargs)
 
-    monkeypatch.setattr(sparse.coo, '_unmatch_coo', mock_unmatch_coo)
+    monkeypatch.setattr(sparse.coo, '_merge_linear_locs', mock_merge_linear_locs)
 
     xs * ys
 
-    # Less than in case there's absolutely no overlap in some cases.
-    assert state['num_matches'] <= 1
+    assert state['num_merges'] == 1
+
+
+@pytest.mark.parametrize('num_args', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('broadcast', [False, True])
+def test_nary_merge(num_args, broadcast):
+    # Broadcasting the middle dimension leaves the last operand unsorted.
+    shapes = [(4, 3, 5)] * num_args + ([(4, 1, 5)] if broadcast else [])
+    args = [sparse.random(s, density=0.3) for s in shapes]
+    expected = sum(arg.todense() for arg in args)
+
+    result = sparse.elemwise(lambda *xs: sum(xs), *args)
+
+    assert_eq(result, expected)
+
+
+@pytest.mark.parametrize('func, shapes, num_expanded', [
+    (operator.mul, [(1, 40), (30, 40)], 0),
+    (lambda x, y: x * y, [(30, 1, 40), (30, 20, 40)], 0),
+    (lambda x, y, z: x * (y + z), [(30, 40), (40,), (30, 1)], 1),
+    (operator.add, [(40,), (30, 40)], 1),
+    (lambda x, y, z: x + y * z, [(30, 1, 40), (20, 1), (30, 20, 40)], 1),
+    # Without any full operand, only one of them is expanded up front.
+    (operator.mul, [(30, 1), (1, 40)], 1),
+    (operator.add, [(30, 1), (1, 40)], 2),
+    (lambda x, y, z: x * y * z, [(30, 1), (1, 40), (30, 1)], 2),
+    (lambda x, y, z: x * (y + z), [(20, 1, 1), (1, 30, 1), (1, 1, 40)], 2),
+])
+def test_virtual_broadcasting(monkeypatch, func, shapes, num_expanded):
+    args = [sparse.random(s, density=0.3) for s in shapes]
+    expected = func(*[arg.todense() for arg in args])
+
+    orig_get_expanded_coords_data = sparse.coo._get_expanded_coords_data
+    state = {'num_expanded': 0}
+
+    def mock_get_expanded_coords_data(*args, **kwargs):
+        state['num_expanded'] += 1
+        return orig_get_expanded_coords_data(*args, **kwargs)
+
+    monkeypatch.setattr(sparse.coo, '_get_expanded_coords_data', mock_get_expanded_coords_data)
+
+    result = sparse.elemwise(func, *args)
+
+    assert_eq(result, expected)
+    # Only the nonzeros of the result outside the full operands are expanded.
+    assert state['num_expanded'] == num_expanded
 
 
 def test_dense_broadcasting(monkeypatch):
-    orig_unmatch_coo = sparse.coo._unmatch_coo
+    orig_merge_linear_locs = sparse.coo._merge_linear_locs
+
+    state = {'num_merges': 0}
+
+    xs = sparse.random((3, 4), density=0.5)
+    ys = sparse.random((3, 4), density=0.5)
+    zs = sparse.random((3, 4), density=0.5)
+    ws = sparse.random((3, 4), density=0.5)
+
+    def mock_merge_linear_locs(*args, **kwargs):
+        state['num_merges'] += 1
+        return orig_merge_linear_locs(*args, **kwargs)
+
+    monkeypatch.setattr(sparse.coo, '_merge_linear_locs', mock_merge_linear_locs)
+
+    sparse.elemwise(lambda x, y, z, w: x + y * z - w, xs, ys, zs, ws)
+
+    # A single merge, no matter the number of operands.
+    assert state['num_merges'] == 1
+
+
+@pytest.mark.parametrize('func, dense_result', [
+    (operator.mul, False),
+    (operator.add, True),
+    (lambda x, y: x * y + (y == 5), True),
+])
+@pytest.mark.parametrize('dense_shape', [(6, 5, 4), (5, 4), (6, 1, 4)])
+@pytest.mark.parametrize('block_size', [1, 7, 20])
+def test_dense_operand_blocks(monkeypatch, func, dense_result, dense_shape, block_size):
+    monkeypatch.setattr(sparse.coo, '_ELEMWISE_BLOCK_SIZE', block_size)
+
+    xs = sparse.random((6, 5, 4), density=0.5)
+    y = np.arange(np.prod(dense_shape), dtype=np.float64).reshape(dense_shape)
+    expected = func(xs.todense(), y)
+
+    result = sparse.elemwise(func, xs, y)
+
+    assert isinstance(result, np.ndarray) == dense_result
+    assert_eq(result, expected)
+
+
+def test_dense_operand_out(monkeypatch):
+    monkeypatch.setattr(sparse.coo, '_ELEMWISE_BLOCK_SIZE', 4)
+    xs = sparse.random((6, 5), density=0.5)
+    y = np.random.rand(6, 5)
+
+    expected = xs.todense() * y
+
+    np.multiply(xs, y, out=xs)
+    assert_eq(xs, expected)
+
+    def mock_elemwise(*args, **kwargs):
+        raise AssertionError('The dense result was computed.')
+
+    monkeypatch.setattr(sparse.coo, 'elemwise', mock_elemwise)
+
+    with pytest.raises(ValueError):
+        np.add(xs, y, out=xs)
+
+
+@pytest.mark.parametrize('shapes', [
+    [(2, 3, 4)] * 5,
+    [(3, 4), (2, 1, 4), (2, 3, 1), (4,), (1, 1, 1)],
+])
+def test_elemwise_many_operands(shapes):
+    args = [sparse.random(s, density=0.5) for s in shapes]
+    dense_args = [arg.todense() for arg in args]
+
+    func = lambda a, b, c, d, e: a * b + c - d * e
+
+    fs = sparse.elemwise(func, *args)
+    assert isinstance(fs, COO)
+    assert fs.sorted and not fs.has_duplicates
+
+    assert_eq(fs, func(*dense_args))
+
+
+def test_elemwise_shared_coords(monkeypatch):
+    xs = sparse.random((3, 4, 5), density=0.5, canonical_order=True)
+    ws = xs.astype(np.float32)
+    x = xs.todense()
+    w = ws.todense()
+
+    assert ws.coords is xs.coords
+
+    def mock_merge_linear_locs(*args, **kwargs):
+        raise AssertionError('Arrays with shared coordinates should not be merged.')
+
+    monkeypatch.setattr(sparse.coo, '_merge_linear_locs', mock_merge_linear_locs)
 
-    state = {'num_matches': 0}
+    fs = xs * ws
+    assert fs.coords is xs.coords
+    assert_eq(fs, x * w)
 
+    assert_eq(xs - ws, x - w)
+    assert_eq(sparse.elemwise(lambda a, b, c: a * b + c, xs, ws, np.sin(xs)),
+              x * w + np.sin(x))
+
+    # Equal, but not identical, coordinates.
+    ys = COO(xs.coords.copy(), xs.data * 2, shape=xs.shape)
+    assert_eq(xs + ys, 3 * x)
+
+
+def test_ufunc_out_in_place():
+    xs = sparse.random((3, 4, 5), density=0.5, canonical_order=True)
+    ys = np.sin(xs)
+    x = xs.todense()
+    y = ys.todense()
+
+    coords = xs.coords
+    data = xs.data
+
+    result = np.multiply(xs, 2, out=xs)
+    assert result is xs
+    assert xs.coords is coords
+    assert xs.data is data
+    assert_eq(xs, 2 * x)
+
+    np.add(xs, ys, out=xs)
+    assert xs.data is data
+    assert_eq(xs, 2 * x + y)
+
+    np.negative(xs, out=(xs,))
+    assert xs.data is data
+    assert_eq(xs, -(2 * x + y))
+
+    # Zeros are filtered out of the result.
+    np.multiply(xs, 0, out=xs)
+    assert xs.nnz == 0
+
+
+def test_ufunc_out_new_pattern():
     xs = sparse.random((3, 4), density=0.5)
     ys = sparse.random((3, 4), density=0.5)
+    zs = sparse.random((3, 4), density=0.5).astype(np.float32)
+    x = xs.todense()
+    y = ys.todense()
+
+    np.add(xs, ys, out=zs)
+    assert zs.dtype == np.float32
+    assert_eq(zs, (x + y).astype(np.float32))
 
-    def mock_unmatch_coo(*args, **kwargs):
-        result = orig_unmatch_coo(*args, **kwargs)
-        state['num_matches'] += len(result[0])
-        return result
+    with pytest.raises(ValueError):
+        np.add(xs, sparse.random((4,), density=0.5), out=sparse.random((4,), density=0.5))
 
-    monkeypatch.setattr(sparse.coo, '_unmatch_coo', mock_unmatch_coo)
+    with pytest.raises(ValueError):
+        np.exp(xs, out=zs)
 
-    xs + ys
+    with pytest.raises(TypeError):
+        np.add(xs, ys, out=zs.astype(np.int64))
+
+
+def test_ufunc_out_clears_cache():
+    xs = sparse.random((3, 4), density=0.5).enable_caching()
+    x = xs.todense()
 
-    # Less than in case there's absolutely no overlap in some cases.
-    assert state['num_matches'] <= 3
+    assert_eq(xs.reshape((4, 3)), x.reshape((4, 3)))
+    xs.tocsr()
+
+    np.multiply(xs, 2, out=xs)
+
+    assert_eq(xs.reshape((4, 3)), 2 * x.reshape((4, 3)))
+    assert np.array_equal(xs.tocsr().toarray(), 2 * x)
 
 
 @pytest.mark.parametrize('format', ['coo', 'dok'])
@@ -496,12 +1021,75 @@ def test_sparsearray_elemwise(format):
     assert_eq(fs, x + y)
 
 
-def test_ndarray_densification_fails():
+@pytest.mark.parametrize('func, sparse_shape, dense_shape', [
+    (operator.add, (3, 4), (3, 4)),
+    (operator.sub, (3, 4), (4,)),
+    (np.maximum, (3, 1), (3, 4)),
+    (operator.add, (3, 4), (2, 3, 4)),
+    (operator.lt, (3, 4), (3, 4)),
+])
+def test_ndarray_dense_result(func, sparse_shape, dense_shape):
+    xs = sparse.random(sparse_shape, density=0.5)
+    y = np.random.rand(*dense_shape)
+    x = xs.todense()
+
+    result = func(xs, y)
+    assert isinstance(result, np.ndarray)
+    assert_eq(result, func(x, y))
+    assert_eq(func(y, xs), func(y, x))
+
+
+def test_ndarray_dense_result_copies():
     xs = sparse.random((3, 4), density=0.5)
     y = np.random.rand(3, 4)
+    y_copy = y.copy()
+
+    result = sparse.elemwise(lambda a, b: b if np.all(a == 0) else a + b, xs, y)
+
+    assert_eq(result, xs.todense() + y)
+    assert result is not y
+    assert_eq(y, y_copy)
+
+
+def test_sparse_densification_fails():
+    xs = sparse.random((3, 4), density=0.5)
 
     with pytest.raises(ValueError):
-        xs + y
+        xs + 1
+
+
+@pytest.mark.parametrize('func, sparse_shape, dense_shape', [
+    (operator.mul, (3, 4), (3, 4)),
+    (operator.mul, (3, 4), (4,)),
+    (operator.truediv, (3, 4), (1, 4)),
+    (operator.mul, (3, 4), (2, 3, 4)),
+    (operator.and_, (3, 1), (3, 4)),
+])
+def test_elemwise_dense_operand(func, sparse_shape, dense_shape):
+    xs = sparse.random(sparse_shape, density=0.5)
+    y = np.random.rand(*dense_shape) + 1
+
+    if func is operator.and_:
+        xs = xs.astype(np.bool_)
+        y = y > 1.5
+
+    x = xs.todense()
+
+    assert_eq(func(xs, y), func(x, y))
+
+    if func is not operator.truediv:
+        assert_eq(func(y, xs), func(y, x))
+
+    result = func(xs, y)
+    assert isinstance(result, COO)
+    assert result.nnz <= xs.broadcast_to(result.shape).nnz
+
+
+def test_elemwise_dense_operand_only():
+    y = np.random.rand(3, 4)
+
+    with pytest.raises(ValueError):
+        sparse.elemwise(operator.mul, y, 2)
 
 
 def test_elemwise_noargs():
@@ -825,6 +1413,292 @@ def test_slicing(index):
     assert_eq(x[index], s[index])
 
 
+@pytest.mark.parametrize('index', [
+    0,
+    -1,
+    (1, slice(1, 3)),
+    slice(1, 3),
+    slice(None, 3, 2),
+    slice(3, None, -1),
+    (slice(3, 0, -2), 1),
+    (slice(None), slice(None, None, -1)),
+    (slice(4, 2),),
+    (None, 2, None, slice(1, 3)),
+])
+def test_slicing_sorted(index):
+    s = sparse.random((5, 3, 4), density=0.5, canonical_order=True)
+    x = s.todense()
+
+    result = s[index]
+
+    assert_eq(result, x[index])
+    if result.sorted:
+        assert is_lexsorted(result)
+
+
+@pytest.mark.parametrize('index', [
+    (1, 0),
+    0,
+    (2, slice(None)),
+    (slice(1, 3), 1),
+])
+@pytest.mark.parametrize('sorted', [True, False])
+def test_slicing_empty(index, sorted):
+    s = COO(np.empty((2, 0), dtype=np.intp), np.empty(0), shape=(3, 2), sorted=sorted)
+    x = s.todense()
+
+    assert_eq(s[index], x[index])
+
+
+def test_slicing_leading_axis_binary_search(monkeypatch):
+    s = sparse.random((100, 3, 4), density=0.5, canonical_order=True)
+    x = s.todense()
+
+    def mock_index_mask(*args, **kwargs):
+        raise AssertionError('Leading axis indexing should not build a mask.')
+
+    monkeypatch.setattr(sparse.coo, '_index_mask', mock_index_mask)
+
+    assert_eq(s[42], x[42])
+    assert_eq(s[10:90], x[10:90])
+    assert_eq(s[-1:5:-1], x[-1:5:-1])
+    assert s[10:90].sorted
+
+
+@pytest.mark.parametrize('index', [
+    [2, 0, 2, 1],
+    [3, 3, 3],
+    [],
+    (slice(None), [2, 0, 2]),
+    (slice(1, None), slice(None), [3, 0, 3, 1]),
+    (slice(None, None, -1), [0, 0]),
+    (Ellipsis, [1, 2]),
+    (None, [4, 1], None),
+    np.array([0, 4]),
+])
+@pytest.mark.parametrize('canonical_order', [True, False])
+def test_slicing_repeated_index(index, canonical_order):
+    s = sparse.random((5, 3, 4), density=0.5, canonical_order=canonical_order)
+    x = s.todense()
+
+    assert_eq(s[index], x[index])
+
+
+@pytest.mark.parametrize('index', [
+    ([1, 0, 1], [2, 0, 2]),
+    ([1, 0, 1], [2, 0, 2], [3, 3, 0]),
+    (slice(None), [2, 0, 1], [3, 3, 0]),
+    ([[0, 1], [1, 1]], slice(1, None), [[3, 0], [1, 3]]),
+    (1, slice(1, None), [3, 0, 3, 1]),
+    (None, [4, 1], None, 1),
+    (np.array([[4, 0], [1, 1]]),),
+    ([0, 1], 2),
+    (Ellipsis, [1, 0], [0, 3]),
+    ([1, 0], None, [0, 2]),
+])
+def test_pointwise_indexing(index):
+    s = sparse.random((5, 3, 4), density=0.5)
+    x = s.todense()
+
+    assert_eq(s[index], x[index])
+
+
+@pytest.mark.parametrize('mask_shape, prefix', [
+    ((5, 3, 4), ()),
+    ((5, 3), ()),
+    ((3, 4), (slice(None),)),
+    ((3, 4), (Ellipsis,)),
+    ((4,), (Ellipsis,)),
+])
+def test_boolean_mask_indexing(mask_shape, prefix):
+    s = sparse.random((5, 3, 4), density=0.5)
+    x = s.todense()
+    ms = sparse.random(mask_shape, density=0.5).astype(np.bool_)
+    m = ms.todense()
+
+    assert_eq(s[prefix + (m,)], x[prefix + (m,)])
+    assert_eq(s[prefix + (ms,)], x[prefix + (m,)])
+
+
+def test_boolean_mask_indexing_sparse(monkeypatch):
+    s = sparse.random((100, 100, 100), density=0.01)
+    x = s.todense()
+    ms = sparse.random((100, 100, 100), density=0.01).astype(np.bool_)
+
+    def mock_todense(*args, **kwargs):
+        raise AssertionError('A sparse mask should not be densified.')
+
+    monkeypatch.setattr(COO, 'todense', mock_todense)
+    result = s[ms | s.astype(np.bool_)]
+    monkeypatch.undo()
+
+    m = ms.todense() | x.astype(np.bool_)
+    assert_eq(result, x[m])
+
+
+def test_boolean_mask_shape_mismatch():
+    s = sparse.random((5, 3, 4), density=0.5)
+
+    with pytest.raises(IndexError):
+        s[np.ones((3, 4), dtype=np.bool_)]
+
+    with pytest.raises(IndexError):
+        s[sparse.random((5, 4), density=0.5).astype(np.bool_)]
+
+
+@pytest.mark.parametrize('index, value', [
+    ((1, 2, 3), 7.0),
+    ((1, 2, 3), 0),
+    (1, 0),
+    (slice(1, 4), 2.5),
+    ((slice(None, None, -2), 1), np.arange(4.0)),
+    ((Ellipsis, slice(1, 3)), sparse.random((3, 2), density=0.5)),
+    ((slice(None), 0, slice(None)), sparse.random((1, 4), density=0.5)),
+    (([4, 0, 2], slice(None), [1, 1, 3]), np.arange(9.0).reshape((3, 3))),
+    (([3, 1], [0, 2]), sparse.random((2, 4), density=0.5)),
+    ((0, [1, 2]), 0),
+    ((slice(None), [2, 0], 1), np.arange(10.0).reshape((5, 2))),
+    (np.array([True, False, True, False, True]), 3.0),
+    (slice(0, None, -1), 7.0),
+    ((slice(None), slice(0, None, -1)), np.arange(5.0).reshape((5, 1, 1))),
+    ((1, slice(0, None, -2), slice(2, 0, -1)), sparse.random((1, 2), density=0.5)),
+])
+def test_setitem(index, value):
+    s = sparse.random((5, 3, 4), density=0.5)
+    x = s.todense()
+
+    s[index] = value
+    x[index] = value.todense() if isinstance(value, COO) else value
+
+    assert_eq(s, x)
+    assert s.sorted and not s.has_duplicates
+    assert np.all(s.data != 0)
+
+
+def test_setitem_repeated_index():
+    s = sparse.random((5, 4), density=0.5)
+    x = s.todense()
+
+    s[[1, 3, 1], [2, 0, 2]] = [1.0, 2.0, 3.0]
+    x[[1, 3, 1], [2, 0, 2]] = [1.0, 2.0, 3.0]
+
+    assert_eq(s, x)
+
+
+def test_setitem_clears_cache():
+    s = sparse.random((5, 4), density=0.5)
+    s.enable_caching()
+    s.reshape((4, 5))
+    s.tocsr()
+
+    s[2] = 1.0
+    x = s.todense()
+
+    assert_eq(s.reshape((4, 5)), x.reshape((4, 5)))
+    assert_eq(s.tocsr(), x)
+
+
+def test_setitem_fails():
+    s = sparse.random((5, 4), density=0.5)
+
+    with pytest.raises(IndexError):
+        s[5] = 1.0
+
+    with pytest.raises(ValueError):
+        s[1:3] = np.ones((3, 4))
+
+    with pytest.raises(ValueError):
+        s[1:3] = sparse.random((3, 4), density=0.5)
+
+
+@pytest.mark.parametrize('index', [
+    3,
+    (3, slice(None)),
+    (Ellipsis,),
+    slice(2, 7),
+    slice(0, 4),
+    slice(5, 100),
+    (slice(3, 3), Ellipsis),
+])
+def test_slicing_leading_view(index):
+    s = sparse.random((10, 4, 5), density=0.5)
+    x = s.todense()
+    s.sum_duplicates()
+
+    r = s[index]
+
+    assert_eq(r, x[index])
+    assert r.sorted
+    if r.nnz:
+        assert np.may_share_memory(r.data, s.data)
+
+
+def test_slicing_leading_view_coords():
+    s = sparse.random((1000, 20), density=0.5)
+    s.sum_duplicates()
+
+    assert np.may_share_memory(s[10].coords, s.coords)
+    assert np.may_share_memory(s[:10].coords, s.coords)
+    assert not np.may_share_memory(s[10:20].coords, s.coords)
+
+
+@pytest.mark.parametrize('share', [
+    lambda x: abs(x),
+    lambda x: x * 2,
+    lambda x: x * abs(x),
+    lambda x: x[1],
+    lambda x: x[:2],
+])
+@pytest.mark.parametrize('modify', [
+    lambda x: x.__setitem__((0, 0), 5),
+    lambda x: x.sum_duplicates(),
+    lambda x: x.sort_indices(),
+    lambda x: x.__setitem__(Ellipsis, 0),
+])
+def test_shared_coords_independent(share, modify):
+    s = sparse.random((4, 5, 6), density=0.5, canonical_order=True)
+    shared = share(s)
+    assert np.may_share_memory(s.coords, shared.coords)
+    s_coords, shared_coords = s.coords.copy(), shared.coords.copy()
+
+    modify(shared)
+    np.testing.assert_array_equal(s.coords, s_coords)
+
+    shared = share(s)
+    modify(s)
+    np.testing.assert_array_equal(shared.coords, shared_coords)
+
+
+@pytest.mark.parametrize('func', [
+    lambda v: operator.imul(v, 0),
+    lambda v: operator.isub(v, v),
+    lambda v: operator.imul(v, 2),
+])
+def test_slicing_leading_view_inplace(func):
+    s = sparse.random((10, 4, 5), density=0.5)
+    s.sum_duplicates()
+    s.enable_indexing()
+    x = s.todense()
+
+    v = s[1]
+    expected = func(x[1].copy())
+    v = func(v)
+
+    assert_eq(v, expected)
+    assert_eq(s, x)
+    assert_eq(s[1], x[1])
+
+
+def test_slicing_leading_view_augmented_assignment():
+    s = sparse.random((10, 4, 5), density=0.5)
+    s.sum_duplicates()
+    x = s.todense()
+
+    s[1] *= 0
+    x[1] *= 0
+    assert_eq(s, x)
+
+
 def test_custom_dtype_slicing():
     dt = np.dtype([('part1', np.float_),
                    ('part2', np.int_, (2,)),
@@ -1166,6 +2040,97 @@ def test_caching():
     assert len(x._cache['reshape']) < 5
 
 
+def test_indexing_index(monkeypatch):
+    s = sparse.random((20, 5, 6), density=0.3).enable_indexing()
+    x = s.todense()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('binary search used despite the index')
+
+    monkeypatch.setattr(sparse.coo, '_searchsorted_range', fail)
+
+    for i in range(-20, 20):
+        assert_eq(s[i], x[i])
+
+    for index in [slice(3, 9), slice(15, None), slice(None, None, -3), (slice(2, 30, 4), 1)]:
+        assert_eq(s[index], x[index])
+
+    s[4:6] = 0.5
+    x[4:6] = 0.5
+    assert_eq(s[5], x[5])
+    assert_eq(s[4:8], x[4:8])
+
+
+@pytest.mark.parametrize('shape', [(5,), (5, 3, 4), (40, 50)])
+def test_get_values(shape):
+    s = sparse.random(shape, density=0.3)
+    x = s.todense()
+    coords = np.stack([np.random.randint(-d, d, size=100) for d in shape])
+
+    assert_eq(s.get_values(coords), x[tuple(coords)])
+
+
+def test_get_values_fails():
+    s = sparse.random((5, 4), density=0.5)
+
+    with pytest.raises(ValueError):
+        s.get_values(np.zeros((3, 2), dtype=np.intp))
+
+    with pytest.raises(IndexError):
+        s.get_values(np.array([[1, 5], [0, 0]]))
+
+    with pytest.raises(IndexError):
+        s.get_values(np.array([[1.7], [0]]))
+
+    with pytest.raises(IndexError):
+        s.get_values([4, -5])
+
+
+@pytest.mark.parametrize('sorted', [True, False])
+def test_get_values_single_point(sorted):
+    s = sparse.random((5, 6, 7), density=0.5)
+    x = s.todense()
+    if not sorted:
+        order = np.random.permutation(s.nnz)
+        s = COO(s.coords[:, order], s.data[order], shape=s.shape)
+
+    for point in [(0, 0, 0), (4, 5, 6), (-1, 2, -3), (2, 3, 4)]:
+        assert s.get_values(point) == x[point]
+        assert_eq(s.get_values(np.array(point)[:, None]), x[point][None])
+
+
+@pytest.mark.parametrize('index', [
+    (1, 2, 3),
+    (-1, np.int64(2), -4),
+    (np.uint8(4),),
+    (0, -3),
+    (slice(1, 4),),
+    (slice(-2, None),),
+    (slice(None, None, -2),),
+    slice(3, 1),
+    2,
+])
+@pytest.mark.parametrize('canonical', [True, False])
+def test_simple_indexing_fast_path(monkeypatch, index, canonical):
+    s = sparse.random((5, 3, 4), density=0.5, canonical_order=canonical)
+    x = s.todense()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('simple indices should not be fully normalized')
+
+    monkeypatch.setattr(sparse.coo, 'normalize_index', fail)
+
+    assert_eq(s[index], x[index])
+
+
+@pytest.mark.parametrize('index', [5, -6, (1, 3), (0, 0, -5)])
+def test_simple_indexing_fails(index):
+    s = sparse.random((5, 3, 4), density=0.5)
+
+    with pytest.raises(IndexError):
+        s[index]
+
+
 def test_scalar_slicing():
     x = np.array([0, 1])
     s = COO(x)
@@ -1379,3 +2344,110 @@ def test_two_arg_where():
 
     with pytest.raises(ValueError):
         sparse.where(cs, xs)
+
+
+@pytest.mark.parametrize('func', [
+    lambda a, b, c: a * b + c,
+    lambda a, b, c: (a + b) * c - a,
+    lambda a, b, c: np.sin(a) * b - c * 2,
+    lambda a, b, c: (a + 1) * b - b,
+])
+def test_lazy(func, monkeypatch):
+    xs = sparse.random((3, 4), density=0.5)
+    ys = sparse.random((3, 4), density=0.5)
+    zs = sparse.random((4,), density=0.5)
+
+    x = xs.todense()
+    y = ys.todense()
+    z = zs.todense()
+
+    expr = func(xs.lazy(), ys, zs)
+    assert isinstance(expr, sparse.LazyCOO)
+    assert expr.shape == (3, 4)
+
+    state = {'num_calls': 0}
+    orig_elemwise_n_ary = sparse.coo._elemwise_n_ary
+
+    def mock_elemwise_n_ary(*args, **kwargs):
+        state['num_calls'] += 1
+        return orig_elemwise_n_ary(*args, **kwargs)
+
+    monkeypatch.setattr(sparse.coo, '_elemwise_n_ary', mock_elemwise_n_ary)
+
+    fs = expr.compute()
+    assert isinstance(fs, COO)
+    assert state['num_calls'] == 1
+
+    assert_eq(fs, func(x, y, z))
+
+
+def test_lazy_mixed():
+    xs = sparse.random((3, 4), density=0.5)
+    ys = sparse.random((3, 4), density=0.5)
+
+    x = xs.todense()
+    y = ys.todense()
+
+    assert_eq((ys * xs.lazy() + xs).compute(), y * x + x)
+    assert_eq(np.sum(xs.lazy() * ys, axis=1), np.sum(x * y, axis=1))
+
+    with pytest.raises(ValueError):
+        (xs.lazy() + 1).compute()
+
+
+@pytest.mark.parametrize('func', [
+    lambda x, y: x * y,
+    lambda x, y: x + y[0],
+    lambda x, y: x.reshape((6, 20)),
+    lambda x, y: x[1:, ::-2, 3],
+    lambda x, y: x[0, 1:4],
+    lambda x, y: x.sum(axis=(0, 2)),
+    lambda x, y: np.maximum.reduce(x, axis=1),
+])
+def test_backends(func):
+    pytest.importorskip('numba')
+
+    xs = sparse.random((2, 3, 4, 5), density=0.3)
+    ys = sparse.random((2, 3, 4, 5), density=0.3)
+
+    old_backend = sparse.get_backend()
+    try:
+        results = []
+        for backend in ['numpy', 'numba']:
+            sparse.set_backend(backend)
+            assert sparse.get_backend() == backend
+            results.append(func(COO(xs.coords, xs.data, shape=xs.shape),
+                                COO(ys.coords, ys.data, shape=ys.shape)))
+    finally:
+        sparse.set_backend(old_backend)
+
+    expected, actual = results
+    assert actual.dtype == expected.dtype
+    assert actual.coords.dtype == expected.coords.dtype
+    assert_eq(actual, expected)
+
+
+def test_constructor_copies_coords():
+    coords = np.array([[0, 1, 3], [2, 0, 1]], dtype=np.uint8)
+    s = COO(coords, [1.0, 2.0, 3.0], shape=(4, 3), sorted=True, has_duplicates=False)
+    assert not np.may_share_memory(s.coords, coords)
+
+    s[0, 2] = 0
+    s *= 2
+    np.testing.assert_array_equal(coords, [[0, 1, 3], [2, 0, 1]])
+
+
+def test_set_backend_fails():
+    with pytest.raises(ValueError):
+        sparse.set_backend('foo')
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+def test_backend_environment(backend):
+    if backend == 'numba':
+        pytest.importorskip('numba')
+
+    env = dict(os.environ, SPARSE_BACKEND=backend)
+    output = subprocess.check_output(
+        [sys.executable, '-c', 'import sparse; print(sparse.get_backend())'], env=env)
+    assert output.decode().strip() == backend
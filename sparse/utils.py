@@ -33,7 +33,7 @@ def assert_eq(x, y, check_nnz=True, compare_dtype=True, **kwargs):
 
 
 def is_lexsorted(x):
-    return not x.shape or (np.diff(x.linear_loc()) > 0).all()
+    return not x.shape or (np.diff(x.linear_loc(signed=True)) > 0).all()
 
 
 def _zero_of_dtype(dtype):